@@ -0,0 +1,149 @@
+import { existsSync, readFileSync, renameSync, writeFileSync } from 'node:fs'
+import { fileURLToPath } from 'node:url'
+
+/**
+ * Per-host health state shared with the Python IPT scripts
+ * (scripts/host_health.py). Hosts that failed recently are stored with a
+ * `retry_after` timestamp so the next run skips them until the cool-down
+ * expires, instead of rediscovering the failure resource by resource.
+ *
+ * `failures` counts consecutive failures on both sides, and the circuit
+ * opens at the same IPT_FAILURE_THRESHOLD (default 3) as host_health.py, so
+ * a single transient error doesn't trip a host the harvester still
+ * considers healthy.
+ */
+export type HostState = {
+  state: 'closed' | 'open'
+  failures: number
+  opened: number
+  retry_after: number
+  last_error: string | null
+  last_failure: number | null
+  last_success: number | null
+}
+
+type HealthFile = {
+  version: number
+  updated_at?: number
+  hosts: Record<string, HostState>
+}
+
+const DEFAULT_FAILURE_THRESHOLD = 3
+const DEFAULT_COOL_DOWN_S = 3600
+const MAX_COOL_DOWN_S = 7 * 24 * 3600
+
+export const DEFAULT_HEALTH_FILE = fileURLToPath(
+  new URL('../../../../scripts/ipt_host_health.json', import.meta.url)
+)
+
+const newHostState = (): HostState => ({
+  state: 'closed',
+  failures: 0,
+  opened: 0,
+  retry_after: 0,
+  last_error: null,
+  last_failure: null,
+  last_success: null
+})
+
+// Same key as ipt_harvester.host_of (netloc, lowercase)
+export const hostKey = (url: string) => {
+  try {
+    return new URL(url).host.toLowerCase()
+  } catch {
+    return url
+  }
+}
+
+const nowSeconds = () => Date.now() / 1000
+
+export class HostHealth {
+  private hosts: Record<string, HostState> = {}
+
+  constructor(
+    readonly path = process.env.IPT_HEALTH_FILE || DEFAULT_HEALTH_FILE,
+    readonly coolDownS = Number(process.env.IPT_COOL_DOWN) ||
+      DEFAULT_COOL_DOWN_S,
+    readonly failureThreshold = Number(process.env.IPT_FAILURE_THRESHOLD) ||
+      DEFAULT_FAILURE_THRESHOLD
+  ) {
+    if (!existsSync(path)) {
+      return
+    }
+    try {
+      const contents = JSON.parse(readFileSync(path, 'utf-8')) as HealthFile
+      for (const [host, state] of Object.entries(contents.hosts ?? {})) {
+        this.hosts[host] = { ...newHostState(), ...state }
+      }
+    } catch (error) {
+      console.log(
+        `Ignoring host health file ${path}: ${(error as Error).message}`
+      )
+    }
+  }
+
+  private state(url: string) {
+    const key = hostKey(url)
+    this.hosts[key] ??= newHostState()
+    return this.hosts[key]
+  }
+
+  /** Host circuit is open and the cool-down has not expired yet */
+  isUnavailable(url: string) {
+    const state = this.hosts[hostKey(url)]
+    return state?.state === 'open' && nowSeconds() < state.retry_after
+  }
+
+  retryAfter(url: string) {
+    return new Date((this.hosts[hostKey(url)]?.retry_after ?? 0) * 1000)
+  }
+
+  recordSuccess(url: string) {
+    Object.assign(this.state(url), {
+      state: 'closed',
+      failures: 0,
+      opened: 0,
+      retry_after: 0,
+      last_success: nowSeconds()
+    })
+  }
+
+  /**
+   * Network failure: open the circuit after `failureThreshold` consecutive
+   * failures, or reopen it when the first request after the cool-down fails,
+   * doubling the cool-down each time
+   */
+  recordFailure(url: string, error: Error) {
+    const state = this.state(url)
+    const now = nowSeconds()
+    state.failures += 1
+    state.last_error = `${error.name}: ${error.message}`.slice(0, 500)
+    state.last_failure = now
+    if (state.state === 'open') {
+      // Concurrent requests to a host that is already open don't extend it
+      if (now < state.retry_after) {
+        return
+      }
+    } else if (state.failures < this.failureThreshold) {
+      return
+    }
+    const coolDown = Math.min(
+      MAX_COOL_DOWN_S,
+      this.coolDownS * 2 ** state.opened
+    )
+    state.state = 'open'
+    state.opened += 1
+    state.retry_after = now + coolDown
+  }
+
+  save() {
+    const contents: HealthFile = {
+      version: 1,
+      updated_at: nowSeconds(),
+      hosts: this.hosts
+    }
+    const temporary = `${this.path}.tmp`
+    writeFileSync(temporary, JSON.stringify(contents, null, 2))
+    renameSync(temporary, this.path)
+  }
+}
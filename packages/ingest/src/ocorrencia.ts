@@ -11,6 +11,7 @@ import {
   type DbIpt,
   type Ipt
 } from './lib/dwca.ts'
+import { HostHealth } from './lib/host-health.ts'
 
 // Import normalization utilities
 import {
@@ -221,6 +222,8 @@ try {
 
   // Track failed IPT servers to skip resources from same server
   const failedIpts = new Set<string>()
+  // Hosts that failed in previous runs (shared with the Python IPT scripts)
+  const hostHealth = new HostHealth()
 
   // Extract base URL from IPT URL for grouping
   const getIptBaseUrl = (url: string) => {
@@ -249,6 +252,14 @@ try {
       }
 
       const iptBaseUrl = getIptBaseUrl(url)
+      if (!failedIpts.has(iptBaseUrl) && hostHealth.isUnavailable(url)) {
+        console.log(
+          `IPT server ${iptBaseUrl} failed recently - skipping until ${hostHealth
+            .retryAfter(url)
+            .toISOString()}`
+        )
+        failedIpts.add(iptBaseUrl)
+      }
       if (failedIpts.has(iptBaseUrl)) {
         console.log(
           `Skipping ${repositorio}:${tag} - IPT server ${iptBaseUrl} already failed`
@@ -278,6 +289,7 @@ try {
             `IPT server ${iptBaseUrl} appears to be offline - marking for skip`
           )
           failedIpts.add(iptBaseUrl)
+          hostHealth.recordFailure(url, error)
         }
 
         console.log('Erro baixando/processando eml', error.message)
@@ -287,6 +299,7 @@ try {
       if (!eml) {
         return
       }
+      hostHealth.recordSuccess(url)
 
       const ipt = processaEml(eml)
       const dbVersion = (
@@ -337,6 +350,7 @@ try {
           `IPT server ${iptBaseUrl} appears to be offline during archive download - marking for skip`
         )
         failedIpts.add(iptBaseUrl)
+        hostHealth.recordFailure(url, error)
       }
 
       throw error
@@ -485,6 +499,14 @@ try {
     )
   }
 
+  try {
+    hostHealth.save()
+  } catch (error) {
+    console.log(
+      `Could not save host health to ${hostHealth.path}: ${(error as Error).message}`
+    )
+  }
+
   // Report failed IPTs
   if (failedIpts.size > 0) {
     console.log(
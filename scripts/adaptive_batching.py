@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tamanho adaptativo dos lotes de escrita (insert_many) dos scripts do MongoDB.
+
+O equivalente em Python do safeInsertMany da ingestão (ocorrencia.ts), que
+divide os lotes pela metade quando passam do limite de 16 MB, mas sem
+esperar pela falha:
+
+- os documentos são codificados uma única vez em RawBSONDocument (o driver
+  não os codifica de novo) e cada lote é limitado pelo tamanho em bytes;
+- o número de documentos por lote cresce enquanto a latência das escritas
+  fica abaixo do alvo e diminui quando as confirmações ficam lentas
+  (aumento gradual, redução multiplicativa);
+- erros de tamanho ou transitórios (timeout, reconexão) reduzem o lote à
+  metade e o trecho que falhou é reenviado em duas metades. Reenviar é
+  seguro: insert_many ignora as chaves duplicadas do que já foi gravado.
+"""
+
+import logging
+import threading
+import time
+
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import AutoReconnect, DocumentTooLarge, ExecutionTimeout, WTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Limite de um documento BSON no MongoDB, com folga para o envelope do comando
+MAX_BATCH_BYTES = 16 * 1024 * 1024 - 64 * 1024
+
+DEFAULT_INITIAL_SIZE = 1000
+DEFAULT_MIN_SIZE = 1
+DEFAULT_MAX_SIZE = 50000
+
+# Latência alvo (em segundos) de cada insert_many
+DEFAULT_TARGET_LATENCY = 0.5
+
+# Acima de SLOW_FACTOR x alvo a confirmação é considerada lenta
+SLOW_FACTOR = 2.0
+GROWTH_FACTOR = 1.25
+SHRINK_FACTOR = 0.5
+
+# Erros em que um lote menor pode passar
+SHRINKABLE_ERRORS = (DocumentTooLarge, AutoReconnect, ExecutionTimeout, WTimeoutError)
+
+def encode_documents(documents):
+    """Codifica os documentos uma vez, para medir o tamanho e enviar sem nova codificação."""
+    return [RawBSONDocument(bson.encode(document)) for document in documents]
+
+class AdaptiveBatchSizer:
+    """
+    Tamanho atual dos lotes de escrita, ajustado pela latência observada.
+    Pode ser compartilhado pelas threads escritoras do pipelined_copy.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_SIZE, minimum=DEFAULT_MIN_SIZE, maximum=DEFAULT_MAX_SIZE,
+                 target_latency=DEFAULT_TARGET_LATENCY, max_bytes=MAX_BATCH_BYTES):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._size = float(min(max(initial, minimum), self.maximum))
+
+    @property
+    def size(self):
+        return int(self._size)
+
+    def chunks(self, documents):
+        """
+        Divide documentos já codificados (RawBSONDocument) em lotes de até
+        `size` documentos e `max_bytes` bytes.
+        """
+        limit = self.size
+        chunk, chunk_bytes = [], 0
+        for document in documents:
+            document_bytes = len(document.raw)
+            if chunk and (len(chunk) >= limit or chunk_bytes + document_bytes > self.max_bytes):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(document)
+            chunk_bytes += document_bytes
+        if chunk:
+            yield chunk
+
+    def record(self, count, latency):
+        """Ajusta o tamanho após uma escrita bem-sucedida de `count` documentos."""
+        with self.lock:
+            if latency > self.target_latency * SLOW_FACTOR:
+                self._size = max(self.minimum, self._size * SHRINK_FACTOR)
+            elif latency < self.target_latency and count >= self.size:
+                # Só cresce quando o lote estava cheio (lotes menores não dizem nada sobre o limite)
+                self._size = min(self.maximum, max(self._size * GROWTH_FACTOR, self._size + 1))
+
+    def record_failure(self):
+        """Reduz o tamanho após uma escrita que falhou por tamanho ou timeout."""
+        with self.lock:
+            self._size = max(self.minimum, self._size * SHRINK_FACTOR)
+
+def write_adaptive(write, documents, sizer, label=''):
+    """
+    Grava `documents` (RawBSONDocument) com write(lote) em lotes do tamanho
+    atual de `sizer`, registrando a latência de cada lote.
+    """
+    for chunk in sizer.chunks(documents):
+        _write_chunk(write, chunk, sizer, label)
+
+def _write_chunk(write, chunk, sizer, label):
+    start = time.monotonic()
+    try:
+        write(chunk)
+    except SHRINKABLE_ERRORS as e:
+        sizer.record_failure()
+        if len(chunk) == 1:
+            raise
+        half = len(chunk) // 2
+        logger.warning(
+            f"{label}Falha ao gravar lote de {len(chunk)} documentos ({type(e).__name__}); "
+            f"reenviando em lotes de {half} (tamanho atual: {sizer.size})"
+        )
+        _write_chunk(write, chunk[:half], sizer, label)
+        _write_chunk(write, chunk[half:], sizer, label)
+        return
+    sizer.record(len(chunk), time.monotonic() - start)
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Benchmark da conversão de datas (parse_event_date, convert_record e o transformador de datas).
+
+Três partes:
+- gerador de um corpus sintético de eventDate: os sete formatos suportados,
+  datas ambíguas no formato %m/%d/%Y, valores malformados, strings vazias e
+  muita repetição (as mesmas datas aparecem em muitos registros);
+- micro-benchmarks da vazão do parse (sem cache, cache frio, cache quente e
+  em lote) e da montagem dos documentos/atualizações;
+- benchmark ponta a ponta da cópia (convert_mongodb_dates) e da conversão
+  in-place (motor de manutenção com o transformador de datas) contra um
+  substituto em memória, um mongod descartável iniciado pelo próprio script
+  (--mongod) ou um MongoDB local já em execução (--mongo-uri, em um banco
+  temporário).
+
+Nunca usa a base de produção. O resultado é emitido em JSON para acompanhar
+regressões entre versões.
+
+Uso:
+    python benchmark_date_conversion.py --size 200000 --output resultado.json
+    python benchmark_date_conversion.py --mongod /usr/bin/mongod
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from itertools import accumulate
+from types import SimpleNamespace
+
+import bson
+from bson import ObjectId
+from pymongo import MongoClient
+
+import convert_mongodb_dates
+from event_date_parser import (
+    _parse_event_date_cached, clear_parse_cache, parse_cache_stats, parse_event_date, parse_event_dates_batch
+)
+from event_date_transformer import EventDateTransformer
+from maintenance_engine import new_counters, run_single_pass
+
+DEFAULT_SIZE = 100000
+DEFAULT_DISTINCT_RATIO = 0.05
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 42
+
+# Proporção de cada categoria entre os registros (e entre os valores distintos) do corpus
+EVENT_DATE_CATEGORIES = {
+    'ymd_dash': 0.30,        # YYYY-MM-DD
+    'ymd_slash': 0.05,       # YYYY/MM/DD
+    'dmy_slash': 0.20,       # DD/MM/YYYY
+    'dmy_dash': 0.05,        # DD-MM-YYYY
+    'ym_dash': 0.06,         # YYYY-MM
+    'ym_slash': 0.02,        # YYYY/MM
+    'year': 0.10,            # YYYY
+    'mdy_ambiguous': 0.04,   # MM/DD/YYYY com dia > 12 (só casa no fallback %m/%d/%Y)
+    'malformed': 0.13,       # intervalos, horários, meses/dias inválidos, texto livre
+    'empty': 0.05,           # '' e espaços
+}
+
+# Repetições seguidas após as quais uma categoria é considerada esgotada no gerador
+POOL_MAX_MISSES = 1000
+
+MALFORMED_TEMPLATES = [
+    lambda r, y, m, d: f"{y}-{m:02d}-{d:02d}T{r.randint(0, 23):02d}:{r.randint(0, 59):02d}:00",
+    lambda r, y, m, d: f"{y}-{m:02d}-{d:02d}/{y}-{m:02d}-{min(d + 3, 28):02d}",
+    lambda r, y, m, d: f"{y}-{r.randint(13, 99)}-{d:02d}",
+    lambda r, y, m, d: f"{r.randint(32, 99)}/{m:02d}/{y}",
+    lambda r, y, m, d: f"{r.randint(1000, 1699)}-{m:02d}-{d:02d}",
+    lambda r, y, m, d: f"{d}.{m}.{y}",
+    lambda r, y, m, d: f"{y}{m:02d}{d:02d}",
+    lambda r, y, m, d: r.choice(['s/d', 'sem data', 'unknown', 'ND', '?', '19--', '0000-00-00']),
+]
+
+def _random_date(rng):
+    return rng.randint(1800, 2025), rng.randint(1, 12), rng.randint(1, 28)
+
+def _event_date_value(rng, category):
+    """Gera um valor de eventDate da categoria indicada."""
+    year, month, day = _random_date(rng)
+    if category == 'ymd_dash':
+        return f"{year}-{month:02d}-{day:02d}"
+    if category == 'ymd_slash':
+        return f"{year}/{month:02d}/{day:02d}"
+    if category == 'dmy_slash':
+        return f"{day:02d}/{month:02d}/{year}"
+    if category == 'dmy_dash':
+        return f"{day:02d}-{month:02d}-{year}"
+    if category == 'ym_dash':
+        return f"{year}-{month:02d}"
+    if category == 'ym_slash':
+        return f"{year}/{month:02d}"
+    if category == 'year':
+        return str(year)
+    if category == 'mdy_ambiguous':
+        return f"{month:02d}/{rng.randint(13, 28)}/{year}"
+    if category == 'malformed':
+        return rng.choice(MALFORMED_TEMPLATES)(rng, year, month, day)
+    return rng.choice(['', ' ', '  '])
+
+def generate_event_dates(size, distinct_ratio=DEFAULT_DISTINCT_RATIO, seed=DEFAULT_SEED):
+    """
+    Gera `size` valores de eventDate. A categoria de cada registro segue
+    EVENT_DATE_CATEGORIES e o valor é sorteado, com pesos tipo Zipf, de um
+    conjunto de valores distintos da categoria (ao todo cerca de
+    size * distinct_ratio), imitando a repetição de datas entre espécimes da
+    mesma coleta. Retorna (valores, {valor distinto: categoria}).
+    """
+    rng = random.Random(seed)
+    distinct = max(1, int(size * distinct_ratio))
+    pool = {}
+    category_values = {}
+    for category, weight in EVENT_DATE_CATEGORIES.items():
+        target = max(1, int(distinct * weight))
+        values = set()
+        # Categorias pequenas (como os vazios ou só o ano) podem ter menos valores possíveis
+        # que o alvo: param depois de muitas repetições seguidas
+        misses = 0
+        while len(values) < target and misses < POOL_MAX_MISSES:
+            value = _event_date_value(rng, category)
+            if value in pool:
+                misses += 1
+                continue
+            misses = 0
+            values.add(value)
+            pool[value] = category
+        category_values[category] = sorted(values)
+        rng.shuffle(category_values[category])
+
+    categories = rng.choices(list(EVENT_DATE_CATEGORIES), list(EVENT_DATE_CATEGORIES.values()), k=size)
+    positions = {category: [] for category in category_values}
+    for position, category in enumerate(categories):
+        positions[category].append(position)
+
+    # Um sorteio por categoria, com os pesos acumulados calculados uma única vez
+    event_dates = [None] * size
+    for category, category_positions in positions.items():
+        if not category_positions:
+            continue
+        values = category_values[category]
+        cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(values))))
+        drawn = rng.choices(values, cum_weights=cum_weights, k=len(category_positions))
+        for position, value in zip(category_positions, drawn):
+            event_dates[position] = value
+    return event_dates, pool
+
+def generate_documents(event_dates, seed=DEFAULT_SEED):
+    """
+    Gera documentos de ocorrência com os campos lidos pelos scripts de
+    conversão: year/month/day ausentes, numéricos, strings numéricas ou texto.
+    """
+    rng = random.Random(seed)
+    documents = []
+    for event_date in event_dates:
+        document = {'_id': ObjectId(), 'canonicalName': f"Species {rng.randint(1, 5000)}", 'eventDate': event_date}
+        shape = rng.random()
+        if shape < 0.10:
+            # Sem eventDate
+            del document['eventDate']
+        if shape >= 0.55:
+            year, month, day = _random_date(rng)
+            if shape < 0.80:
+                document.update(year=str(year), month=str(month), day=str(day))
+            elif shape < 0.95:
+                document.update(year=year, month=month, day=day)
+            else:
+                document.update(year=str(year), month='s/d')
+        elif rng.random() < 0.2:
+            # Apenas parte dos campos preenchida
+            document['year'] = str(_random_date(rng)[0])
+        documents.append(document)
+    return documents
+
+def corpus_summary(event_dates, pool):
+    """Tamanho, distintos e distribuição por categoria do corpus."""
+    categories = {}
+    for value in event_dates:
+        categories[pool[value]] = categories.get(pool[value], 0) + 1
+    return {
+        'size': len(event_dates),
+        'distinct': len(pool),
+        'categories': dict(sorted(categories.items()))
+    }
+
+def measure(function, repeat):
+    """Executa `function` `repeat` vezes; retorna os tempos (s) de cada execução."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def timing_result(timings, items):
+    best = min(timings)
+    return {
+        'items': items,
+        'best_seconds': round(best, 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'items_per_second': round(items / best, 1) if best else None
+    }
+
+def chunks(values, size):
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+def run_micro_benchmarks(event_dates, documents, batch_size, repeat):
+    """Vazão do parse e da conversão dos documentos, sem acesso ao banco."""
+    results = {}
+    date_batches = chunks(event_dates, batch_size)
+    document_batches = chunks(documents, batch_size)
+    uncached = _parse_event_date_cached.__wrapped__
+
+    def parse_uncached():
+        for value in event_dates:
+            if value:
+                uncached(value)
+
+    def parse_scalar():
+        for value in event_dates:
+            parse_event_date(value)
+
+    def parse_cold():
+        clear_parse_cache()
+        parse_scalar()
+
+    def parse_batch_cold():
+        clear_parse_cache()
+        for batch in date_batches:
+            parse_event_dates_batch(batch)
+
+    results['parse_uncached'] = timing_result(measure(parse_uncached, repeat), len(event_dates))
+    results['parse_cold_cache'] = timing_result(measure(parse_cold, repeat), len(event_dates))
+    parse_scalar()
+    results['parse_warm_cache'] = timing_result(measure(parse_scalar, repeat), len(event_dates))
+    results['parse_cache'] = parse_cache_stats()
+    results['parse_batch_cold_cache'] = timing_result(measure(parse_batch_cold, repeat), len(event_dates))
+
+    def convert_records():
+        clear_parse_cache()
+        for batch in document_batches:
+            convert_mongodb_dates.convert_records(batch)
+
+    def date_transformer():
+        clear_parse_cache()
+        transformer = EventDateTransformer()
+        counters = transformer.new_counters()
+        for batch in document_batches:
+            transformer.transform_batch(batch, counters)
+
+    results['convert_records'] = timing_result(measure(convert_records, repeat), len(documents))
+    results['date_transformer'] = timing_result(measure(date_transformer, repeat), len(documents))
+    return results
+
+class InMemoryCursor:
+    """Cursor do substituto em memória: decodifica os documentos na iteração."""
+
+    def __init__(self, documents, projection):
+        self.documents = documents
+        self.projection = projection
+
+    def sort(self, key, direction=1):
+        if key != '_id':
+            raise NotImplementedError("O substituto em memória só ordena por _id")
+        self.documents = sorted(self.documents, key=lambda item: item[0], reverse=direction < 0)
+        return self
+
+    def __iter__(self):
+        for _, raw in self.documents:
+            document = bson.decode(raw)
+            if self.projection:
+                document = {key: value for key, value in document.items() if key in self.projection}
+            yield document
+
+class InMemoryCollection:
+    """
+    Substituto mínimo de Collection para o benchmark ponta a ponta: guarda os
+    documentos codificados em BSON (como o driver faria ao enviá-los) e
+    implementa apenas find({}), insert_many e bulk_write com $set.
+    """
+
+    def __init__(self, name, documents=()):
+        self.name = name
+        self.documents = {document['_id']: bson.encode(document) for document in documents}
+
+    def find(self, query=None, projection=None):
+        if query:
+            raise NotImplementedError("O substituto em memória só aceita find({})")
+        return InMemoryCursor(list(self.documents.items()), projection)
+
+    def insert_many(self, documents, ordered=True):
+        for document in documents:
+            self.documents[document['_id']] = bson.encode(document)
+
+    def bulk_write(self, operations, ordered=True):
+        matched = modified = 0
+        for operation in operations:
+            raw = self.documents.get(operation._filter['_id'])
+            if raw is None:
+                continue
+            matched += 1
+            document = bson.decode(raw)
+            changes = operation._doc['$set']
+            if any(document.get(key) != value for key, value in changes.items()):
+                document.update(changes)
+                self.documents[document['_id']] = bson.encode(document)
+                modified += 1
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    def count_documents(self, query):
+        if query:
+            raise NotImplementedError("O substituto em memória só aceita count_documents({})")
+        return len(self.documents)
+
+    def drop(self):
+        self.documents.clear()
+
+class InMemoryBackend:
+    """Banco em memória: coleções InMemoryCollection criadas sob demanda."""
+    name = 'memory'
+
+    def __init__(self):
+        self.collections = {}
+
+    def load(self, name, documents):
+        self.collections[name] = InMemoryCollection(name, documents)
+        return self.collections[name]
+
+    def collection(self, name):
+        return self.collections.setdefault(name, InMemoryCollection(name))
+
+    def close(self):
+        self.collections.clear()
+
+class MongoBackend:
+    """
+    MongoDB real em um banco temporário, removido ao final. Com `mongod_path`,
+    inicia um mongod descartável (dbpath temporário, porta livre, só localhost).
+    """
+    name = 'mongodb'
+
+    def __init__(self, uri=None, mongod_path=None):
+        self.process = None
+        self.dbpath = None
+        if mongod_path:
+            uri = self._start_mongod(mongod_path)
+        self.client = MongoClient(uri, serverSelectionTimeoutMS=30000)
+        try:
+            self.client.admin.command('ping')
+        except Exception:
+            self._stop_mongod()
+            raise
+        self.db = self.client[f"benchmark_dates_{uuid.uuid4().hex[:8]}"]
+
+    def _start_mongod(self, mongod_path):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.dbpath = tempfile.mkdtemp(prefix='benchmark_mongod_')
+        self.process = subprocess.Popen(
+            [mongod_path, '--dbpath', self.dbpath, '--port', str(port), '--bind_ip', '127.0.0.1', '--quiet'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return f"mongodb://127.0.0.1:{port}/"
+
+    def load(self, name, documents):
+        self.db[name].drop()
+        for batch in chunks(documents, 10000):
+            self.db[name].insert_many(batch, ordered=False)
+        return self.db[name]
+
+    def collection(self, name):
+        return self.db[name]
+
+    def close(self):
+        self.client.drop_database(self.db.name)
+        self.client.close()
+        self._stop_mongod()
+
+    def _stop_mongod(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=60)
+            shutil.rmtree(self.dbpath, ignore_errors=True)
+
+def run_end_to_end(backend, documents, batch_size, repeat, queue_depth, writers):
+    """
+    Tempo das funções dos scripts sobre o backend: cópia sequencial e com
+    pipeline (convert_mongodb_dates.copy_documents) e conversão in-place
+    com o transformador de datas (maintenance_engine.run_single_pass).
+    """
+    results = {}
+
+    def copy(pipeline_options):
+        def run():
+            source = backend.load('ocorrencias', documents)
+            target = backend.collection('novadata')
+            target.drop()
+            clear_parse_cache()
+            start = time.perf_counter()
+            convert_mongodb_dates.copy_documents(
+                source, target, {}, convert_mongodb_dates.new_counters(), batch_size,
+                pipeline_options=pipeline_options
+            )
+            return time.perf_counter() - start
+        return run
+
+    def convert_in_place():
+        collection = backend.load('ocorrencias', documents)
+        clear_parse_cache()
+        start = time.perf_counter()
+        transformers = [EventDateTransformer()]
+        run_single_pass(collection, transformers, {}, batch_size, new_counters(transformers))
+        return time.perf_counter() - start
+
+    # A carga dos documentos não entra na medição
+    scenarios = {
+        'copy_sequential': copy(None),
+        'copy_pipelined': copy({'queue_depth': queue_depth, 'writers': writers}),
+        'convert_in_place': convert_in_place,
+    }
+    for name, scenario in scenarios.items():
+        results[name] = timing_result([scenario() for _ in range(repeat)], len(documents))
+    return results
+
+def compare_results(current, baseline):
+    """Razão de vazão (atual / referência) de cada medição presente nos dois resultados."""
+    ratios = {}
+    for section in ('micro', 'end_to_end'):
+        for name, result in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name, {})
+            if isinstance(result, dict) and result.get('items_per_second') and previous.get('items_per_second'):
+                ratios[f"{section}.{name}"] = round(result['items_per_second'] / previous['items_per_second'], 3)
+    return ratios
+
+def parse_args(argv=None):
+    """Lê os argumentos de linha de comando."""
+    parser = argparse.ArgumentParser(description="Benchmark da conversão de datas com corpus sintético")
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE,
+                        help=f"Quantidade de registros do corpus (padrão: {DEFAULT_SIZE})")
+    parser.add_argument('--distinct-ratio', type=float, default=DEFAULT_DISTINCT_RATIO,
+                        help=f"Fração de eventDate distintos no corpus (padrão: {DEFAULT_DISTINCT_RATIO})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f"Semente do gerador (padrão: {DEFAULT_SEED})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Tamanho dos lotes (padrão: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"Repetições de cada medição (padrão: {DEFAULT_REPEAT})")
+    parser.add_argument('--skip-end-to-end', action='store_true',
+                        help="Executa apenas os micro-benchmarks")
+    parser.add_argument('--mongo-uri',
+                        help="MongoDB local já em execução para o benchmark ponta a ponta "
+                             "(usa um banco temporário, removido ao final)")
+    parser.add_argument('--mongod', nargs='?', const=shutil.which('mongod') or 'mongod', metavar='PATH',
+                        help="Inicia um mongod descartável para o benchmark ponta a ponta")
+    parser.add_argument('--queue-depth', type=int, default=convert_mongodb_dates.DEFAULT_QUEUE_DEPTH,
+                        help="Profundidade das filas da cópia com pipeline")
+    parser.add_argument('--writers', type=int, default=convert_mongodb_dates.DEFAULT_WRITERS,
+                        help="Threads de inserção da cópia com pipeline")
+    parser.add_argument('--save-corpus', metavar='PATH',
+                        help="Grava o corpus de eventDate gerado (um valor JSON por linha)")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="Resultado JSON anterior para comparar a vazão")
+    parser.add_argument('--output', metavar='PATH',
+                        help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+    if args.mongo_uri and args.mongod:
+        parser.error("use --mongo-uri ou --mongod, não ambos")
+    return args
+
+def main(argv=None):
+    """Função principal do script."""
+    args = parse_args(argv)
+    # Os logs de progresso dos scripts distorceriam as medições
+    logging.getLogger().setLevel(logging.WARNING)
+
+    event_dates, pool = generate_event_dates(args.size, args.distinct_ratio, args.seed)
+    documents = generate_documents(event_dates, args.seed)
+    if args.save_corpus:
+        with open(args.save_corpus, 'w', encoding='utf-8') as corpus_file:
+            for value in event_dates:
+                corpus_file.write(json.dumps(value, ensure_ascii=False) + '\n')
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'parameters': {
+            'size': args.size,
+            'distinct_ratio': args.distinct_ratio,
+            'seed': args.seed,
+            'batch_size': args.batch_size,
+            'repeat': args.repeat
+        },
+        'corpus': corpus_summary(event_dates, pool),
+        'micro': run_micro_benchmarks(event_dates, documents, args.batch_size, args.repeat)
+    }
+
+    if not args.skip_end_to_end:
+        if args.mongo_uri or args.mongod:
+            backend = MongoBackend(args.mongo_uri, args.mongod)
+        else:
+            backend = InMemoryBackend()
+        try:
+            report['end_to_end'] = {
+                'backend': backend.name,
+                **run_end_to_end(backend, documents, args.batch_size, args.repeat, args.queue_depth, args.writers)
+            }
+        finally:
+            backend.close()
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            report['comparison'] = compare_results(report, json.load(baseline_file))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Benchmark da conciliação IPTs x Grist (check_ipt_resources.py) em escala de catálogo.
+
+Quatro partes:
+- gerador de um catálogo sintético de recursos (de 100 a 100k): títulos
+  acentuados no estilo das coleções brasileiras, sufixos de versão no RSS,
+  nomes quase iguais entre recursos diferentes (a mesma instituição com
+  outro táxon) e, no Grist, o mesmo recurso com tag, só com o título
+  (variação de caixa, acentos e pontuação), com erros de digitação ou
+  ausente, além de registros que não estão em nenhum IPT;
+- substitutos locais via HTTP: os feeds rss.do, distribuídos entre
+  `--hosts` servidores (portas diferentes, como hosts diferentes para a
+  coleta concorrente), e a API do Grist (endpoint SQL e /records), servida
+  a partir de um SQLite em memória;
+- medição separada de cada etapa: download dos feeds e sincronização do
+  Grist (fetch), parse dos feeds (parse), normalização dos títulos
+  (normalize), índice de trigramas (index) e comparação completa
+  (match, find_missing_resources, sobre uma amostra de `--match-sample`
+  recursos nos catálogos grandes), além da coleta em streaming
+  (download + parse juntos, como em produção) e do custo por par de
+  titles_are_similar, com a estimativa da comparação exaustiva;
+- resultado em JSON, com a conferência de cada recurso contra o método
+  esperado pelo gerador (acertos e falsos positivos).
+
+Nunca acessa os IPTs ou o Grist reais.
+
+Uso:
+    python benchmark_ipt_reconciliation.py --sizes 100,1000,10000 --output resultado.json
+    python benchmark_ipt_reconciliation.py --sizes 100000 --repeat 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+
+from check_ipt_resources import (
+    RSS_SKIPPED_FIELDS, find_missing_resources, harvest_ipt_resources, parse_ipt_resources, titles_are_similar
+)
+from grist_mirror import GristMirror, sync_grist_mirror
+from ipt_harvester import DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST, harvest_feeds
+from title_matcher import DEFAULT_THRESHOLD, TitleIndex, normalize_text_for_comparison, similarity_key
+
+DEFAULT_SIZES = '100,1000,10000'
+DEFAULT_HOSTS = 4
+DEFAULT_RESOURCES_PER_REPOSITORY = 250
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 42
+DEFAULT_PAIR_SAMPLE = 2000
+DEFAULT_MATCH_SAMPLE = 2000
+
+DOC_ID = 'benchmark'
+API_KEY = 'benchmark-key'
+
+# Como cada recurso do RSS aparece no Grist, e o método de comparação esperado
+SCENARIOS = {
+    'tag': (0.50, 'tag_exact'),                     # registro com a mesma tag
+    'title': (0.15, 'title_normalized_exact'),      # sem tag, título com outra caixa/acentos/pontuação
+    'similar': (0.15, 'title_similarity'),          # sem tag, título com erros de digitação
+    'missing': (0.20, None),                        # fora do Grist
+}
+# Registros do Grist que não estão em nenhum IPT (fração do tamanho)
+GRIST_EXTRA_RATIO = 0.10
+
+COLLECTIONS = [
+    'Coleção de {taxon}', 'Coleção Zoológica de {taxon}', 'Coleção Científica de {taxon}',
+    '{taxon} Collection', 'Acervo de {taxon}', 'Coleção de Referência de {taxon}'
+]
+TAXA = [
+    'Peixes', 'Aves', 'Anfíbios', 'Répteis', 'Mamíferos', 'Insetos', 'Aracnídeos', 'Crustáceos', 'Moluscos',
+    'Briófitas', 'Pteridófitas', 'Fungos', 'Líquens', 'Algas', 'Diptera', 'Hymenoptera', 'Coleoptera',
+    'Lepidoptera', 'Odonata', 'Hemiptera', 'Orthoptera', 'Trichoptera', 'Ephemeroptera', 'Plecoptera',
+    'Cnidários', 'Equinodermos', 'Poríferos', 'Anelídeos', 'Nematódeos', 'Plantas Vasculares'
+]
+INSTITUTIONS = [
+    'Universidade Federal de {state}', 'Universidade Estadual de {state}', 'Museu de História Natural de {state}',
+    'Instituto de Pesquisas Ambientais de {state}', 'Herbário da Universidade Federal de {state}',
+    'Jardim Botânico de {state}', 'Fundação de Amparo à Pesquisa de {state}', 'Instituto Federal de {state}'
+]
+STATES = [
+    'Acre', 'Alagoas', 'Amapá', 'Amazonas', 'Bahia', 'Ceará', 'Distrito Federal', 'Espírito Santo', 'Goiás',
+    'Maranhão', 'Mato Grosso', 'Mato Grosso do Sul', 'Minas Gerais', 'Pará', 'Paraíba', 'Paraná', 'Pernambuco',
+    'Piauí', 'Rio de Janeiro', 'Rio Grande do Norte', 'Rio Grande do Sul', 'Rondônia', 'Roraima',
+    'Santa Catarina', 'São Paulo', 'Sergipe', 'Tocantins'
+]
+CAMPI = [
+    '', '', '', 'Campus Pantanal', 'Campus Litoral', 'Campus Sertão', 'Campus Cerrado', 'Campus Serra',
+    'Campus Agreste', 'Campus Oeste', 'Campus Norte', 'Campus Sul', 'Campus Capital', 'Campus Vale',
+    'Campus Planalto', 'Campus Araguaia', 'Campus Xingu', 'Campus Tapajós', 'Campus Caatinga', 'Campus Mata'
+]
+
+def _strip_accents(text):
+    return ''.join(
+        char for char in unicodedata.normalize('NFD', text) if unicodedata.category(char) != 'Mn'
+    )
+
+def _acronym(text):
+    words = [word for word in _strip_accents(text).replace('-', ' ').split() if word[0].isupper()]
+    return ''.join(word[0] for word in words)[:6]
+
+def _version_suffix(rng):
+    major, minor = rng.randint(1, 12), rng.randint(0, 30)
+    return rng.choice([f' - Version {major}.{minor}', f' Version {major}.{minor}', f' v{major}.{minor}', ''])
+
+def _title_variant(rng, title):
+    """Mesmo título após a normalização: caixa, acentos, pontuação ou espaços diferentes."""
+    variant = rng.choice([str.upper, str.lower, _strip_accents, lambda t: t.replace(' da ', ', da ') + '.'])(title)
+    return variant.replace(' ', '  ', 1) if rng.random() < 0.3 else variant
+
+def _with_typos(rng, title):
+    """Título com alguns erros de digitação (razão de SequenceMatcher ainda acima do limiar)."""
+    characters = list(title)
+    for _ in range(max(1, len(characters) // 60)):
+        position = rng.randrange(1, len(characters) - 1)
+        edit = rng.random()
+        if edit < 0.4:
+            del characters[position]
+        elif edit < 0.7:
+            characters[position], characters[position + 1] = characters[position + 1], characters[position]
+        else:
+            characters[position] = rng.choice('aeiourstn')
+    return ''.join(characters)
+
+def generate_catalogue(size, resources_per_repository=DEFAULT_RESOURCES_PER_REPOSITORY, seed=DEFAULT_SEED):
+    """
+    Gera `size` recursos de IPT (repositorio, tag, title, pub_date, scenario)
+    e os registros correspondentes da tabela Datasets do Grist, conforme
+    SCENARIOS. Retorna (recursos, registros do Grist).
+    """
+    rng = random.Random(seed)
+    repositories = [f'ipt{number:04d}' for number in range(max(1, -(-size // resources_per_repository)))]
+    scenarios = rng.choices(list(SCENARIOS), [weight for weight, _ in SCENARIOS.values()], k=size)
+    base_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    names = set()
+    resources = []
+    while len(resources) < size:
+        institution = rng.choice(INSTITUTIONS).format(state=rng.choice(STATES))
+        campus = rng.choice(CAMPI)
+        collection = rng.choice(COLLECTIONS).format(taxon=rng.choice(TAXA))
+        name = f"{collection} da {institution}" + (f" / {campus}" if campus else '')
+        if name in names:
+            continue
+        names.add(name)
+        position = len(resources)
+        acronym = _acronym(institution) + '-' + _acronym(collection)
+        resources.append({
+            'repositorio': repositories[position % len(repositories)],
+            'tag': f"{acronym.lower().replace('-', '_')}_{position}",
+            'nome': f"{acronym} - {name}",
+            'pub_date': format_datetime(base_date + timedelta(minutes=rng.randint(0, 500000))),
+            'scenario': scenarios[position]
+        })
+
+    grist_records = []
+    for resource in resources:
+        resource['title'] = resource['nome'] + _version_suffix(rng)
+        scenario = resource['scenario']
+        if scenario == 'tag':
+            fields = {'tag': resource['tag'], 'nome': resource['nome'] if rng.random() < 0.5 else _with_typos(rng, resource['nome'])}
+        elif scenario == 'title':
+            fields = {'tag': '', 'nome': _title_variant(rng, resource['nome'])}
+        elif scenario == 'similar':
+            fields = {'tag': '', 'nome': _with_typos(rng, resource['nome'])}
+        else:
+            continue
+        grist_records.append(fields)
+
+    # Registros só do Grist: outras coleções (quase iguais às do catálogo, por vezes)
+    for number in range(int(size * GRIST_EXTRA_RATIO)):
+        institution = rng.choice(INSTITUTIONS).format(state=rng.choice(STATES))
+        collection = rng.choice(COLLECTIONS).format(taxon=rng.choice(TAXA))
+        grist_records.append({'tag': f'extra_{number}', 'nome': f"{collection} do acervo histórico da {institution}"})
+
+    rng.shuffle(grist_records)
+    return resources, [{'id': number, 'fields': fields} for number, fields in enumerate(grist_records, 1)]
+
+def render_feed(resources, base_url):
+    """RSS (rss.do) de um repositório com os `resources`."""
+    items = []
+    for resource in resources:
+        link = f"{base_url}resource?r={resource['tag']}"
+        items.append(
+            '<item>'
+            f"<title>{escape(resource['title'])}</title>"
+            f'<link>{escape(link)}</link>'
+            f"<guid>{escape(link)}&amp;v=1.0</guid>"
+            f"<description>{escape(resource['nome'])}: registros de ocorrência da coleção.</description>"
+            f"<pubDate>{resource['pub_date']}</pubDate>"
+            '</item>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel><title>IPT</title>' + ''.join(items) + '</channel></rss>'
+    ).encode('utf-8')
+
+class _StandInServer:
+    """Servidor HTTP local em uma thread, em uma porta livre."""
+
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def _send(handler, status, body, content_type):
+    handler.send_response(status)
+    handler.send_header('Content-Type', content_type)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+class FeedServers:
+    """Os feeds rss.do dos repositórios, distribuídos entre `hosts` servidores locais."""
+
+    def __init__(self, resources, hosts=DEFAULT_HOSTS):
+        feeds = {}
+        by_repository = {}
+        for resource in resources:
+            by_repository.setdefault(resource['repositorio'], []).append(resource)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = feeds.get(urlsplit(self.path).path)
+                if body is None:
+                    _send(self, 404, b'', 'text/plain')
+                else:
+                    _send(self, 200, body, 'application/rss+xml; charset=utf-8')
+
+        self.servers = [_StandInServer(Handler) for _ in range(max(1, hosts))]
+        self.ipts = []
+        for position, (repository, repository_resources) in enumerate(sorted(by_repository.items())):
+            server = self.servers[position % len(self.servers)]
+            base_url = f"{server.url}/{repository}/"
+            feeds[f"/{repository}/rss.do"] = render_feed(repository_resources, base_url)
+            self.ipts.append({
+                'repositorio': repository,
+                'base_url': base_url,
+                'rss_url': f"{base_url}rss.do",
+                'kingdom_hint': 'Animalia'
+            })
+        self.feed_bytes = sum(len(body) for body in feeds.values())
+
+    def close(self):
+        for server in self.servers:
+            server.close()
+
+class GristStandIn:
+    """API do Grist (endpoint SQL, /records e /columns) sobre um SQLite em memória."""
+
+    def __init__(self, records):
+        database = sqlite3.connect(':memory:', check_same_thread=False)
+        database.execute('CREATE TABLE "Datasets" (id INTEGER PRIMARY KEY, tag TEXT, nome TEXT)')
+        database.executemany(
+            'INSERT INTO "Datasets" (id, tag, nome) VALUES (?, ?, ?)',
+            ((record['id'], record['fields']['tag'], record['fields']['nome']) for record in records)
+        )
+        lock = threading.Lock()
+        self.requests = {'sql': 0, 'records': 0}
+        stats = self.requests
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, payload, status=200):
+                _send(self, status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+            def do_POST(self):
+                if not self.path.endswith('/sql'):
+                    return self._json({'error': 'not found'}, 404)
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if not request['sql'].lstrip().upper().startswith('SELECT'):
+                    return self._json({'error': 'only SELECT'}, 400)
+                with lock:
+                    stats['sql'] += 1
+                    cursor = database.execute(request['sql'], request.get('args', []))
+                    columns = [column[0] for column in cursor.description]
+                    rows = [{'fields': dict(zip(columns, row))} for row in cursor.fetchall()]
+                self._json({'statement': request['sql'], 'records': rows})
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if path.endswith('/columns'):
+                    return self._json({'columns': [
+                        {'id': 'tag', 'fields': {'label': 'tag', 'type': 'Text'}},
+                        {'id': 'nome', 'fields': {'label': 'nome', 'type': 'Text'}}
+                    ]})
+                with lock:
+                    stats['records'] += 1
+                    rows = database.execute('SELECT id, tag, nome FROM "Datasets" ORDER BY id').fetchall()
+                self._json({'records': [{'id': row[0], 'fields': {'tag': row[1], 'nome': row[2]}} for row in rows]})
+
+        self.server = _StandInServer(Handler)
+        self.url = self.server.url
+
+    def close(self):
+        self.server.close()
+
+def measure(function, repeat):
+    """Executa `function` `repeat` vezes; retorna os tempos (s) e o resultado da última execução."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+def timing_result(timings, items):
+    best = min(timings)
+    return {
+        'items': items,
+        'best_seconds': round(best, 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'items_per_second': round(items / best, 1) if best else None
+    }
+
+def _download_feed(ipt, session=None):
+    response = session.get(ipt['rss_url'], timeout=60)
+    response.raise_for_status()
+    return response.content
+
+def accuracy_summary(resources):
+    """Método obtido x método esperado pelo cenário de cada recurso."""
+    confusion = {}
+    correct = 0
+    for resource in resources:
+        expected = SCENARIOS[resource['scenario']][1]
+        actual = resource.get('match_method')
+        key = f"{expected or 'missing'} -> {actual or 'missing'}"
+        confusion[key] = confusion.get(key, 0) + 1
+        correct += actual == expected
+    missing_expected = sum(1 for resource in resources if resource['scenario'] == 'missing')
+    false_matches = sum(
+        1 for resource in resources if resource['scenario'] == 'missing' and resource.get('match_method')
+    )
+    return {
+        'correct_ratio': round(correct / len(resources), 4) if resources else None,
+        'missing_false_match_ratio': round(false_matches / missing_expected, 4) if missing_expected else None,
+        'confusion': dict(sorted(confusion.items()))
+    }
+
+def run_size(size, args):
+    """Todas as etapas para um catálogo de `size` recursos."""
+    catalogue, grist_records = generate_catalogue(size, args.resources_per_repository, args.seed)
+    feeds = FeedServers(catalogue, args.hosts)
+    grist = GristStandIn(grist_records)
+    scenario_by_key = {(resource['repositorio'], resource['tag']): resource['scenario'] for resource in catalogue}
+    stages = {}
+    try:
+        # fetch: download dos feeds (coleta concorrente) e sincronização completa do Grist
+        timings, bodies = measure(lambda: {
+            result['position']: result['resources']
+            for result in harvest_feeds(feeds.ipts, _download_feed, args.max_workers, args.per_host)
+        }, args.repeat)
+        stages['fetch_feeds'] = timing_result(timings, len(feeds.ipts))
+        stages['fetch_feeds']['bytes'] = feeds.feed_bytes
+
+        def sync_full():
+            mirror = GristMirror(':memory:')
+            stats = sync_grist_mirror(mirror, DOC_ID, API_KEY, base_url=grist.url, page_size=args.grist_page_size)
+            return mirror, stats
+        timings, (mirror, sync_stats) = measure(sync_full, args.repeat)
+        stages['fetch_grist'] = timing_result(timings, len(grist_records))
+        stages['fetch_grist']['pages'] = sync_stats['pages']
+        timings, resync_stats = measure(lambda: sync_grist_mirror(
+            mirror, DOC_ID, API_KEY, base_url=grist.url, page_size=args.grist_page_size
+        ), args.repeat)
+        stages['fetch_grist_resync'] = timing_result(timings, len(grist_records))
+        stages['fetch_grist_resync']['changed'] = resync_stats['changed']
+
+        # parse: interpretação dos feeds já baixados
+        def parse_all():
+            return [
+                resource
+                for position, ipt in enumerate(feeds.ipts)
+                for resource in parse_ipt_resources(bodies[position], ipt, RSS_SKIPPED_FIELDS) or ()
+            ]
+        timings, resources = measure(parse_all, args.repeat)
+        stages['parse'] = timing_result(timings, len(resources))
+
+        # harvest: download + parse em streaming, como na execução real
+        timings, harvested = measure(lambda: sum(
+            len(result['resources'] or ()) for result in harvest_ipt_resources(feeds.ipts, args.max_workers, args.per_host)
+        ), args.repeat)
+        stages['harvest_streaming'] = timing_result(timings, harvested)
+
+        # normalize: chaves de comparação dos títulos do RSS e dos nomes do Grist
+        grist_names = [record['fields']['nome'] for record in grist_records]
+        timings, _ = measure(lambda: (
+            [similarity_key(resource['title']) for resource in resources],
+            [normalize_text_for_comparison(name) for name in grist_names]
+        ), args.repeat)
+        stages['normalize'] = timing_result(timings, len(resources) + len(grist_names))
+
+        # index: índice de trigramas dos nomes do Grist
+        def build_index():
+            index = TitleIndex(DEFAULT_THRESHOLD)
+            for normalized_title, info in mirror.titles():
+                index.add(normalized_title, (normalized_title, info))
+            return index
+        timings, index = measure(build_index, args.repeat)
+        stages['index'] = timing_result(timings, len(index))
+
+        # match: find_missing_resources completo (tag, título exato e similaridade), sem a saída no console
+        rng = random.Random(args.seed)
+        if args.match_sample and args.match_sample < len(resources):
+            match_resources = rng.sample(resources, args.match_sample)
+        else:
+            match_resources = resources
+
+        def match():
+            copies = [dict(resource) for resource in match_resources]
+            with contextlib.redirect_stdout(io.StringIO()):
+                missing = find_missing_resources(copies, mirror)
+            return copies, missing
+        timings, (matched, missing) = measure(match, args.repeat)
+        stages['match'] = timing_result(timings, len(matched))
+        stages['match']['missing'] = len(missing)
+        stages['match']['sampled_from'] = len(resources)
+
+        # Custo por par de titles_are_similar e a estimativa da comparação exaustiva de antes
+        pairs = [
+            (rng.choice(resources)['title'], rng.choice(grist_names))
+            for _ in range(min(args.pair_sample, len(resources) * len(grist_names)))
+        ]
+        timings, _ = measure(lambda: [titles_are_similar(a, b, DEFAULT_THRESHOLD) for a, b in pairs], args.repeat)
+        per_pair = min(timings) / len(pairs)
+        # Recursos que a comparação exaustiva percorreria (sem tag nem título exato), extrapolados da amostra
+        unresolved = sum(1 for resource in matched if resource.get('match_method') in (None, 'title_similarity'))
+        unresolved *= len(resources) / len(matched)
+        stages['similarity_pairwise'] = timing_result(timings, len(pairs))
+        stages['similarity_pairwise']['exhaustive_estimate_seconds'] = round(per_pair * unresolved * len(grist_names), 3)
+    finally:
+        feeds.close()
+        grist.close()
+
+    for resource in matched:
+        resource['scenario'] = scenario_by_key[(resource['repositorio'], resource['tag'])]
+    return {
+        'corpus': {
+            'resources': len(catalogue),
+            'repositories': len(feeds.ipts),
+            'hosts': len(feeds.servers),
+            'grist_records': len(grist_records),
+            'scenarios': {name: sum(1 for r in catalogue if r['scenario'] == name) for name in SCENARIOS}
+        },
+        'stages': stages,
+        'grist_requests': grist.requests,
+        'accuracy': accuracy_summary(matched)
+    }
+
+def compare_results(current, baseline):
+    """Razão de vazão (atual / referência) de cada etapa presente nos dois resultados."""
+    ratios = {}
+    for size, result in current.get('results', {}).items():
+        previous_result = baseline.get('results', {}).get(size, {})
+        for stage, timing in result.get('stages', {}).items():
+            previous = previous_result.get('stages', {}).get(stage, {})
+            if timing.get('items_per_second') and previous.get('items_per_second'):
+                ratios[f"{size}.{stage}"] = round(timing['items_per_second'] / previous['items_per_second'], 3)
+    return ratios
+
+def parse_args(argv=None):
+    """Lê os argumentos de linha de comando."""
+    parser = argparse.ArgumentParser(description="Benchmark da conciliação IPTs x Grist com catálogo sintético")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"Tamanhos do catálogo, separados por vírgula (padrão: {DEFAULT_SIZES})")
+    parser.add_argument('--hosts', type=int, default=DEFAULT_HOSTS,
+                        help=f"Servidores locais entre os quais os feeds são distribuídos (padrão: {DEFAULT_HOSTS})")
+    parser.add_argument('--resources-per-repository', type=int, default=DEFAULT_RESOURCES_PER_REPOSITORY,
+                        help=f"Recursos por feed rss.do (padrão: {DEFAULT_RESOURCES_PER_REPOSITORY})")
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Requisições simultâneas da coleta (padrão: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f"Requisições simultâneas por host (padrão: {DEFAULT_PER_HOST})")
+    parser.add_argument('--grist-page-size', type=int, default=500,
+                        help="Linhas por página na sincronização do Grist (padrão: 500)")
+    parser.add_argument('--match-sample', type=int, default=DEFAULT_MATCH_SAMPLE,
+                        help=f"Recursos (amostra aleatória) comparados na etapa match; 0 = todos (padrão: {DEFAULT_MATCH_SAMPLE})")
+    parser.add_argument('--pair-sample', type=int, default=DEFAULT_PAIR_SAMPLE,
+                        help=f"Pares medidos com titles_are_similar (padrão: {DEFAULT_PAIR_SAMPLE})")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"Repetições de cada medição (padrão: {DEFAULT_REPEAT})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f"Semente do gerador (padrão: {DEFAULT_SEED})")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="Resultado JSON anterior para comparar a vazão")
+    parser.add_argument('--output', metavar='PATH',
+                        help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+    try:
+        args.sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        parser.error("--sizes deve ser uma lista de inteiros separados por vírgula")
+    if not args.sizes or min(args.sizes) < 1:
+        parser.error("--sizes deve ter ao menos um tamanho positivo")
+    return args
+
+def main(argv=None):
+    """Função principal do script."""
+    args = parse_args(argv)
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'parameters': {
+            'sizes': args.sizes,
+            'hosts': args.hosts,
+            'resources_per_repository': args.resources_per_repository,
+            'max_workers': args.max_workers,
+            'per_host': args.per_host,
+            'grist_page_size': args.grist_page_size,
+            'match_sample': args.match_sample,
+            'threshold': DEFAULT_THRESHOLD,
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'results': {}
+    }
+    for size in args.sizes:
+        print(f"Catálogo de {size} recursos...", file=sys.stderr)
+        report['results'][str(size)] = run_size(size, args)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            report['comparison'] = compare_results(report, json.load(baseline_file))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    sys.exit(main())
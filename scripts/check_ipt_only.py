@@ -9,12 +9,15 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from check_ipt_resources import (
     load_ipts_from_csv, 
-    fetch_ipt_rss_data, 
-    parse_ipt_resources,
+    harvest_ipt_resources,
+    unique_ipts,
     occurrences_csv_path
 )
+from host_health import open_host_health_from_env
+from http_cache import open_http_cache_from_env
+from resource_inventory import open_resource_inventory_from_env, record_harvest
 
-def main():
+def check_ipts(http_cache=None, inventory=None, health=None):
     print("=== TESTE DE BUSCA DE RECURSOS DOS IPTs ===\n")
     
     # Carregar IPTs
@@ -26,39 +29,30 @@ def main():
         return
     
     # Remover duplicatas
-    seen = set()
-    unique_ipts = []
-    for ipt in ipts:
-        key = (ipt['repositorio'], ipt['base_url'])
-        if key not in seen:
-            seen.add(key)
-            unique_ipts.append(ipt)
+    ipts = unique_ipts(ipts)
     
-    print(f"IPTs únicos encontrados: {len(unique_ipts)}\n")
+    print(f"IPTs únicos encontrados: {len(ipts)}\n")
     
-    # Buscar recursos de todos os IPTs
+    # Buscar recursos de todos os IPTs em paralelo, mostrando cada um ao terminar
     all_resources = []
-    ipt_stats = {}
+    resources_by_repo = {}
+    ipt_stats = {ipt['repositorio']: {'recursos': 0, 'erro': True} for ipt in ipts}
     
-    for i, ipt in enumerate(unique_ipts, 1):
-        repo = ipt['repositorio']
-        rss_url = ipt['rss_url']
-        
-        print(f"[{i:2d}/{len(unique_ipts)}] Processando {repo}...")
+    for i, result in enumerate(harvest_ipt_resources(ipts, cache=http_cache, health=health), 1):
+        repo = result['ipt']['repositorio']
         
-        rss_content = fetch_ipt_rss_data(rss_url, repo)
+        print(f"[{i:2d}/{len(ipts)}] {repo} ({result['elapsed']:.1f}s)")
         
-        if not rss_content:
+        if result['resources'] is None:
             print(f"    ERRO: Falha ao buscar RSS")
-            ipt_stats[repo] = {'recursos': 0, 'erro': True}
             continue
         
-        resources = parse_ipt_resources(rss_content, ipt)
-        resource_count = len(resources)
+        resource_count = len(result['resources'])
         
         print(f"    ✓ {resource_count} recursos encontrados")
         
-        all_resources.extend(resources)
+        all_resources.extend(result['resources'])
+        resources_by_repo.setdefault(repo, []).extend(result['resources'])
         ipt_stats[repo] = {'recursos': resource_count, 'erro': False}
     
     # Estatísticas finais
@@ -69,6 +63,11 @@ def main():
     print(f"IPTs processados com sucesso: {sum(1 for s in ipt_stats.values() if not s['erro'])}")
     print(f"IPTs com erro: {sum(1 for s in ipt_stats.values() if s['erro'])}")
     
+    # Snapshot da coleta no inventário persistente (ver resource_inventory.py)
+    if inventory:
+        print()
+        record_harvest(inventory, resources_by_repo, source='check_ipt_only')
+    
     print(f"\nRecursos por IPT:")
     for repo, stats in ipt_stats.items():
         if stats['erro']:
@@ -87,5 +86,22 @@ def main():
     
     print(f"\nProcessamento concluído!")
 
+def main():
+    http_cache = open_http_cache_from_env()
+    inventory = open_resource_inventory_from_env()
+    # No modo offline nada vai para a rede: os hosts não são avaliados
+    health = None if http_cache and http_cache.offline else open_host_health_from_env()
+    try:
+        check_ipts(http_cache, inventory, health)
+    finally:
+        if health:
+            print(f"Saúde dos hosts: {health.summary()}")
+            health.save()
+        if inventory:
+            inventory.close()
+        if http_cache:
+            print(f"Cache HTTP: {http_cache.summary()}")
+            http_cache.close()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,21 +7,32 @@ Este script compara recursos de biodiversidade entre múltiplas fontes:
 2. Base de dados Grist (tabela Datasets)
 
 Funcionalidades principais:
-- Consulta lista fixa de IPTs específicos (JBRJ/Jabot, CRIA, JBRJ/Reflora)
+- Consulta lista fixa de IPTs específicos (JBRJ/Jabot, CRIA, JBRJ/Reflora) ou, com
+  IPT_SOURCE=csv, todos os IPTs do CSV de referências (IPT_CSV_FILE, padrão
+  referencias/occurrences.csv)
 - Busca recursos dos RSS feeds dos IPTs configurados
 - Extrai tags dos recursos a partir dos links do RSS
-- Interpreta kingdom baseado no nome/título do repositório
+- Interpreta kingdom baseado no nome/título do repositório (palavras-chave em
+  kingdom_classifier.py e referencias/kingdomKeywords.json, ou KINGDOM_KEYWORDS_FILE)
 - Compara com registros existentes na tabela Datasets do Grist
 - Identifica recursos dos IPTs que não estão presentes no Grist
-- Gera relatórios consolidados em formato CSV e TSV com recursos faltantes
+- Gera relatórios consolidados (CSV e TSV por padrão; também JSONL, Parquet e Arrow) com recursos faltantes
 - Exibe estatísticas de cobertura por IPT e consolidadas
 
 Pré-requisitos:
 - Variáveis de ambiente: GRIST_API_KEY e GRIST_DOC_ID
 - Conexão com internet para acessar RSS feeds e API do Grist
+  (ou HTTP_CACHE_OFFLINE=1 para usar apenas as respostas do cache, ver http_cache.py)
+- A tabela Datasets é sincronizada para um espelho SQLite local (ver grist_mirror.py)
+- Cada coleta é gravada como snapshot no inventário de recursos (ver resource_inventory.py)
+- Hosts fora do ar são pulados até o cool-down vencer (ver host_health.py)
+- Formatos dos relatórios: IPT_REPORT_FORMATS (faltantes, padrão csv,tsv) e
+  IPT_INVENTORY_REPORT_FORMATS (inventário completo com método e score da comparação),
+  entre csv, tsv, jsonl, parquet e arrow (os dois últimos precisam do pyarrow)
 
 Uso: python check_ipt_resources.py
 """
+import io
 import os
 import requests
 import xml.etree.ElementTree as ET
@@ -29,8 +40,20 @@ import csv
 import json
 import re
 from datetime import datetime
-import unicodedata
-from difflib import SequenceMatcher
+from functools import partial
+
+from grist_mirror import (
+    DEFAULT_BASE_URL, GristMirror, docs_url, mirror_from_records, open_grist_mirror_from_env, sync_grist_mirror_from_env
+)
+from http_cache import open_http_cache_from_env
+from kingdom_classifier import open_kingdom_classifier_from_env
+from host_health import open_host_health_from_env
+from ipt_harvester import DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST, harvest_feeds, host_of
+from report_writer import FORMATS, ReportWriter, parse_formats
+from resource_inventory import open_resource_inventory_from_env, record_harvest
+from title_matcher import (
+    DEFAULT_THRESHOLD, TitleIndex, normalize_text_for_comparison, remove_version_from_title, similarity_key, similarity_ratio
+)
 
 # Tentar carregar variáveis de ambiente de .env se disponível
 try:
@@ -65,21 +88,41 @@ IPTS_ESPECIFICOS = [
 grist_api_key = os.getenv('GRIST_API_KEY', '')
 doc_id = os.getenv('GRIST_DOC_ID', '')
 table_id = 'Datasets'
-api_url = f'https://docs.getgrist.com/api/docs/{doc_id}/tables/{table_id}/records'
-columns_url = f'https://docs.getgrist.com/api/docs/{doc_id}/tables/{table_id}/columns'
+grist_base_url = os.getenv('GRIST_BASE_URL', '') or DEFAULT_BASE_URL
+columns_url = f'{docs_url(grist_base_url, doc_id)}/tables/{table_id}/columns'
+
+# Origem da lista de IPTs: 'especificos' (IPTS_ESPECIFICOS) ou 'csv' (IPT_CSV_FILE)
+IPT_SOURCES = ('especificos', 'csv')
+ipt_source = os.getenv('IPT_SOURCE', '') or 'especificos'
+
+# Campos do RSS que a comparação não usa; descartados durante o parse em streaming
+RSS_SKIPPED_FIELDS = ('description',)
+
+# Palavras-chave de kingdom (padrão + referencias/kingdomKeywords.json), compiladas uma única vez
+kingdom_classifier = open_kingdom_classifier_from_env()
+
+# Tamanho dos blocos entregues ao parser XML
+RSS_CHUNK_SIZE = 64 * 1024
+
+# Recursos conhecidos de todos os IPTs (nome, repositorio, kingdom, tag, url)
+occurrences_csv_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'packages', 'ingest', 'referencias', 'occurrences.csv'
+)
 
-def fetch_grist_data(url, api_key):
-    """Faz requisição à API do Grist"""
+def fetch_grist_data(url, api_key, cache=None):
+    """Faz requisição à API do Grist (condicional, se houver cache)"""
     headers = {
         'Authorization': f'Bearer {api_key}',
         'Content-Type': 'application/json'
     }
     
     try:
+        if cache:
+            return json.loads(cache.get(url, headers=headers))
         response = requests.get(url, headers=headers)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Erro ao buscar dados do Grist: {e}")
         return None
 
@@ -87,16 +130,98 @@ def get_ipts_especificos():
     """Retorna lista específica de IPTs para consultar"""
     return IPTS_ESPECIFICOS.copy()
 
-def fetch_ipt_rss_data(rss_url, repo_name=''):
-    """Busca dados do RSS do IPT"""
+def load_ipts_from_csv(csv_path):
+    """Carrega os IPTs (um por recurso) do CSV de referências"""
+    ipts = []
+    try:
+        with open(csv_path, newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                base_url = (row.get('url') or '').strip()
+                if not base_url:
+                    continue
+                if not base_url.endswith('/'):
+                    base_url += '/'
+                ipts.append({
+                    'repositorio': (row.get('repositorio') or '').strip(),
+                    'base_url': base_url,
+                    'rss_url': f'{base_url}rss.do',
+                    'kingdom_hint': (row.get('kingdom') or '').strip() or 'Animalia'
+                })
+    except OSError as e:
+        print(f"Erro ao ler {csv_path}: {e}")
+        return []
+    return ipts
+
+def unique_ipts(ipts):
+    """Remove IPTs repetidos (mesmo repositorio e base_url), mantendo a ordem"""
+    seen = set()
+    unique = []
+    for ipt in ipts:
+        key = (ipt['repositorio'], ipt['base_url'])
+        if key not in seen:
+            seen.add(key)
+            unique.append(ipt)
+    return unique
+
+def load_configured_ipts():
+    """IPTs da origem em IPT_SOURCE: a lista específica ou os do CSV de referências, sem repetições"""
+    if ipt_source not in IPT_SOURCES:
+        raise ValueError(f"IPT_SOURCE inválida: '{ipt_source}' (esperado: {', '.join(IPT_SOURCES)})")
+    if ipt_source == 'csv':
+        return unique_ipts(load_ipts_from_csv(os.getenv('IPT_CSV_FILE', '') or occurrences_csv_path))
+    return get_ipts_especificos()
+
+def fetch_ipt_rss_data(rss_url, repo_name='', session=None, cache=None, timeout=30):
+    """Busca dados do RSS do IPT (com a Session do host e o cache, se informados)"""
     try:
-        response = requests.get(rss_url, timeout=30)
+        if cache:
+            return cache.get(rss_url, session=session, timeout=timeout)
+        response = (session or requests).get(rss_url, timeout=timeout)
         response.raise_for_status()
         return response.text
     except requests.exceptions.RequestException as e:
         print(f"Erro ao buscar RSS do IPT {repo_name} ({rss_url}): {e}")
         return None
 
+def stream_ipt_resources(rss_url, ipt_info=None, session=None, skip_fields=RSS_SKIPPED_FIELDS, timeout=30):
+    """Baixa o RSS em streaming, gerando os recursos enquanto o corpo da resposta chega"""
+    response = (session or requests).get(rss_url, timeout=timeout, stream=True)
+    with response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        yield from iter_ipt_resources(response.raw, ipt_info, skip_fields)
+
+def load_ipt_resources(ipt, session=None, cache=None, skip_fields=RSS_SKIPPED_FIELDS, health=None):
+    """Recursos do RSS de um IPT, ou None se o feed não pôde ser obtido ou interpretado
+    O parse acontece durante o download; com cache, o corpo novo é gravado enquanto é lido
+    e o corpo guardado (304) é lido do cache em blocos
+    Com `health` (ver host_health.py), usa os timeouts separados, as novas tentativas e o circuito do host
+    """
+    repo = ipt.get('repositorio', '')
+    rss_url = ipt['rss_url']
+    
+    def load(timeout):
+        if cache:
+            with cache.open_stream(rss_url, session=session, timeout=timeout) as source:
+                return classify_ipt_resources(list(iter_ipt_resources(source, ipt, skip_fields)), ipt)
+        return classify_ipt_resources(list(stream_ipt_resources(rss_url, ipt, session, skip_fields, timeout)), ipt)
+    
+    try:
+        if health:
+            return health.call(host_of(rss_url), load)
+        return load(30)
+    except requests.exceptions.RequestException as e:
+        print(f"Erro ao buscar RSS do IPT {repo} ({rss_url}): {e}")
+        return None
+    except ET.ParseError as e:
+        # Feed ilegível (uma página HTML de manutenção, por exemplo) é falha, não um IPT sem recursos
+        print(f"Erro ao parsear RSS XML do IPT {repo} ({rss_url}): {e}")
+        return None
+
+def harvest_ipt_resources(ipts, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST, cache=None, health=None):
+    """Busca e interpreta os RSS dos IPTs em paralelo, gerando os resultados à medida que terminam"""
+    return harvest_feeds(ipts, partial(load_ipt_resources, cache=cache, health=health), max_workers, per_host)
+
 def extract_tag_from_link(link):
     """Extrai a tag da URL do link RSS
     Exemplo: https://ipt.jbrj.gov.br/jabot/resource?r=hhm -> retorna 'hhm'
@@ -112,97 +237,109 @@ def extract_tag_from_link(link):
     return ''
 
 def interpret_kingdom_from_title(title, repositorio, default_kingdom):
-    """Interpreta o kingdom baseado no título do recurso e repositório"""
-    if not title:
-        return default_kingdom
-    
-    title_lower = title.lower()
-    
-    # Palavras-chave para diferentes kingdoms
-    plantae_keywords = [
-        'flora', 'plant', 'botanic', 'herb', 'tree', 'flower', 'leaf', 'seed',
-        'pollen', 'algae', 'moss', 'fern', 'grass', 'fungi', 'mushroom',
-        'lichen', 'bryophyte', 'pteridophyte', 'gymnosperm', 'angiosperm'
-    ]
-    
-    animalia_keywords = [
-        'fauna', 'animal', 'bird', 'mammal', 'fish', 'insect', 'beetle',
-        'butterfly', 'spider', 'reptile', 'amphibian', 'mollusk', 'arthropod',
-        'vertebrate', 'invertebrate', 'zoo'
-    ]
-    
-    # Verificar palavras-chave no título
-    for keyword in plantae_keywords:
-        if keyword in title_lower:
-            return 'Plantae'
+    """Interpreta o kingdom baseado no título do recurso e repositório (ver kingdom_classifier.py)"""
+    kingdom, _ = kingdom_classifier.classify(title, default_kingdom)
+    return kingdom
+
+def resource_from_item(item, ipt_info=None):
+    """Monta o recurso a partir de um elemento <item> do RSS"""
+    title_elem = item.find('title')
+    link_elem = item.find('link')
+    guid_elem = item.find('guid')
+    description_elem = item.find('description')
+    pub_date_elem = item.find('pubDate')
+    
+    title = title_elem.text if title_elem is not None else ''
+    link = link_elem.text if link_elem is not None else ''
+    guid = guid_elem.text if guid_elem is not None else ''
+    description = (description_elem.text or '') if description_elem is not None else ''
+    pub_date = pub_date_elem.text if pub_date_elem is not None else ''
+    
+    # Extrair tag do link principal
+    tag = extract_tag_from_link(link)
+    
+    # Se não encontrou no link, tenta no guid
+    if not tag:
+        tag = extract_tag_from_link(guid)
+    
+    # Kingdom padrão do repositório; o do título é preenchido por feed em classify_ipt_resources
+    default_kingdom = ipt_info.get('kingdom_hint', 'Animalia') if ipt_info else 'Animalia'
+    
+    resource = {
+        'title': title,
+        'link': link,
+        'guid': guid,
+        'tag': tag,  # Nova propriedade: tag extraída do link
+        'description': description,
+        'pub_date': pub_date,
+        'kingdom': default_kingdom,  # Kingdom interpretado
+        'kingdom_evidence': ''  # Palavra-chave que o definiu
+    }
     
-    for keyword in animalia_keywords:
-        if keyword in title_lower:
-            return 'Animalia'
+    # Adicionar informações do IPT se disponível
+    if ipt_info:
+        resource.update({
+            'repositorio': ipt_info.get('repositorio', ''),
+            'base_url': ipt_info.get('base_url', '')
+        })
     
-    # Se não encontrou palavras-chave específicas, usar o padrão do repositório
-    return default_kingdom
+    return resource
 
-def parse_ipt_resources(rss_content, ipt_info=None):
-    """Extrai recursos do RSS e suas tags"""
-    resources = []
-    
+def classify_ipt_resources(resources, ipt_info=None):
+    """Preenche kingdom e kingdom_evidence dos recursos de um feed em uma única varredura do classificador"""
+    default_kingdom = ipt_info.get('kingdom_hint', 'Animalia') if ipt_info else 'Animalia'
+    return kingdom_classifier.classify_resources(resources, default_kingdom)
+
+def _resources_from_events(events, ipt_info, skip_fields):
+    open_elements = []
+    for event, elem in events:
+        if event == 'start':
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        parent = open_elements[-1] if open_elements else None
+        if elem.tag == 'item':
+            yield resource_from_item(elem, ipt_info)
+            elem.clear()
+            if parent is not None:
+                parent.remove(elem)
+        elif elem.tag in skip_fields and parent is not None and parent.tag == 'item':
+            elem.clear()
+
+def _text_events(text):
+    """Eventos do XML de um texto já em memória, alimentando o parser em blocos (sem copiar o texto)"""
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    for offset in range(0, len(text), RSS_CHUNK_SIZE):
+        parser.feed(text[offset:offset + RSS_CHUNK_SIZE])
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+def iter_ipt_resources(source, ipt_info=None, skip_fields=()):
+    """Gera os recursos do RSS à medida que cada <item> fecha, com memória constante
+    `source` é um arquivo (ou a resposta HTTP em streaming); cada <item> é descartado
+    depois de processado e os campos de `skip_fields` são esvaziados assim que lidos
+    O kingdom fica o padrão do IPT até classify_ipt_resources classificar o feed inteiro
+    """
+    return _resources_from_events(ET.iterparse(source, events=('start', 'end')), ipt_info, skip_fields)
+
+def parse_ipt_resources(rss_content, ipt_info=None, skip_fields=()):
+    """Extrai recursos do RSS e suas tags, ou None se o XML é inválido"""
+    if isinstance(rss_content, str):
+        events = _text_events(rss_content)
+    else:
+        events = ET.iterparse(io.BytesIO(rss_content), events=('start', 'end'))
     try:
-        root = ET.fromstring(rss_content)
-        
-        for item in root.findall('.//item'):
-            title_elem = item.find('title')
-            link_elem = item.find('link')
-            guid_elem = item.find('guid')
-            description_elem = item.find('description')
-            pub_date_elem = item.find('pubDate')
-            
-            title = title_elem.text if title_elem is not None else ''
-            link = link_elem.text if link_elem is not None else ''
-            guid = guid_elem.text if guid_elem is not None else ''
-            description = description_elem.text if description_elem is not None else ''
-            pub_date = pub_date_elem.text if pub_date_elem is not None else ''
-            
-            # Extrair tag do link principal
-            tag = extract_tag_from_link(link)
-            
-            # Se não encontrou no link, tenta no guid
-            if not tag:
-                tag = extract_tag_from_link(guid)
-            
-            # Determinar kingdom baseado no título e repositório
-            default_kingdom = ipt_info.get('kingdom_hint', 'Animalia') if ipt_info else 'Animalia'
-            repositorio = ipt_info.get('repositorio', '') if ipt_info else ''
-            kingdom = interpret_kingdom_from_title(title, repositorio, default_kingdom)
-            
-            resource = {
-                'title': title,
-                'link': link,
-                'guid': guid,
-                'tag': tag,  # Nova propriedade: tag extraída do link
-                'description': description,
-                'pub_date': pub_date,
-                'kingdom': kingdom  # Kingdom interpretado
-            }
-            
-            # Adicionar informações do IPT se disponível
-            if ipt_info:
-                resource.update({
-                    'repositorio': ipt_info.get('repositorio', ''),
-                    'base_url': ipt_info.get('base_url', '')
-                })
-            
-            resources.append(resource)
+        resources = list(_resources_from_events(events, ipt_info, skip_fields))
     except ET.ParseError as e:
         print(f"Erro ao parsear RSS XML: {e}")
-        return []
-    
-    return resources
+        return None
+    return classify_ipt_resources(resources, ipt_info)
 
-def get_grist_table_structure(doc_id, table_id, api_key):
+def get_grist_table_structure(doc_id, table_id, api_key, cache=None):
     """Obtém a estrutura da tabela do Grist"""
-    columns_url = f'https://docs.getgrist.com/api/docs/{doc_id}/tables/{table_id}/columns'
-    columns_data = fetch_grist_data(columns_url, api_key)
+    columns_url = f'{docs_url(grist_base_url, doc_id)}/tables/{table_id}/columns'
+    columns_data = fetch_grist_data(columns_url, api_key, cache)
     
     if not columns_data:
         return []
@@ -217,89 +354,76 @@ def get_grist_table_structure(doc_id, table_id, api_key):
     
     return columns
 
-def find_missing_resources(ipt_resources, grist_records):
+def find_missing_resources(ipt_resources, grist_mirror):
     """Encontra recursos do IPT que não estão no Grist
     Usa múltiplas estratégias de comparação: tag, título normalizado e similaridade
+    `grist_mirror` é o espelho local da tabela Datasets (ver grist_mirror.py) ou uma lista de registros da API
     """
     missing = []
     
-    # Preparar dados do GRIST para comparação
-    grist_data = {
-        'tags': set(),
-        'titles_normalized': {},  # título normalizado -> dados originais
-        'records_by_tag': {},     # tag -> registro completo
-        'records_by_title': {}    # título original -> registro completo
-    }
+    if not isinstance(grist_mirror, GristMirror):
+        grist_mirror = mirror_from_records(grist_mirror)
     
-    # Processar registros do GRIST
-    for record in grist_records:
-        fields = record.get('fields', {})
-        
-        # Processar tag
-        if 'tag' in fields and fields['tag']:
-            tag_value = str(fields['tag']).strip()
-            grist_data['tags'].add(tag_value)
-            grist_data['records_by_tag'][tag_value] = {
-                'nome': fields.get('nome', 'N/A'),
-                'record_id': record.get('id', 'N/A'),
-                'original_title': fields.get('nome', 'N/A')
-            }
-        
-        # Processar título/nome
-        if 'nome' in fields and fields['nome']:
-            original_title = str(fields['nome']).strip()
-            normalized_title = normalize_text_for_comparison(original_title)
-            
-            if normalized_title:  # Só adicionar se a normalização resultou em algo
-                grist_data['titles_normalized'][normalized_title] = {
-                    'original_title': original_title,
-                    'record_id': record.get('id', 'N/A'),
-                    'tag': fields.get('tag', 'N/A')
-                }
-                grist_data['records_by_title'][original_title] = {
-                    'nome': original_title,
-                    'record_id': record.get('id', 'N/A'),
-                    'tag': fields.get('tag', 'N/A')
-                }
-    
-    print(f"📊 Total de tags encontradas no GRIST: {len(grist_data['tags'])}")
-    print(f"📊 Total de títulos únicos no GRIST: {len(grist_data['titles_normalized'])}")
-    print(f"🏷️  Primeiras 10 tags do GRIST: {list(grist_data['tags'])[:10]}")
+    print(f"📊 Total de tags encontradas no GRIST: {grist_mirror.count_tags()}")
+    print(f"📊 Total de títulos únicos no GRIST: {grist_mirror.count_titles()}")
+    print(f"🏷️  Primeiras 10 tags do GRIST: {grist_mirror.sample_tags(10)}")
+    
+    # Índice de trigramas dos títulos do GRIST para a comparação por similaridade
+    title_index = TitleIndex(DEFAULT_THRESHOLD)
+    for grist_title_norm, grist_info in grist_mirror.titles():
+        title_index.add(grist_title_norm, (grist_title_norm, grist_info))
     
     # Verificar cada recurso do IPT
     for resource in ipt_resources:
         found = False
         match_info = []
         match_method = None
+        match_score = None
+        grist_info = {}
         
         rss_tag = resource['tag']
         rss_title = resource['title']
         rss_title_normalized = normalize_text_for_comparison(remove_version_from_title(rss_title))
         
+        # Consultas ao espelho pelos índices em tag e em nome normalizado
+        tag_info = grist_mirror.find_by_tag(rss_tag) if rss_tag else None
+        title_info = None
+        if not tag_info and rss_title_normalized:
+            title_info = grist_mirror.find_by_title(rss_title_normalized)
+        
         # Estratégia 1: Comparação exata por tag
-        if rss_tag and rss_tag in grist_data['tags']:
+        if tag_info:
             found = True
             match_method = "tag_exact"
-            grist_info = grist_data['records_by_tag'].get(rss_tag, {})
+            match_score = 1.0
+            grist_info = tag_info
             match_info.append(f"Tag exata: '{rss_tag}' -> GRIST: '{grist_info.get('nome', 'N/A')}'")
         
         # Estratégia 2: Comparação por título normalizado (igualdade exata)
-        elif rss_title_normalized and rss_title_normalized in grist_data['titles_normalized']:
+        elif title_info:
             found = True
             match_method = "title_normalized_exact"
-            grist_info = grist_data['titles_normalized'][rss_title_normalized]
+            match_score = 1.0
+            grist_info = title_info
             match_info.append(f"Título normalizado exato: '{rss_title_normalized}' -> GRIST: '{grist_info.get('original_title', 'N/A')}'")
         
-        # Estratégia 3: Comparação por similaridade de título
+        # Estratégia 3: Comparação por similaridade de título (o mais parecido acima do limiar)
         else:
-            if rss_title_normalized:
-                for grist_title_norm, grist_info in grist_data['titles_normalized'].items():
-                    if titles_are_similar(rss_title_normalized, grist_title_norm, threshold=0.90):
-                        found = True
-                        match_method = "title_similarity"
-                        similarity = calculate_similarity(rss_title_normalized, grist_title_norm)
-                        match_info.append(f"Título similar ({similarity:.2%}): '{rss_title_normalized}' ~ '{grist_title_norm}' -> GRIST: '{grist_info.get('original_title', 'N/A')}'")
-                        break
+            best = title_index.best_match(rss_title_normalized) if rss_title_normalized else None
+            if best:
+                (grist_title_norm, grist_info), similarity, _ = best
+                found = True
+                match_method = "title_similarity"
+                match_score = similarity
+                match_info.append(f"Título similar ({similarity:.2%}): '{rss_title_normalized}' ~ '{grist_title_norm}' -> GRIST: '{grist_info.get('original_title', 'N/A')}'")
+        
+        # Resultado da comparação, usado no relatório do inventário completo
+        resource.update({
+            'match_method': match_method,
+            'match_score': match_score,
+            'grist_record_id': grist_info.get('record_id'),
+            'grist_nome': grist_info.get('original_title')
+        })
         
         if not found:
             # Adicionar informação detalhada de debug para recursos não encontrados
@@ -317,47 +441,9 @@ def find_missing_resources(ipt_resources, grist_records):
     
     return missing
 
-def normalize_text_for_comparison(text):
-    """Normaliza texto para comparação, removendo acentos, espaços extras e convertendo para minúsculas"""
-    if not text:
-        return ''
-    
-    # Remover acentos e caracteres especiais
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
-    
-    # Converter para minúsculas e remover espaços extras
-    text = re.sub(r'\s+', ' ', text.lower().strip())
-    
-    # Remover pontuação comum
-    text = re.sub(r'[.,;:!?()[\]{}"\'-]', '', text)
-    
-    return text
-
-def remove_version_from_title(title):
-    """Remove a parte 'Version' do título para os arquivos de saída"""
-    if not title:
-        return ''
-    
-    # Remove padrões como "Version X.X", "Version X", "v X.X", etc.
-    # Preserva o texto antes da versão
-    patterns = [
-        r'\s+-\s+Version\s+\d+(\.\d+)*\s*$',  # " - Version 1.0", " - Version 2", etc.
-        r'\s+Version\s+\d+(\.\d+)*\s*$',      # " Version 1.0", " Version 2", etc.
-        r'\s+Version\s+\d+(\.\d+)*\s+.*$',    # " Version 1.0 something"
-        r'\s+v\d+(\.\d+)*\s*$',               # " v1.0", " v2", etc.
-        r'\s+v\.\d+(\.\d+)*\s*$',             # " v.1.0", " v.2", etc.
-    ]
-    
-    cleaned_title = title
-    for pattern in patterns:
-        cleaned_title = re.sub(pattern, '', cleaned_title, flags=re.IGNORECASE)
-    
-    return cleaned_title.strip()
-
 def calculate_similarity(text1, text2):
     """Calcula similaridade entre dois textos usando SequenceMatcher"""
-    return SequenceMatcher(None, text1, text2).ratio()
+    return similarity_ratio(text1, text2)
 
 def titles_are_similar(title1, title2, threshold=0.85):
     """Verifica se dois títulos são similares com base em normalização e similaridade"""
@@ -365,58 +451,83 @@ def titles_are_similar(title1, title2, threshold=0.85):
         return False
     
     # Normalizar ambos os títulos
-    norm_title1 = normalize_text_for_comparison(remove_version_from_title(title1))
-    norm_title2 = normalize_text_for_comparison(remove_version_from_title(title2))
+    norm_title1 = similarity_key(title1)
+    norm_title2 = similarity_key(title2)
     
     # Verificar igualdade exata após normalização
     if norm_title1 == norm_title2:
         return True
     
     # Verificar similaridade usando SequenceMatcher
-    similarity = calculate_similarity(norm_title1, norm_title2)
-    return similarity >= threshold
+    return similarity_ratio(norm_title1, norm_title2) >= threshold
+
+# Colunas do relatório de faltantes (formato de importação da tabela Datasets)
+MISSING_REPORT_FIELDS = ['nome', 'repositorio', 'kingdom', 'tag', 'url']
+
+# Colunas do relatório do inventário completo, com o resultado da comparação
+INVENTORY_REPORT_FIELDS = [
+    'repositorio', 'tag', 'title', 'nome', 'kingdom', 'kingdom_evidence', 'link', 'guid', 'pub_date', 'url',
+    'found', 'match_method', 'match_score', 'grist_record_id', 'grist_nome'
+]
+INVENTORY_REPORT_TYPES = {'found': 'bool', 'match_score': 'float', 'grist_record_id': 'int'}
+
+def report_base_path(base_filename):
+    """Nome do relatório sem a extensão (cada formato acrescenta a sua)"""
+    root, extension = os.path.splitext(base_filename)
+    return root if extension.lower().lstrip('.') in FORMATS else base_filename
 
-def create_files_from_missing(missing_resources, columns, base_filename):
-    """Cria arquivos CSV e TSV com recursos faltantes no formato específico solicitado"""
+def create_files_from_missing(missing_resources, columns, base_filename, formats=None):
+    """Cria os arquivos com recursos faltantes no formato específico solicitado
+    Todos os formatos (CSV e TSV por padrão, ou os de IPT_REPORT_FORMATS) são escritos em uma única passada
+    """
     if not missing_resources:
         print("Nenhum recurso faltante para criar arquivos")
         return
     
-    # Preparar dados
-    fieldnames = ['nome', 'repositorio', 'kingdom', 'tag', 'url']
-    rows = []
-    for resource in missing_resources:
-        # Usar o kingdom já interpretado durante o parsing
-        kingdom = resource.get('kingdom', 'Animalia')
-        
-        row = {
-            'nome': remove_version_from_title(resource['title']),  # Título sem versão
-            'repositorio': resource.get('repositorio', 'unknown'),  # Repositório do recurso
-            'kingdom': kingdom,  # Kingdom interpretado do título
-            'tag': resource['tag'],     # Tag extraída pelo script
-            'url': resource.get('base_url', '')  # URL base do IPT
-        }
-        rows.append(row)
-    
-    # Gerar arquivo CSV (delimitado por vírgula)
-    csv_filename = base_filename.replace('.csv', '.csv')  # Garantir extensão .csv
-    with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=',')
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-    print(f"📄 CSV criado (delimitado por vírgula): {csv_filename}")
-    
-    # Gerar arquivo TSV (delimitado por TAB)
-    tsv_filename = base_filename.replace('.csv', '.tsv')
-    with open(tsv_filename, 'w', newline='', encoding='utf-8') as tsvfile:
-        writer = csv.DictWriter(tsvfile, fieldnames=fieldnames, delimiter='\t')
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-    print(f"📄 TSV criado (delimitado por TAB): {tsv_filename}")
+    if formats is None:
+        formats = parse_formats(os.getenv('IPT_REPORT_FORMATS'))
+    
+    with ReportWriter(report_base_path(base_filename), MISSING_REPORT_FIELDS, formats) as report:
+        for resource in missing_resources:
+            report.write({
+                'nome': remove_version_from_title(resource['title']),  # Título sem versão
+                'repositorio': resource.get('repositorio', 'unknown'),  # Repositório do recurso
+                'kingdom': resource.get('kingdom', 'Animalia'),  # Kingdom já interpretado durante o parsing
+                'tag': resource['tag'],     # Tag extraída pelo script
+                'url': resource.get('base_url', '')  # URL base do IPT
+            })
+    
+    for kind, path in report.paths.items():
+        print(f"📄 {kind.upper()} criado: {path}")
 
-def main():
+def create_inventory_report(resources, base_filename, formats):
+    """Grava o inventário completo da coleta com o resultado da comparação (método e score)"""
+    with ReportWriter(
+        report_base_path(base_filename), INVENTORY_REPORT_FIELDS, formats, types=INVENTORY_REPORT_TYPES
+    ) as report:
+        for resource in resources:
+            report.write({
+                'repositorio': resource.get('repositorio', ''),
+                'tag': resource.get('tag', ''),
+                'title': resource.get('title', ''),
+                'nome': remove_version_from_title(resource.get('title', '')),
+                'kingdom': resource.get('kingdom', ''),
+                'kingdom_evidence': resource.get('kingdom_evidence', ''),
+                'link': resource.get('link', ''),
+                'guid': resource.get('guid', ''),
+                'pub_date': resource.get('pub_date', ''),
+                'url': resource.get('base_url', ''),
+                'found': resource.get('match_method') is not None,
+                'match_method': resource.get('match_method'),
+                'match_score': resource.get('match_score'),
+                'grist_record_id': resource.get('grist_record_id'),
+                'grist_nome': resource.get('grist_nome')
+            })
+    
+    for kind, path in report.paths.items():
+        print(f"📄 Inventário ({kind.upper()}, {report.rows} recursos): {path}")
+
+def check_resources(http_cache=None, grist_mirror=None, inventory=None, health=None):
     # Verificar variáveis de ambiente obrigatórias
     if not grist_api_key:
         print("ERRO: GRIST_API_KEY não definida nas variáveis de ambiente")
@@ -425,63 +536,95 @@ def main():
     if not doc_id:
         print("ERRO: GRIST_DOC_ID não definida nas variáveis de ambiente")
         return
+    
+    if grist_mirror is None:
+        grist_mirror = GristMirror(':memory:')
+    
+    # Formatos dos relatórios (validados antes da coleta)
+    try:
+        parse_formats(os.getenv('IPT_REPORT_FORMATS'))
+        inventory_formats = parse_formats(os.getenv('IPT_INVENTORY_REPORT_FORMATS'), default=())
+    except ValueError as e:
+        print(f"ERRO: {e}")
+        return
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-    # Carregar IPTs específicos
-    print("Carregando lista específica de IPTs...")
-    unique_ipts = get_ipts_especificos()
+    # Carregar IPTs (lista específica ou CSV de referências, conforme IPT_SOURCE)
+    print(f"Carregando IPTs (origem: {ipt_source})...")
+    try:
+        ipts = load_configured_ipts()
+    except ValueError as e:
+        print(f"ERRO: {e}")
+        return
     
-    if not unique_ipts:
-        print("ERRO: Nenhum IPT específico configurado")
+    if not ipts:
+        print("ERRO: Nenhum IPT configurado")
         return
     
-    print(f"✓ {len(unique_ipts)} IPTs específicos configurados para processar:\n")
-    for ipt in unique_ipts:
+    print(f"✓ {len(ipts)} IPTs configurados para processar:\n")
+    for ipt in ipts:
         print(f"  - {ipt['repositorio']}: {ipt['base_url']} (Kingdom padrão: {ipt['kingdom_hint']})")
     print()
     
-    # Buscar recursos de todos os IPTs
-    all_ipt_resources = []
-    ipt_stats = {}
+    # Buscar recursos de todos os IPTs em paralelo (resultados na ordem em que os feeds terminam)
+    resources_by_position = {}
+    resources_by_repo = {}
+    ipt_stats = {ipt['repositorio']: {'recursos': 0, 'erro': True} for ipt in ipts}
     
-    for i, ipt in enumerate(unique_ipts, 1):
+    for i, result in enumerate(harvest_ipt_resources(ipts, cache=http_cache, health=health), 1):
+        ipt = result['ipt']
         repo = ipt['repositorio']
-        rss_url = ipt['rss_url']
         
-        print(f"[{i}/{len(unique_ipts)}] Processando IPT {repo} ({rss_url})...")
+        print(f"[{i}/{len(ipts)}] IPT {repo} ({ipt['rss_url']}) em {result['elapsed']:.1f}s")
         
-        rss_content = fetch_ipt_rss_data(rss_url, repo)
-        
-        if not rss_content:
+        if result['resources'] is None:
             print(f"  ERRO: Falha ao buscar RSS do IPT {repo}")
-            ipt_stats[repo] = {'recursos': 0, 'erro': True}
             continue
         
-        ipt_resources = parse_ipt_resources(rss_content, ipt)
-        resource_count = len(ipt_resources)
-        
+        resource_count = len(result['resources'])
         print(f"  ✓ {resource_count} recursos encontrados")
         
-        all_ipt_resources.extend(ipt_resources)
+        resources_by_position[result['position']] = result['resources']
+        resources_by_repo.setdefault(repo, []).extend(result['resources'])
         ipt_stats[repo] = {'recursos': resource_count, 'erro': False}
     
-    print(f"\n📊 TOTAL: {len(all_ipt_resources)} recursos encontrados em {len(unique_ipts)} IPTs")
+    # Manter a ordem da lista de IPTs nos relatórios
+    all_ipt_resources = [
+        resource for position in sorted(resources_by_position) for resource in resources_by_position[position]
+    ]
     
-    print("\nBuscando dados do Grist...")
-    grist_data = fetch_grist_data(api_url, grist_api_key)
+    print(f"\n📊 TOTAL: {len(all_ipt_resources)} recursos encontrados em {len(ipts)} IPTs")
     
-    if not grist_data:
-        print("ERRO: Falha ao buscar dados do Grist")
-        return
+    # Snapshot da coleta no inventário persistente (ver resource_inventory.py)
+    if inventory:
+        record_harvest(inventory, resources_by_repo, source='check_ipt_resources')
     
-    grist_records = grist_data.get('records', [])
-    print(f"✓ Encontrados {len(grist_records)} registros no Grist\n")
+    print("\nSincronizando o espelho local do Grist...")
+    if http_cache and http_cache.offline:
+        print(f"  Modo offline: usando o espelho sem sincronizar ({grist_mirror.path})")
+    else:
+        try:
+            sync = sync_grist_mirror_from_env(grist_mirror, doc_id, grist_api_key, table_id)
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao sincronizar dados do Grist: {e}")
+            if not len(grist_mirror):
+                print("ERRO: Falha ao buscar dados do Grist")
+                return
+            print("  Usando o espelho da sincronização anterior")
+        else:
+            print(
+                f"  Sincronização {sync['mode']}: {sync['fetched']} linhas em {sync['pages']} páginas, "
+                f"{sync['changed']} novas/alteradas, {sync['removed']} removidas ({sync['elapsed']:.1f}s)"
+            )
+    
+    print(f"✓ Encontrados {len(grist_mirror)} registros no Grist\n")
     
     print("Obtendo estrutura da tabela Grist...")
-    table_columns = get_grist_table_structure(doc_id, table_id, grist_api_key)
+    table_columns = get_grist_table_structure(doc_id, table_id, grist_api_key, http_cache)
     print(f"Estrutura da tabela: {[col['label'] for col in table_columns]}\n")
     
     print("Comparando recursos usando múltiplas estratégias (tag, título normalizado, similaridade)...")
-    missing_resources = find_missing_resources(all_ipt_resources, grist_records)
+    missing_resources = find_missing_resources(all_ipt_resources, grist_mirror)
     
     # Exibir estatísticas consolidadas
     total_ipt = len(all_ipt_resources)
@@ -499,7 +642,7 @@ def main():
     print("MÉTODOS DE COMPARAÇÃO UTILIZADOS:")
     print("1. Comparação exata por tag")
     print("2. Comparação por título normalizado (sem acentos, versões, pontuação)")
-    print("3. Comparação por similaridade de texto (threshold: 90%)")
+    print(f"3. Comparação por similaridade de texto (threshold: {DEFAULT_THRESHOLD:.0%})")
     print("4. Normalização remove: acentos, versões, pontuação, espaços extras")
     
     # Estatísticas por IPT
@@ -536,11 +679,33 @@ def main():
             print(f"   Data: {resource['pub_date']}")
             print()
         
-        # Gerar arquivos CSV e TSV
-        base_filename = f'missing_resources_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        create_files_from_missing(missing_resources, table_columns, base_filename)
+        # Gerar arquivos CSV e TSV (ou os formatos de IPT_REPORT_FORMATS)
+        create_files_from_missing(missing_resources, table_columns, f'missing_resources_{timestamp}.csv')
+    
+    # Inventário completo com o resultado da comparação, se IPT_INVENTORY_REPORT_FORMATS estiver definida
+    if inventory_formats:
+        create_inventory_report(all_ipt_resources, f'ipt_inventory_{timestamp}', inventory_formats)
     
     print("Verificação concluída!")
 
+def main():
+    http_cache = open_http_cache_from_env()
+    grist_mirror = open_grist_mirror_from_env()
+    inventory = open_resource_inventory_from_env()
+    # No modo offline nada vai para a rede: os hosts não são avaliados
+    health = None if http_cache and http_cache.offline else open_host_health_from_env()
+    try:
+        check_resources(http_cache, grist_mirror, inventory, health)
+    finally:
+        if health:
+            print(f"Saúde dos hosts: {health.summary()}")
+            health.save()
+        grist_mirror.close()
+        if inventory:
+            inventory.close()
+        if http_cache:
+            print(f"Cache HTTP: {http_cache.summary()}")
+            http_cache.close()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
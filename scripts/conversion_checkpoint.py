@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Checkpoints de execução para os scripts de conversão do MongoDB.
+
+Cada execução (run) recebe um identificador e guarda em um arquivo SQLite
+local as opções usadas, a consulta da fase Python, as partições e, para cada
+partição, o último `_id` efetivamente gravado e os contadores acumulados.
+Com --resume, os scripts continuam cada partição a partir de
+{_id: {$gt: último}} em vez de recomeçar do documento zero.
+
+Os valores são serializados com bson.json_util para preservar ObjectId e os
+tipos numéricos das consultas.
+"""
+
+import os
+import sqlite3
+import uuid
+from datetime import datetime
+
+from bson import json_util
+
+DEFAULT_CHECKPOINT_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'conversion_checkpoints.sqlite3'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    script TEXT NOT NULL,
+    status TEXT NOT NULL,
+    options TEXT,
+    query TEXT,
+    partitions TEXT,
+    counters TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_script_status ON runs (script, status, created_at);
+CREATE TABLE IF NOT EXISTS partitions (
+    run_id TEXT NOT NULL,
+    partition_number INTEGER NOT NULL,
+    last_id TEXT,
+    counters TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, partition_number)
+);
+"""
+
+def _dumps(value):
+    if value is None:
+        return None
+    return json_util.dumps(value, json_options=json_util.CANONICAL_JSON_OPTIONS)
+
+def _loads(text):
+    if text is None:
+        return None
+    return json_util.loads(text, json_options=json_util.CANONICAL_JSON_OPTIONS)
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+def resume_filter(query, last_id):
+    """Restringe `query` aos documentos com _id maior que o último gravado."""
+    if last_id is None:
+        return query
+    id_filter = {'_id': {'$gt': last_id}}
+    if not query:
+        return id_filter
+    return {'$and': [query, id_filter]}
+
+class CheckpointStore:
+    """
+    Acesso ao arquivo SQLite de checkpoints. Cada processo deve abrir a sua
+    própria instância (conexões SQLite não são compartilhadas entre processos).
+    Dentro de um processo, a instância pode ser usada por outras threads (por
+    exemplo, os escritores do pipelined_copy) desde que uma de cada vez.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def create_run(self, script, options):
+        """Registra uma nova execução e retorna o seu run_id."""
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO runs (run_id, script, status, options, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (run_id, script, 'running', _dumps(options), _now(), _now())
+            )
+        return run_id
+
+    def find_run(self, script, run_id=None):
+        """
+        Retorna a execução indicada ou, sem run_id, a execução inacabada mais
+        recente do script. Retorna None se não houver.
+        """
+        if run_id:
+            row = self.connection.execute(
+                'SELECT run_id, status, options, query, partitions, counters FROM runs '
+                'WHERE script = ? AND run_id = ?',
+                (script, run_id)
+            ).fetchone()
+        else:
+            row = self.connection.execute(
+                'SELECT run_id, status, options, query, partitions, counters FROM runs '
+                "WHERE script = ? AND status = 'running' ORDER BY created_at DESC LIMIT 1",
+                (script,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'run_id': row[0],
+            'status': row[1],
+            'options': _loads(row[2]),
+            'query': _loads(row[3]),
+            'partitions': _loads(row[4]),
+            'counters': _loads(row[5])
+        }
+
+    def save_run(self, run_id, query=None, partitions=None, counters=None):
+        """Atualiza a consulta, as partições e/ou os contadores gerais da execução."""
+        updates = {'query': query, 'partitions': partitions, 'counters': counters}
+        for column, value in updates.items():
+            if value is not None:
+                with self.connection:
+                    self.connection.execute(
+                        f'UPDATE runs SET {column} = ?, updated_at = ? WHERE run_id = ?',
+                        (_dumps(value), _now(), run_id)
+                    )
+
+    def finish_run(self, run_id):
+        """Marca a execução como concluída."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET status = 'completed', updated_at = ? WHERE run_id = ?",
+                (_now(), run_id)
+            )
+
+    def load_partition(self, run_id, partition_number):
+        """Retorna (last_id, counters, done) da partição, ou (None, None, False)."""
+        row = self.connection.execute(
+            'SELECT last_id, counters, done FROM partitions WHERE run_id = ? AND partition_number = ?',
+            (run_id, partition_number)
+        ).fetchone()
+        if not row:
+            return None, None, False
+        return _loads(row[0]), _loads(row[1]), bool(row[2])
+
+    def save_partition(self, run_id, partition_number, last_id, counters, done=False):
+        """Grava o checkpoint da partição após um lote confirmado."""
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO partitions (run_id, partition_number, last_id, counters, done, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (run_id, partition_number) DO UPDATE SET '
+                'last_id = excluded.last_id, counters = excluded.counters, '
+                'done = excluded.done, updated_at = excluded.updated_at',
+                (run_id, partition_number, _dumps(last_id), _dumps(counters), int(done), _now())
+            )
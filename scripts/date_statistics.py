@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Estatísticas finais de year/month/day numéricos dos scripts de conversão.
+
+Em vez de uma contagem por campo ao final (count_documents com $type
+'number', uma varredura completa para cada campo em uma coleção sem
+índice), os valores são contados durante a própria passada, a partir dos
+documentos já convertidos. Quando a passada não vê a coleção inteira
+(conversão no servidor, modo incremental), numeric_date_stats() obtém os
+mesmos números com uma única agregação.
+"""
+
+from bson.decimal128 import Decimal128
+
+from mongodb_date_pipeline import DATE_FIELDS
+
+# Tipos BSON que o operador $type 'number' aceita
+NUMBER_BSON_TYPES = ['double', 'int', 'long', 'decimal']
+
+def new_numeric_counts():
+    """Contadores de campos numéricos (somados entre lotes e partições)."""
+    return {field: 0 for field in DATE_FIELDS}
+
+def is_bson_number(value):
+    """Equivalente a {$type: 'number'} para um valor já decodificado."""
+    return isinstance(value, (int, float, Decimal128)) and not isinstance(value, bool)
+
+def count_numeric_dates(documents, counts):
+    """Acumula em `counts` quantos documentos têm year, month e day numéricos."""
+    for document in documents:
+        for field in DATE_FIELDS:
+            if is_bson_number(document.get(field)):
+                counts[field] += 1
+    return counts
+
+def numeric_date_stats(collection):
+    """
+    Total de documentos e quantos têm year, month e day numéricos, em uma
+    única agregação ($group) no lugar de quatro count_documents.
+    """
+    group = {'_id': None, 'total': {'$sum': 1}}
+    for field in DATE_FIELDS:
+        group[field] = {'$sum': {'$cond': [{'$in': [{'$type': f'${field}'}, NUMBER_BSON_TYPES]}, 1, 0]}}
+    results = list(collection.aggregate([
+        {'$project': {field: 1 for field in DATE_FIELDS}},
+        {'$group': group}
+    ], allowDiskUse=True))
+    if not results:
+        return {'total': 0, **new_numeric_counts()}
+    results[0].pop('_id')
+    return results[0]
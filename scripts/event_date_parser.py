@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Parser de eventDate compartilhado pelos scripts de conversão de datas.
+
+Uma única regex compilada identifica o formato da string e despacha para a
+validação correspondente, sem tentativas com datetime.strptime dentro de
+try/except. Os resultados são memorizados em um cache LRU limitado, indexado
+pela string original, já que as mesmas datas se repetem muito entre
+espécimes coletados na mesma expedição.
+
+Formatos suportados (mesma semântica da versão anterior baseada em
+re.match + strptime):
+- YYYY-MM-DD e YYYY/MM/DD
+- DD/MM/YYYY e DD-MM-YYYY (com alternativa MM/DD/YYYY para '/')
+- YYYY-MM e YYYY/MM
+- YYYY
+
+parse_event_dates_batch interpreta um lote inteiro (por exemplo, um lote do
+cursor) com o mesmo parser e o mesmo cache. Um caminho vetorizado com NumPy
+foi medido com benchmark_date_conversion.py e não ganhava do parser escalar
+(empatava com datas todas distintas e perdia com a repetição típica dos
+dados, em que o cache resolve quase tudo), por isso não existe.
+"""
+
+import calendar
+import re
+from functools import lru_cache
+
+MIN_YEAR = 1700
+MAX_YEAR = 2030
+
+# Quantidade máxima de strings distintas mantidas no cache
+EVENT_DATE_CACHE_SIZE = 65536
+
+EMPTY_DATE = (None, None, None)
+
+# Dia aceito por strptime('%d'): também " 1" a " 9" (com espaço à esquerda)
+_DAY = r'\d{1,2}| [1-9]'
+
+# O nome do último grupo que casou (match.lastgroup) identifica o formato
+EVENT_DATE_REGEX = re.compile(
+    rf'(?P<ymd_year>\d{{4}})(?P<ymd_sep>[-/])(?P<ymd_month>\d{{1,2}})(?P=ymd_sep)(?P<ymd>{_DAY})'
+    rf'|(?P<dmy_first>{_DAY})(?P<dmy_sep>[-/])(?P<dmy_second>{_DAY})(?P=dmy_sep)(?P<dmy>\d{{4}})'
+    r'|(?P<ym_year>\d{4})(?P<ym_sep>[-/])(?P<ym>\d{1,2})'
+    r'|(?P<y>\d{4})'
+)
+
+def is_numeric_string(value):
+    """Verifica se uma string contém apenas números."""
+    if not isinstance(value, str):
+        return False
+    return value.isdigit()
+
+def _within_bounds(year, month, day, *texts):
+    """
+    Validação básica dos padrões regex (valores zero não são verificados).
+    Os padrões regex só aceitam dígitos, sem o espaço à esquerda do strptime.
+    """
+    if any(text.startswith(' ') for text in texts):
+        return False
+    if year and (year < MIN_YEAR or year > MAX_YEAR):
+        return False
+    if month and (month < 1 or month > 12):
+        return False
+    if day and (day < 1 or day > 31):
+        return False
+    return True
+
+def _is_calendar_date(year, month, day, month_text, day_text):
+    """
+    Equivalente ao que datetime.strptime aceita para ano, mês e dia.
+    %m e %d só aceitam dígitos ASCII (o ano aceita qualquer dígito) e apenas
+    %d aceita o espaço à esquerda.
+    """
+    if not (month_text.isascii() and day_text.isascii()) or month_text.startswith(' '):
+        return False
+    return 1 <= year and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+
+@lru_cache(maxsize=EVENT_DATE_CACHE_SIZE)
+def _parse_event_date_cached(event_date):
+    match = EVENT_DATE_REGEX.fullmatch(event_date.strip())
+    if not match:
+        return EMPTY_DATE
+
+    shape = match.lastgroup
+
+    if shape == 'ymd':
+        year, month, day = int(match['ymd_year']), int(match['ymd_month']), int(match['ymd'])
+        if _within_bounds(year, month, day, match['ymd']):
+            return year, month, day
+        # Fallback equivalente a strptime('%Y-%m-%d') / strptime('%Y/%m/%d')
+        if _is_calendar_date(year, month, day, match['ymd_month'], match['ymd']):
+            return year, month, day
+        return EMPTY_DATE
+
+    if shape == 'dmy':
+        first, second, year = int(match['dmy_first']), int(match['dmy_second']), int(match['dmy'])
+        if _within_bounds(year, second, first, match['dmy_first'], match['dmy_second']):
+            return year, second, first
+        # strptime só era tentado com '/': primeiro %d/%m/%Y, depois %m/%d/%Y
+        if match['dmy_sep'] == '/':
+            if _is_calendar_date(year, second, first, match['dmy_second'], match['dmy_first']):
+                return year, second, first
+            if _is_calendar_date(year, first, second, match['dmy_first'], match['dmy_second']):
+                return year, first, second
+        return EMPTY_DATE
+
+    if shape == 'ym':
+        year, month = int(match['ym_year']), int(match['ym'])
+        if _within_bounds(year, month, None):
+            return year, month, None
+        # Fallback equivalente a strptime('%Y-%m'); não existe '%Y/%m'
+        if match['ym_sep'] == '-' and match['ym'].isascii() and year >= 1 and 1 <= month <= 12:
+            return year, month, None
+        return EMPTY_DATE
+
+    # YYYY: fora dos limites ainda era aceito por strptime('%Y')
+    return int(match['y']), None, None
+
+def parse_event_date(event_date):
+    """
+    Extrai year, month e day de eventDate.
+    Suporta vários formatos de data comuns.
+    """
+    if not event_date or not isinstance(event_date, str):
+        return EMPTY_DATE
+    return _parse_event_date_cached(event_date)
+
+def parse_event_dates_batch(event_dates):
+    """
+    Interpreta um lote de eventDate de uma vez.
+    Retorna três listas alinhadas com a entrada: (years, months, days),
+    com None onde não foi possível extrair o valor.
+    """
+    parsed = list(map(parse_event_date, event_dates))
+    if not parsed:
+        return [], [], []
+    years, months, days = zip(*parsed)
+    return list(years), list(months), list(days)
+
+def parse_cache_stats():
+    """Retorna estatísticas do cache de parse_event_date (acertos, erros e taxa de acerto)."""
+    info = _parse_event_date_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hit_rate': info.hits / lookups if lookups else 0.0
+    }
+
+def clear_parse_cache():
+    """Esvazia o cache de parse_event_date e zera as estatísticas."""
+    _parse_event_date_cached.cache_clear()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Transformador 'dates' do motor de manutenção: converte year/month/day de
+string numérica para int e extrai os campos ausentes de eventDate.
+"""
+
+from date_statistics import count_numeric_dates, new_numeric_counts
+from event_date_parser import is_numeric_string, parse_event_date, parse_event_dates_batch, parse_cache_stats
+from maintenance_engine import FieldTransformer, register_transformer
+from mongodb_incremental import DATE_FIELDS, dirty_filter
+
+def needs_event_date(record):
+    """Indica se o registro tem year, month ou day ausente e um eventDate para extrair."""
+    return 'eventDate' in record and any(field not in record for field in DATE_FIELDS)
+
+def build_update(record, string_to_numeric_conversions, eventdate_extractions, event_date_parts=None):
+    """
+    Calcula o $set necessário para um registro e atualiza os contadores.
+    Retorna um dicionário vazio quando o registro não precisa de alteração.
+    `event_date_parts` permite informar (year, month, day) já extraídos de eventDate.
+    """
+    update_operations = {}
+
+    # Processar year, month, day existentes - converter strings numéricas para int
+    for field in ['year', 'month', 'day']:
+        if field in record and is_numeric_string(record[field]):
+            update_operations[field] = int(record[field])
+            string_to_numeric_conversions[field] += 1
+
+    # Extrair valores de eventDate para campos ausentes
+    missing_fields = [field for field in ['year', 'month', 'day'] if field not in record]
+
+    if missing_fields and 'eventDate' in record:
+        if event_date_parts is None:
+            event_date_parts = parse_event_date(record['eventDate'])
+        extracted_year, extracted_month, extracted_day = event_date_parts
+
+        if 'year' not in record and extracted_year:
+            update_operations['year'] = extracted_year
+            eventdate_extractions['year'] += 1
+
+        if 'month' not in record and extracted_month:
+            update_operations['month'] = extracted_month
+            eventdate_extractions['month'] += 1
+
+        if 'day' not in record and extracted_day:
+            update_operations['day'] = extracted_day
+            eventdate_extractions['day'] += 1
+
+    return update_operations
+
+@register_transformer
+class EventDateTransformer(FieldTransformer):
+    """year/month/day numéricos, com extração de eventDate para os ausentes."""
+
+    name = 'dates'
+    projection = DATE_FIELDS + ['eventDate']
+
+    def new_counters(self):
+        return {
+            'string_to_numeric_conversions': {'year': 0, 'month': 0, 'day': 0},
+            'eventdate_extractions': {'year': 0, 'month': 0, 'day': 0},
+            'parse_cache': {'hits': 0, 'misses': 0},
+            # Documentos lidos que ficam com year/month/day numéricos após as alterações
+            'numeric_fields': new_numeric_counts()
+        }
+
+    def dirty_filter(self):
+        return dirty_filter()
+
+    def transform_batch(self, records, counters):
+        """Interpreta todos os eventDate do lote de uma vez com parse_event_dates_batch."""
+        cache_before = parse_cache_stats()
+        years, months, days = parse_event_dates_batch(
+            record['eventDate'] if needs_event_date(record) else None for record in records
+        )
+        updates = [
+            build_update(
+                record, counters['string_to_numeric_conversions'], counters['eventdate_extractions'], parts
+            )
+            for record, parts in zip(records, zip(years, months, days))
+        ]
+        cache_after = parse_cache_stats()
+        counters['parse_cache']['hits'] += cache_after['hits'] - cache_before['hits']
+        counters['parse_cache']['misses'] += cache_after['misses'] - cache_before['misses']
+        count_numeric_dates(
+            [dict(record, **update) for record, update in zip(records, updates)], counters['numeric_fields']
+        )
+        return updates
+
+    def log_summary(self, counters, logger):
+        cache_stats = counters['parse_cache']
+        cache_lookups = cache_stats['hits'] + cache_stats['misses']
+        cache_hit_rate = cache_stats['hits'] / cache_lookups if cache_lookups else 0.0
+        logger.info(
+            f"Cache de eventDate: {cache_stats['hits']} acertos, {cache_stats['misses']} erros "
+            f"(taxa de acerto {cache_hit_rate:.1%})"
+        )
+        logger.info("")
+
+        logger.info("Conversões de string para numérico:")
+        for field, count in counters['string_to_numeric_conversions'].items():
+            logger.info(f"  {field}: {count} registros")
+
+        logger.info("")
+        logger.info("Extrações de eventDate:")
+        for field, count in counters['eventdate_extractions'].items():
+            logger.info(f"  {field}: {count} registros")
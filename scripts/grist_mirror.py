@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Espelho local (SQLite) da tabela Datasets do Grist.
+
+Antes, a tabela inteira era baixada em uma única requisição sem paginação a
+cada execução, e a comparação montava vários dicionários a partir dela.
+Aqui os registros são sincronizados para um arquivo SQLite com índices em
+`tag` e no `nome` normalizado, e a comparação consulta o espelho.
+
+A sincronização usa o endpoint SQL do Grist (/api/docs/{doc}/sql, somente
+SELECT), que permite filtrar e ordenar:
+
+- paginação por chave (WHERE id > ? ORDER BY id LIMIT ?), sem offset;
+- com uma coluna de data de modificação (GRIST_UPDATED_COLUMN, por exemplo
+  uma coluna "UpdatedAt" com fórmula de gatilho), apenas as linhas
+  alteradas desde a última sincronização são baixadas, paginadas por
+  (coluna, id); as linhas removidas são detectadas por uma listagem só
+  dos ids;
+- sem essa coluna, a tabela é percorrida em páginas e o espelho é
+  atualizado apenas onde algo mudou.
+
+Servidores sem o endpoint SQL (404) caem na leitura completa de /records.
+
+Variáveis de ambiente (open_grist_mirror_from_env / sync_grist_mirror_from_env):
+GRIST_BASE_URL (padrão https://docs.getgrist.com, útil para apontar para
+um servidor local de testes), GRIST_MIRROR_FILE, GRIST_PAGE_SIZE e
+GRIST_UPDATED_COLUMN.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import requests
+
+from title_matcher import normalize_text_for_comparison
+
+DEFAULT_BASE_URL = 'https://docs.getgrist.com'
+DEFAULT_MIRROR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grist_mirror.sqlite3')
+DEFAULT_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    tag TEXT,
+    nome TEXT,
+    nome_normalized TEXT,
+    updated_at REAL,
+    fields TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_tag ON records (tag);
+CREATE INDEX IF NOT EXISTS records_nome_normalized ON records (nome_normalized);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def docs_url(base_url, doc_id):
+    """URL base da API de um documento do Grist."""
+    return f"{base_url.rstrip('/')}/api/docs/{doc_id}"
+
+def quote_identifier(name):
+    """Identificador SQL entre aspas (nomes de tabela e coluna do Grist)."""
+    return '"' + name.replace('"', '""') + '"'
+
+def grist_headers(api_key):
+    return {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+def run_sql(session, url, api_key, sql, args=(), timeout=60):
+    """Executa um SELECT no endpoint SQL do Grist; retorna os `fields` de cada linha."""
+    response = session.post(
+        f"{url}/sql", headers=grist_headers(api_key), json={'sql': sql, 'args': list(args)}, timeout=timeout
+    )
+    response.raise_for_status()
+    return [record['fields'] for record in response.json().get('records', [])]
+
+def iter_pages(session, url, api_key, sql_prefix, order, cursor_of, args_of, page_size):
+    """
+    Páginas de uma consulta paginada por chave. `order` é a cláusula ORDER BY,
+    cursor_of(linha) a chave da última linha e args_of(cursor) os argumentos
+    do WHERE (None na primeira página, sem WHERE).
+    """
+    cursor = None
+    while True:
+        where, args = args_of(cursor)
+        sql = f"{sql_prefix}{where} ORDER BY {order} LIMIT ?"
+        rows = run_sql(session, url, api_key, sql, args + [page_size])
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = cursor_of(rows[-1])
+
+def _record_columns(record_id, fields, updated_column):
+    tag = str(fields.get('tag') or '').strip()
+    nome = str(fields.get('nome') or '').strip()
+    updated_at = fields.get(updated_column) if updated_column else None
+    return (
+        record_id,
+        tag or None,
+        nome or None,
+        normalize_text_for_comparison(nome) or None,
+        updated_at if isinstance(updated_at, (int, float)) else None,
+        json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    )
+
+class GristMirror:
+    """
+    Espelho SQLite dos registros de uma tabela do Grist. Os registros são
+    guardados como vieram da API ({'id': ..., 'fields': {...}}), com as
+    colunas usadas na comparação extraídas e indexadas.
+    """
+
+    def __init__(self, path=DEFAULT_MIRROR_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def get_state(self, key, default=None):
+        row = self.connection.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, json.dumps(value))
+            )
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM records')
+            self.connection.execute('DELETE FROM sync_state')
+
+    def upsert(self, records, updated_column=None):
+        """Grava `records` (formato da API); retorna quantos eram novos ou mudaram."""
+        rows = [_record_columns(record['id'], record.get('fields', {}), updated_column) for record in records]
+        with self.connection:
+            before = self.connection.total_changes
+            # O WHERE do upsert evita reescrever (e contar) linhas idênticas
+            self.connection.executemany(
+                'INSERT INTO records (id, tag, nome, nome_normalized, updated_at, fields) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET tag = excluded.tag, nome = excluded.nome, '
+                'nome_normalized = excluded.nome_normalized, updated_at = excluded.updated_at, '
+                'fields = excluded.fields WHERE fields IS NOT excluded.fields',
+                rows
+            )
+            return self.connection.total_changes - before
+
+    def prune(self, ids):
+        """Remove os registros cujo id não está em `ids`; retorna quantos foram removidos."""
+        with self.connection:
+            self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS live_ids (id INTEGER PRIMARY KEY)')
+            self.connection.execute('DELETE FROM live_ids')
+            self.connection.executemany('INSERT OR IGNORE INTO live_ids (id) VALUES (?)', ((i,) for i in ids))
+            cursor = self.connection.execute('DELETE FROM records WHERE id NOT IN (SELECT id FROM live_ids)')
+            self.connection.execute('DELETE FROM live_ids')
+        return cursor.rowcount
+
+    def replace_all(self, records, updated_column=None):
+        """Substitui o conteúdo do espelho por `records`; retorna (alterados, removidos)."""
+        changed = self.upsert(records, updated_column)
+        removed = self.prune(record['id'] for record in records)
+        return changed, removed
+
+    def records(self):
+        """Registros no formato da API, em ordem de id."""
+        for record_id, fields in self.connection.execute('SELECT id, fields FROM records ORDER BY id'):
+            yield {'id': record_id, 'fields': json.loads(fields)}
+
+    def _record_info(self, row):
+        record_id, tag, nome = row
+        return {
+            'nome': nome or 'N/A',
+            'original_title': nome or 'N/A',
+            'record_id': record_id,
+            'tag': tag or 'N/A'
+        }
+
+    def find_by_tag(self, tag):
+        """Registro com a tag `tag` (o de maior id, se houver repetidas), ou None."""
+        row = self.connection.execute(
+            'SELECT id, tag, nome FROM records WHERE tag = ? ORDER BY id DESC LIMIT 1', (tag,)
+        ).fetchone()
+        return self._record_info(row) if row else None
+
+    def find_by_title(self, normalized_title):
+        """Registro cujo nome normalizado é `normalized_title` (o de maior id), ou None."""
+        row = self.connection.execute(
+            'SELECT id, tag, nome FROM records WHERE nome_normalized = ? ORDER BY id DESC LIMIT 1',
+            (normalized_title,)
+        ).fetchone()
+        return self._record_info(row) if row else None
+
+    def titles(self):
+        """
+        (nome normalizado, registro) de cada nome distinto: o registro de maior
+        id, na ordem da primeira ocorrência do nome.
+        """
+        rows = self.connection.execute(
+            'SELECT r.nome_normalized, r.id, r.tag, r.nome FROM records r JOIN ('
+            '  SELECT MIN(id) AS first_id, MAX(id) AS last_id FROM records'
+            '  WHERE nome_normalized IS NOT NULL GROUP BY nome_normalized'
+            ') g ON r.id = g.last_id ORDER BY g.first_id'
+        )
+        for normalized_title, *row in rows:
+            yield normalized_title, self._record_info(row)
+
+    def count_tags(self):
+        return self.connection.execute('SELECT COUNT(DISTINCT tag) FROM records').fetchone()[0]
+
+    def count_titles(self):
+        return self.connection.execute('SELECT COUNT(DISTINCT nome_normalized) FROM records').fetchone()[0]
+
+    def sample_tags(self, limit=10):
+        return [row[0] for row in self.connection.execute(
+            'SELECT DISTINCT tag FROM records WHERE tag IS NOT NULL LIMIT ?', (limit,)
+        )]
+
+def mirror_from_records(records, path=':memory:'):
+    """GristMirror (em memória, por padrão) com os registros `records`."""
+    mirror = GristMirror(path)
+    mirror.replace_all(records)
+    return mirror
+
+def _fetch_all_records(session, url, api_key, table_id, timeout):
+    response = session.get(f"{url}/tables/{table_id}/records", headers=grist_headers(api_key), timeout=timeout)
+    response.raise_for_status()
+    return response.json().get('records', [])
+
+def _iter_all(session, url, api_key, table, page_size):
+    return iter_pages(
+        session, url, api_key, f"SELECT * FROM {table}", 'id',
+        cursor_of=lambda row: row['id'],
+        args_of=lambda cursor: ('', []) if cursor is None else (' WHERE id > ?', [cursor]),
+        page_size=page_size
+    )
+
+def _iter_ids(session, url, api_key, table, page_size):
+    for rows in iter_pages(
+        session, url, api_key, f"SELECT id FROM {table}", 'id',
+        cursor_of=lambda row: row['id'],
+        args_of=lambda cursor: ('', []) if cursor is None else (' WHERE id > ?', [cursor]),
+        page_size=page_size
+    ):
+        for row in rows:
+            yield row['id']
+
+def _iter_changed(session, url, api_key, table, column, since, page_size):
+    updated = f"COALESCE({quote_identifier(column)}, 0)"
+
+    def args_of(cursor):
+        if cursor is None:
+            if since is None:
+                return '', []
+            # Linhas com a mesma data da última sincronização são relidas (o upsert as ignora)
+            return f" WHERE {updated} >= ?", [since[0]]
+        value, record_id = cursor
+        return f" WHERE ({updated} > ? OR ({updated} = ? AND id > ?))", [value, value, record_id]
+
+    return iter_pages(
+        session, url, api_key, f"SELECT * FROM {table}", f"{updated}, id",
+        cursor_of=lambda row: [row.get(column) or 0, row['id']],
+        args_of=args_of,
+        page_size=page_size
+    )
+
+def _as_record(row):
+    fields = dict(row)
+    return {'id': fields.pop('id'), 'fields': fields}
+
+def sync_grist_mirror(mirror, doc_id, api_key, table_id='Datasets', base_url=DEFAULT_BASE_URL,
+                      page_size=DEFAULT_PAGE_SIZE, updated_column=None, session=None, timeout=60):
+    """
+    Atualiza `mirror` a partir da tabela `table_id` do Grist. Retorna um
+    dicionário com 'mode' ('full', 'incremental' ou 'records'), 'fetched'
+    (linhas baixadas), 'changed', 'removed', 'pages', 'total' e 'elapsed'.
+    Erros HTTP e de rede são lançados como requests.exceptions.RequestException.
+    """
+    start = time.monotonic()
+    url = docs_url(base_url, doc_id)
+    table = quote_identifier(table_id)
+    own_session = session is None
+    session = session or requests.Session()
+    stats = {'mode': 'full', 'fetched': 0, 'changed': 0, 'removed': 0, 'pages': 0}
+
+    # Outro documento, tabela ou coluna de modificação: recomeçar do zero
+    source = [url, table_id, updated_column]
+    if mirror.get_state('source') != source:
+        mirror.clear()
+        mirror.set_state('source', source)
+    cursor = mirror.get_state('cursor') if updated_column else None
+
+    try:
+        if updated_column:
+            stats['mode'] = 'incremental' if cursor else 'full'
+            for rows in _iter_changed(session, url, api_key, table, updated_column, cursor, page_size):
+                stats['pages'] += 1
+                stats['fetched'] += len(rows)
+                stats['changed'] += mirror.upsert([_as_record(row) for row in rows], updated_column)
+                cursor = [rows[-1].get(updated_column) or 0, rows[-1]['id']]
+            stats['removed'] = mirror.prune(_iter_ids(session, url, api_key, table, page_size))
+            if cursor:
+                mirror.set_state('cursor', cursor)
+        else:
+            seen = []
+            for rows in _iter_all(session, url, api_key, table, page_size):
+                stats['pages'] += 1
+                stats['fetched'] += len(rows)
+                stats['changed'] += mirror.upsert([_as_record(row) for row in rows])
+                seen.extend(row['id'] for row in rows)
+            stats['removed'] = mirror.prune(seen)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+        # Servidor sem o endpoint SQL: leitura completa, sem paginação
+        records = _fetch_all_records(session, url, api_key, table_id, timeout)
+        stats.update(mode='records', fetched=len(records), pages=1)
+        stats['changed'], stats['removed'] = mirror.replace_all(records, updated_column)
+    finally:
+        if own_session:
+            session.close()
+
+    mirror.set_state('synced_at', time.time())
+    stats['total'] = len(mirror)
+    stats['elapsed'] = time.monotonic() - start
+    return stats
+
+def open_grist_mirror_from_env():
+    """GristMirror no arquivo de GRIST_MIRROR_FILE (ou o padrão)."""
+    return GristMirror(os.environ.get('GRIST_MIRROR_FILE') or DEFAULT_MIRROR_FILE)
+
+def sync_grist_mirror_from_env(mirror, doc_id, api_key, table_id='Datasets', session=None):
+    """sync_grist_mirror configurado pelas variáveis GRIST_BASE_URL, GRIST_PAGE_SIZE e GRIST_UPDATED_COLUMN."""
+    page_size = os.environ.get('GRIST_PAGE_SIZE')
+    return sync_grist_mirror(
+        mirror, doc_id, api_key, table_id,
+        base_url=os.environ.get('GRIST_BASE_URL') or DEFAULT_BASE_URL,
+        page_size=int(page_size) if page_size else DEFAULT_PAGE_SIZE,
+        updated_column=os.environ.get('GRIST_UPDATED_COLUMN') or None,
+        session=session
+    )
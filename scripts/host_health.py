@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Saúde dos hosts dos IPTs: timeouts separados, novas tentativas com backoff
+e circuito por host, com o estado persistido entre execuções.
+
+Sem isso, um host fora do ar custa o timeout inteiro (30 s) para cada feed
+que ele hospeda, e a próxima execução redescobre a falha do zero. Aqui:
+
+- timeout de conexão curto e timeout de leitura longo, separados (um host
+  que não aceita conexão falha em segundos; um feed grande ainda pode
+  demorar para chegar);
+- erros de rede, timeouts e respostas 429/5xx são repetidos com backoff
+  exponencial e jitter ("full jitter": espera aleatória entre 0 e
+  backoff * 2^tentativa);
+- após `failure_threshold` falhas seguidas o circuito do host abre: as
+  requisições seguintes para ele falham na hora (HostUnavailable), sem
+  tocar na rede;
+- depois do cool-down, uma única requisição de teste é liberada (as
+  demais continuam falhando na hora). Se funcionar, o circuito fecha; se
+  falhar, ele reabre com o cool-down dobrado (até max_cool_down);
+- o estado vai para um arquivo JSON (IPT_HEALTH_FILE), lido também pela
+  ingestão em TypeScript (packages/ingest/src/lib/host-health.ts), que
+  conta as falhas seguidas da mesma forma e abre o circuito com o mesmo
+  IPT_FAILURE_THRESHOLD, para que a próxima execução pule os hosts
+  sabidamente fora do ar até o cool-down vencer.
+
+Configuração por variáveis de ambiente (open_host_health_from_env):
+IPT_HEALTH_FILE, IPT_CONNECT_TIMEOUT, IPT_READ_TIMEOUT, IPT_RETRIES,
+IPT_FAILURE_THRESHOLD, IPT_COOL_DOWN (segundos) e IPT_HEALTH_DISABLED.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+DEFAULT_HEALTH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ipt_host_health.json')
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_BACKOFF_MAX = 8
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOL_DOWN = 3600
+DEFAULT_MAX_COOL_DOWN = 7 * 24 * 3600
+
+# Respostas HTTP que indicam um problema passageiro do servidor
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+class HostUnavailable(requests.exceptions.ConnectionError):
+    """Host com o circuito aberto (falhas recentes); a requisição nem foi feita."""
+
+def is_host_failure(error):
+    """Indica se `error` aponta um problema do host (e deve ser repetido e contado)."""
+    if isinstance(error, HostUnavailable):
+        return False
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError
+    ))
+
+def new_host_state():
+    return {
+        'state': CLOSED,
+        'failures': 0,
+        'opened': 0,
+        'retry_after': 0,
+        'last_error': None,
+        'last_failure': None,
+        'last_success': None
+    }
+
+class HostHealth:
+    """
+    Estado de saúde por host (netloc, como em ipt_harvester.host_of). Pode
+    ser usado pelas threads da coleta concorrente.
+    """
+
+    def __init__(self, path=DEFAULT_HEALTH_FILE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 backoff_max=DEFAULT_BACKOFF_MAX, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 cool_down=DEFAULT_COOL_DOWN, max_cool_down=DEFAULT_MAX_COOL_DOWN):
+        self.path = path
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.max_cool_down = max_cool_down
+        self.lock = threading.Lock()
+        self.probing = set()
+        self.stats = {'skipped': 0, 'retries': 0, 'failures': 0, 'opened': 0, 'recovered': 0}
+        self.hosts = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                hosts = json.load(f).get('hosts', {})
+        except (OSError, ValueError) as e:
+            print(f"Aviso: estado de saúde dos hosts ignorado ({self.path}): {e}")
+            return {}
+        return {host: dict(new_host_state(), **state) for host, state in hosts.items()}
+
+    def save(self):
+        """Grava o estado no arquivo JSON (escrita atômica)."""
+        if not self.path:
+            return
+        with self.lock:
+            payload = {'version': 1, 'updated_at': time.time(), 'hosts': self.hosts}
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(temporary, self.path)
+
+    def _state(self, host):
+        return self.hosts.setdefault(host, new_host_state())
+
+    def allow(self, host):
+        """
+        Indica se uma requisição para `host` pode ser feita agora. Com o
+        circuito aberto e o cool-down vencido, libera uma única requisição
+        de teste por vez.
+        """
+        with self.lock:
+            state = self._state(host)
+            if state['state'] == CLOSED:
+                return True
+            if time.time() < state['retry_after'] or host in self.probing:
+                self.stats['skipped'] += 1
+                return False
+            self.probing.add(host)
+            return True
+
+    def record_success(self, host):
+        with self.lock:
+            state = self._state(host)
+            if state['state'] == OPEN:
+                self.stats['recovered'] += 1
+            state.update(state=CLOSED, failures=0, opened=0, retry_after=0, last_success=time.time())
+            self.probing.discard(host)
+
+    def record_failure(self, host, error):
+        with self.lock:
+            state = self._state(host)
+            now = time.time()
+            self.stats['failures'] += 1
+            state['failures'] += 1
+            state['last_error'] = f"{type(error).__name__}: {error}"[:500]
+            state['last_failure'] = now
+            # A requisição de teste falhou, ou falhas seguidas demais: abrir (ou reabrir) o circuito
+            if host in self.probing or (state['state'] == CLOSED and state['failures'] >= self.failure_threshold):
+                cool_down = min(self.max_cool_down, self.cool_down * 2 ** state['opened'])
+                state.update(state=OPEN, opened=state['opened'] + 1, retry_after=now + cool_down)
+                self.stats['opened'] += 1
+                self.probing.discard(host)
+
+    def release(self, host):
+        """Libera a requisição de teste de `host` sem registrar sucesso nem falha."""
+        with self.lock:
+            self.probing.discard(host)
+
+    def is_open(self, host):
+        with self.lock:
+            state = self.hosts.get(host)
+            return bool(state) and state['state'] == OPEN
+
+    def _sleep_before_retry(self, attempt):
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+
+    def call(self, host, request):
+        """
+        Executa request(timeout) para `host`, com as novas tentativas e o
+        circuito. Lança HostUnavailable se o circuito estiver aberto, ou o
+        último erro de request.
+        """
+        for attempt in range(self.retries + 1):
+            if not self.allow(host):
+                raise HostUnavailable(f"{host} indisponível (circuito aberto após falhas recentes)")
+            try:
+                result = request(self.timeout)
+            except requests.exceptions.RequestException as e:
+                if not is_host_failure(e):
+                    # O host respondeu (404, por exemplo): está no ar
+                    if isinstance(e, requests.exceptions.HTTPError):
+                        self.record_success(host)
+                    else:
+                        self.release(host)
+                    raise
+                self.record_failure(host, e)
+                if attempt == self.retries or self.is_open(host):
+                    raise
+                with self.lock:
+                    self.stats['retries'] += 1
+                self._sleep_before_retry(attempt)
+            except BaseException:
+                self.release(host)
+                raise
+            else:
+                self.record_success(host)
+                return result
+
+    def unavailable_hosts(self):
+        """Hosts com o circuito aberto e o instante (epoch) da próxima verificação."""
+        with self.lock:
+            return {host: state['retry_after'] for host, state in self.hosts.items() if state['state'] == OPEN}
+
+    def summary(self):
+        """Linha de resumo da saúde dos hosts na execução."""
+        stats = self.stats
+        return (
+            f"{len(self.unavailable_hosts())} hosts indisponíveis, {stats['failures']} falhas, "
+            f"{stats['retries']} novas tentativas, {stats['skipped']} requisições evitadas, "
+            f"{stats['opened']} circuitos abertos, {stats['recovered']} recuperados"
+        )
+
+def _env_flag(name):
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+def _env_number(name, default, cast=float):
+    value = os.environ.get(name)
+    return cast(value) if value else default
+
+def open_host_health_from_env():
+    """HostHealth configurado pelas variáveis IPT_*, ou None se desativado."""
+    if _env_flag('IPT_HEALTH_DISABLED'):
+        return None
+    return HostHealth(
+        os.environ.get('IPT_HEALTH_FILE') or DEFAULT_HEALTH_FILE,
+        connect_timeout=_env_number('IPT_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=_env_number('IPT_READ_TIMEOUT', DEFAULT_READ_TIMEOUT),
+        retries=_env_number('IPT_RETRIES', DEFAULT_RETRIES, int),
+        failure_threshold=_env_number('IPT_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD, int),
+        cool_down=_env_number('IPT_COOL_DOWN', DEFAULT_COOL_DOWN)
+    )
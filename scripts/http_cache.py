@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Cache HTTP em disco para os feeds RSS dos IPTs e as respostas da API do Grist.
+
+As respostas ficam em um arquivo SQLite local com o ETag e o Last-Modified
+recebidos. Nas execuções seguintes a requisição é condicional
+(If-None-Match / If-Modified-Since): quando o servidor responde 304, o corpo
+guardado é reutilizado sem baixar o feed ou a tabela de novo.
+
+- fresh_seconds: respostas validadas há menos tempo que isso são usadas sem
+  nenhuma requisição (0 = sempre revalidar);
+- ttl: entradas não validadas há mais tempo que isso são removidas;
+- offline: devolve apenas o que está no cache, sem acessar a rede.
+
+Configuração por variáveis de ambiente (open_http_cache_from_env):
+HTTP_CACHE_FILE, HTTP_CACHE_TTL_DAYS, HTTP_CACHE_FRESH_SECONDS,
+HTTP_CACHE_OFFLINE e HTTP_CACHE_DISABLED.
+
+A chave de cada entrada é a URL mais um hash do cabeçalho Authorization,
+para que respostas obtidas com chaves de API diferentes não se misturem;
+a chave em si nunca é gravada.
+
+get() devolve o corpo inteiro como texto (respostas pequenas, como as da
+API do Grist). open_stream() serve os feeds grandes com memória constante:
+um corpo novo (200) é entregue ao leitor enquanto chega e copiado para um
+arquivo temporário, gravado no cache como BLOB ao final da leitura; um
+corpo guardado (304, fresco ou offline) é lido do SQLite em blocos
+(Connection.blobopen). Entradas gravadas como texto por get() não são
+revalidadas por open_stream(), que as baixa de novo como BLOB (a não ser
+no modo offline).
+"""
+
+import contextlib
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import requests
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http_cache.sqlite3')
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_FRESH_SECONDS = 0
+
+# Tamanho dos blocos lidos e copiados nos corpos em streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+# Corpo novo em memória até este tamanho; acima disso, em arquivo temporário
+SPOOL_MAX_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    cache_key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    validated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_validated_at ON responses (validated_at);
+"""
+
+class CacheMiss(requests.exceptions.RequestException):
+    """URL sem resposta guardada no modo offline."""
+
+def cache_key(url, headers=None):
+    """URL mais o hash do cabeçalho Authorization, se houver."""
+    authorization = (headers or {}).get('Authorization')
+    if not authorization:
+        return url
+    return f"{url}#{hashlib.sha256(authorization.encode('utf-8')).hexdigest()[:16]}"
+
+class _TeeReader(io.RawIOBase):
+    """Lê o corpo da resposta e guarda uma cópia de tudo o que foi lido em `spool`."""
+
+    def __init__(self, raw, spool):
+        self.raw = raw
+        self.spool = spool
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        self.spool.write(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def drain(self):
+        while self.read(STREAM_CHUNK_SIZE):
+            pass
+
+class _BlobReader(io.RawIOBase):
+    """Leitura em blocos de um corpo BLOB do cache, com o acesso ao SQLite serializado por `lock`."""
+
+    def __init__(self, connection, lock, rowid):
+        self.lock = lock
+        with lock:
+            self.blob = connection.blobopen('responses', 'body', rowid, readonly=True)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        with self.lock:
+            data = self.blob.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            with self.lock:
+                self.blob.close()
+        super().close()
+
+class HttpCache:
+    """
+    Cache de respostas GET com revalidação condicional. Pode ser usado pelas
+    threads da coleta concorrente dos IPTs (o acesso ao SQLite é serializado).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=DEFAULT_TTL, fresh_seconds=DEFAULT_FRESH_SECONDS, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.fresh_seconds = fresh_seconds
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.stats = {'fresh': 0, 'not_modified': 0, 'downloaded': 0, 'offline': 0}
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        if not offline:
+            self.evict()
+
+    def close(self):
+        self.connection.close()
+
+    def evict(self):
+        """Remove as entradas não validadas dentro do ttl; retorna quantas foram removidas."""
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                'DELETE FROM responses WHERE validated_at < ?', (time.time() - self.ttl,)
+            )
+        return cursor.rowcount
+
+    def _load(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT etag, last_modified, body, validated_at FROM responses WHERE cache_key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('etag', 'last_modified', 'body', 'validated_at'), row))
+
+    def _load_stream_entry(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT rowid, etag, last_modified, typeof(body), validated_at FROM responses WHERE cache_key = ?',
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('rowid', 'etag', 'last_modified', 'type', 'validated_at'), row))
+
+    def _stored_stream(self, entry):
+        """Leitor binário do corpo guardado em `entry`."""
+        if entry['type'] == 'blob' and hasattr(self.connection, 'blobopen'):
+            return _BlobReader(self.connection, self.lock, entry['rowid'])
+        with self.lock:
+            (body,) = self.connection.execute(
+                'SELECT body FROM responses WHERE rowid = ?', (entry['rowid'],)
+            ).fetchone()
+        # Entradas antigas em texto (só no modo offline) ou SQLite sem blobopen
+        return io.BytesIO(body.encode('utf-8') if isinstance(body, str) else body)
+
+    def _store_stream(self, key, url, response, spool, now):
+        """Grava como BLOB o corpo copiado em `spool`, em blocos quando possível."""
+        size = spool.tell()
+        spool.seek(0)
+        values = (key, url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        with self.lock, self.connection:
+            if not hasattr(self.connection, 'blobopen'):
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO responses '
+                    '(cache_key, url, etag, last_modified, body, fetched_at, validated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    values + (spool.read(), now, now)
+                )
+                return
+            rowid = self.connection.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(cache_key, url, etag, last_modified, body, fetched_at, validated_at) '
+                'VALUES (?, ?, ?, ?, zeroblob(?), ?, ?)',
+                values + (size, now, now)
+            ).lastrowid
+            with self.connection.blobopen('responses', 'body', rowid) as blob:
+                for chunk in iter(lambda: spool.read(STREAM_CHUNK_SIZE), b''):
+                    blob.write(chunk)
+
+    @contextlib.contextmanager
+    def open_stream(self, url, session=None, headers=None, timeout=30):
+        """
+        Leitor binário (arquivo) do corpo da resposta a GET `url`, usando o
+        cache quando possível, sem carregar o corpo inteiro na memória:
+
+            with cache.open_stream(url) as source:
+                for event, elem in ET.iterparse(source): ...
+
+        Um corpo novo só é gravado no cache se o bloco `with` terminar sem
+        erro (o restante não lido é consumido antes). Erros HTTP e de rede
+        são lançados como requests.exceptions.RequestException.
+        """
+        key = cache_key(url, headers)
+        entry = self._load_stream_entry(key)
+        now = time.time()
+
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(f"{url} não está no cache (modo offline)")
+            self._count('offline')
+            with contextlib.closing(self._stored_stream(entry)) as source:
+                yield source
+            return
+        # Entradas em texto (gravadas por get()) são baixadas de novo como BLOB
+        if entry and entry['type'] != 'blob':
+            entry = None
+        if entry and now - entry['validated_at'] < self.fresh_seconds:
+            self._count('fresh')
+            with contextlib.closing(self._stored_stream(entry)) as source:
+                yield source
+            return
+
+        request_headers = dict(headers or {})
+        if entry and entry['etag']:
+            request_headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = (session or requests).get(url, headers=request_headers, timeout=timeout, stream=True)
+        with response:
+            if response.status_code == 304 and entry:
+                with self.lock, self.connection:
+                    self.connection.execute(
+                        'UPDATE responses SET validated_at = ? WHERE cache_key = ?', (now, key)
+                    )
+                self._count('not_modified')
+                with contextlib.closing(self._stored_stream(entry)) as source:
+                    yield source
+                return
+            response.raise_for_status()
+
+            response.raw.decode_content = True
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+                source = _TeeReader(response.raw, spool)
+                yield io.BufferedReader(source, STREAM_CHUNK_SIZE)
+                source.drain()
+                self._store_stream(key, url, response, spool, now)
+        self._count('downloaded')
+
+    def _count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def get(self, url, session=None, headers=None, timeout=30):
+        """
+        Corpo (texto) da resposta a GET `url`, usando o cache quando possível.
+        Erros HTTP e de rede são lançados como requests.exceptions.RequestException.
+        """
+        key = cache_key(url, headers)
+        entry = self._load(key)
+        now = time.time()
+
+        # Corpos BLOB (gravados por open_stream) estão nos bytes recebidos
+        if entry and isinstance(entry['body'], bytes):
+            if not self.offline:
+                entry = None
+            else:
+                entry['body'] = entry['body'].decode('utf-8', errors='replace')
+
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(f"{url} não está no cache (modo offline)")
+            self._count('offline')
+            return entry['body']
+        if entry and now - entry['validated_at'] < self.fresh_seconds:
+            self._count('fresh')
+            return entry['body']
+
+        request_headers = dict(headers or {})
+        if entry and entry['etag']:
+            request_headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = (session or requests).get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry:
+            with self.lock, self.connection:
+                self.connection.execute(
+                    'UPDATE responses SET validated_at = ? WHERE cache_key = ?', (now, key)
+                )
+            self._count('not_modified')
+            return entry['body']
+        response.raise_for_status()
+
+        body = response.text
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(cache_key, url, etag, last_modified, body, fetched_at, validated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, url, response.headers.get('ETag'), response.headers.get('Last-Modified'), body, now, now)
+            )
+        self._count('downloaded')
+        return body
+
+    def summary(self):
+        """Linha de resumo do uso do cache na execução."""
+        stats = self.stats
+        return (
+            f"{stats['downloaded']} baixadas, {stats['not_modified']} não modificadas (304), "
+            f"{stats['fresh']} sem revalidar, {stats['offline']} do cache offline"
+        )
+
+def _env_flag(name):
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+def open_http_cache_from_env():
+    """HttpCache configurado pelas variáveis HTTP_CACHE_*, ou None se desativado."""
+    if _env_flag('HTTP_CACHE_DISABLED'):
+        return None
+    ttl_days = os.environ.get('HTTP_CACHE_TTL_DAYS')
+    fresh_seconds = os.environ.get('HTTP_CACHE_FRESH_SECONDS')
+    return HttpCache(
+        os.environ.get('HTTP_CACHE_FILE') or DEFAULT_CACHE_FILE,
+        ttl=float(ttl_days) * 24 * 3600 if ttl_days else DEFAULT_TTL,
+        fresh_seconds=float(fresh_seconds) if fresh_seconds else DEFAULT_FRESH_SECONDS,
+        offline=_env_flag('HTTP_CACHE_OFFLINE')
+    )
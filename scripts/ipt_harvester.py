@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Coleta concorrente dos feeds RSS (rss.do) dos IPTs.
+
+Buscar os feeds um a um faz a descoberta levar a soma das latências de
+todos os IPTs. Aqui os feeds são baixados e interpretados em um pool de
+threads, com:
+
+- um limite global de requisições simultâneas (threads do pool);
+- um limite por host, para não sobrecarregar IPTs que hospedam vários
+  repositórios (ipt.jbrj.gov.br/jabot e /reflora, ipt.sibbr.gov.br/...);
+- uma requests.Session por host, com keep-alive e pool de conexões do
+  tamanho do limite do host;
+- os resultados entregues à medida que cada feed termina.
+
+Um feed só é enviado ao pool quando o seu host tem vaga, de modo que as
+threads nunca ficam paradas esperando por um host ocupado.
+"""
+
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Requisições simultâneas no total e por host
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_PER_HOST = 2
+
+USER_AGENT = "DarwinCoreJSON-ipt-harvester"
+
+def host_of(url):
+    """Host (com porta) de uma URL, usado para agrupar os limites e as sessões."""
+    return urlsplit(url).netloc.lower()
+
+def create_host_session(pool_size):
+    """Session com keep-alive e pool de `pool_size` conexões para um host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def _harvest_one(position, ipt, session, load):
+    start = time.monotonic()
+    resources = load(ipt, session=session)
+    return {
+        'position': position,
+        'ipt': ipt,
+        'resources': resources,
+        'elapsed': time.monotonic() - start
+    }
+
+def harvest_feeds(ipts, load, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST):
+    """
+    Baixa e interpreta o RSS de cada IPT de `ipts` com load(ipt, session=...)
+    -> lista de recursos, ou None se o feed não pôde ser obtido. Gera, na
+    ordem em que terminam, dicionários com 'position' (índice em `ipts`),
+    'ipt', 'resources' e 'elapsed' (segundos).
+    """
+    pending = defaultdict(deque)
+    for position, ipt in enumerate(ipts):
+        pending[host_of(ipt['rss_url'])].append((position, ipt))
+    sessions = {host: create_host_session(per_host) for host in pending}
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ipt-harvester')
+
+    def submit(host):
+        position, ipt = pending[host].popleft()
+        future = executor.submit(_harvest_one, position, ipt, sessions[host], load)
+        running[future] = host
+
+    try:
+        for host, queue in pending.items():
+            for _ in range(min(per_host, len(queue))):
+                submit(host)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host = running.pop(future)
+                if pending[host]:
+                    submit(host)
+                yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for session in sessions.values():
+            session.close()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Classificação do kingdom dos recursos dos IPTs pelo título.
+
+interpret_kingdom_from_title (check_ipt_resources.py) procurava cada
+palavra-chave no título com um laço em Python (cerca de 20 de Plantae e
+depois 16 de Animalia), recurso por recurso. KingdomClassifier compila
+todas as palavras-chave uma única vez em uma expressão regular de
+alternativas e classifica o título em uma única varredura:
+
+- as palavras de cada kingdom viram uma árvore de prefixos
+  ("herb(?:ário)?"), para que cada posição do título teste poucos
+  ramos, e as posições que não começam com a inicial de nenhuma palavra
+  são descartadas por uma classe de caracteres;
+- a alternativa fica dentro de um lookahead, testado em cada posição do
+  título: nenhuma ocorrência é perdida por se sobrepor a outra;
+- as alternativas seguem a prioridade dos kingdoms (e, dentro de cada um,
+  a palavra mais longa). Numa posição onde começam palavras de dois
+  kingdoms, vence a do mais prioritário, então o resultado é o mesmo da
+  busca kingdom por kingdom: o primeiro kingdom com alguma palavra no
+  título;
+- classify_many classifica um feed inteiro em uma varredura só, sobre os
+  títulos unidos por quebras de linha.
+
+O resultado traz a evidência (palavra-chave e posição no título), para que
+a classificação de um inventário grande possa ser auditada.
+
+As palavras-chave padrão são as de interpret_kingdom_from_title; listas
+adicionais (termos em português, Fungi) vêm de
+packages/ingest/referencias/kingdomKeywords.json, um objeto JSON
+{kingdom: [palavras-chave]} em ordem de prioridade. Os kingdoms do arquivo
+vêm antes dos padrão. Variável de ambiente: KINGDOM_KEYWORDS_FILE (vazia
+para usar só as padrão).
+
+Uso (confere a classificação com o kingdom declarado em occurrences.csv):
+    python kingdom_classifier.py [--keywords ARQUIVO] [--references CSV] [--all]
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import re
+
+REFERENCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'packages', 'ingest', 'referencias')
+DEFAULT_KEYWORDS_FILE = os.path.join(REFERENCES_DIR, 'kingdomKeywords.json')
+DEFAULT_REFERENCES_CSV = os.path.join(REFERENCES_DIR, 'occurrences.csv')
+
+# Palavras-chave originais de interpret_kingdom_from_title, em ordem de prioridade
+DEFAULT_KEYWORDS = [
+    ('Plantae', [
+        'flora', 'plant', 'botanic', 'herb', 'tree', 'flower', 'leaf', 'seed',
+        'pollen', 'algae', 'moss', 'fern', 'grass', 'fungi', 'mushroom',
+        'lichen', 'bryophyte', 'pteridophyte', 'gymnosperm', 'angiosperm'
+    ]),
+    ('Animalia', [
+        'fauna', 'animal', 'bird', 'mammal', 'fish', 'insect', 'beetle',
+        'butterfly', 'spider', 'reptile', 'amphibian', 'mollusk', 'arthropod',
+        'vertebrate', 'invertebrate', 'zoo'
+    ])
+]
+
+def load_keywords(path):
+    """Listas de palavras-chave de um arquivo JSON {kingdom: [palavras]}, como [(kingdom, palavras)]."""
+    with open(path, encoding='utf-8') as f:
+        contents = json.load(f)
+    if not isinstance(contents, dict) or not all(isinstance(words, list) for words in contents.values()):
+        raise ValueError(f"{path}: esperado um objeto {{kingdom: [palavras-chave]}}")
+    return list(contents.items())
+
+def merge_keywords(*keyword_sets):
+    """
+    Une listas [(kingdom, palavras)]: a ordem dos kingdoms é a da primeira
+    vez que aparecem; palavras repetidas ficam com o primeiro kingdom.
+    """
+    merged = {}
+    seen = set()
+    for keyword_set in keyword_sets:
+        for kingdom, words in keyword_set:
+            bucket = merged.setdefault(kingdom, [])
+            for word in words:
+                word = word.strip().lower()
+                if word and word not in seen:
+                    seen.add(word)
+                    bucket.append(word)
+    return [(kingdom, words) for kingdom, words in merged.items() if words]
+
+def _prefix_tree_pattern(words):
+    """Expressão regular que casa exatamente as `words`, fatoradas em árvore de prefixos (a mais longa primeiro)."""
+    tree = {}
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 and '' not in node else f"(?:{'|'.join(branches)})"
+        return body + ('?' if '' in node else '')
+
+    return build(tree)
+
+class KingdomClassifier:
+    """
+    Classificador de títulos por palavras-chave, compilado uma única vez.
+    `keywords` é uma lista [(kingdom, palavras)] em ordem de prioridade; a
+    busca é por substring, sem diferenciar maiúsculas.
+    """
+
+    def __init__(self, keywords=DEFAULT_KEYWORDS):
+        self.keywords = merge_keywords(keywords)
+        self.kingdoms = [kingdom for kingdom, _ in self.keywords]
+        self.rank = {word: position for position, (_, words) in enumerate(self.keywords) for word in words}
+        self.pattern = None
+        if self.keywords:
+            initials = ''.join(sorted({re.escape(word[0]) for word in self.rank}))
+            alternatives = '|'.join(_prefix_tree_pattern(words) for _, words in self.keywords)
+            self.pattern = re.compile(f"(?=[{initials}])(?=({alternatives}))")
+
+    def _evidence(self, keyword, start):
+        return {'kingdom': self.kingdoms[self.rank[keyword]], 'keyword': keyword, 'start': start}
+
+    def matches(self, title):
+        """Todas as palavras-chave encontradas no título, como evidências, na ordem em que aparecem."""
+        if not title or self.pattern is None:
+            return []
+        return [self._evidence(match.group(1), match.start()) for match in self.pattern.finditer(title.lower())]
+
+    def classify(self, title, default_kingdom):
+        """
+        (kingdom, evidência) do título: o kingdom mais prioritário com alguma
+        palavra-chave no título e a primeira ocorrência dela, ou
+        (default_kingdom, None) se nenhuma aparece.
+        """
+        best = None
+        if title and self.pattern is not None:
+            for match in self.pattern.finditer(title.lower()):
+                keyword = match.group(1)
+                if best is None or self.rank[keyword] < self.rank[best[0]]:
+                    best = (keyword, match.start())
+                    if self.rank[keyword] == 0:
+                        break
+        if best is None:
+            return default_kingdom, None
+        evidence = self._evidence(*best)
+        return evidence['kingdom'], evidence
+
+    def classify_many(self, titles, default_kingdom):
+        """
+        classify() de cada título de `titles` (um feed inteiro, por exemplo),
+        em uma única varredura; `default_kingdom` pode ser uma lista com o
+        padrão de cada título.
+        """
+        titles = [(title or '').lower() for title in titles]
+        if isinstance(default_kingdom, str) or default_kingdom is None:
+            defaults = [default_kingdom] * len(titles)
+        else:
+            defaults = list(default_kingdom)
+        best = [None] * len(titles)
+        if self.pattern is not None and titles:
+            # Palavras-chave não contêm quebras de linha: nenhuma ocorrência cruza dois títulos
+            offsets = []
+            position = 0
+            for title in titles:
+                offsets.append(position)
+                position += len(title.replace('\n', ' ')) + 1
+            text = '\n'.join(title.replace('\n', ' ') for title in titles)
+            for match in self.pattern.finditer(text):
+                index = bisect.bisect_right(offsets, match.start()) - 1
+                keyword = match.group(1)
+                current = best[index]
+                if current is None or self.rank[keyword] < self.rank[current[0]]:
+                    best[index] = (keyword, match.start() - offsets[index])
+        results = []
+        for found, default in zip(best, defaults):
+            if found is None:
+                results.append((default, None))
+            else:
+                evidence = self._evidence(*found)
+                results.append((evidence['kingdom'], evidence))
+        return results
+
+    def classify_resources(self, resources, default_kingdom):
+        """Preenche 'kingdom' e 'kingdom_evidence' (palavra-chave ou '') dos recursos, em lote."""
+        results = self.classify_many([resource.get('title') for resource in resources], default_kingdom)
+        for resource, (kingdom, evidence) in zip(resources, results):
+            resource['kingdom'] = kingdom
+            resource['kingdom_evidence'] = evidence['keyword'] if evidence else ''
+        return resources
+
+def open_kingdom_classifier_from_env():
+    """
+    Classificador com as palavras-chave padrão e as de KINGDOM_KEYWORDS_FILE
+    (padrão: referencias/kingdomKeywords.json; vazio ou arquivo ausente: só
+    as padrão).
+    """
+    path = os.environ.get('KINGDOM_KEYWORDS_FILE', DEFAULT_KEYWORDS_FILE)
+    if not path:
+        return KingdomClassifier()
+    try:
+        extra = load_keywords(path)
+    except FileNotFoundError:
+        return KingdomClassifier()
+    except (OSError, ValueError) as e:
+        print(f"Aviso: palavras-chave de kingdom ignoradas ({path}): {e}")
+        return KingdomClassifier()
+    return KingdomClassifier(merge_keywords(extra, DEFAULT_KEYWORDS))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Confere a classificação de kingdom pelo título com o kingdom declarado nas referências'
+    )
+    parser.add_argument('--keywords', default=os.environ.get('KINGDOM_KEYWORDS_FILE', DEFAULT_KEYWORDS_FILE),
+                        help='Arquivo JSON com palavras-chave adicionais (vazio: só as padrão)')
+    parser.add_argument('--references', default=DEFAULT_REFERENCES_CSV,
+                        help='CSV com as colunas nome e kingdom (padrão: referencias/occurrences.csv)')
+    parser.add_argument('--all', action='store_true', help='Lista também os recursos classificados corretamente')
+    args = parser.parse_args()
+
+    keywords = DEFAULT_KEYWORDS
+    if args.keywords:
+        keywords = merge_keywords(load_keywords(args.keywords), DEFAULT_KEYWORDS)
+    classifier = KingdomClassifier(keywords)
+
+    with open(args.references, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    results = classifier.classify_many([row['nome'] for row in rows], None)
+
+    agreed = by_default = 0
+    for row, (kingdom, evidence) in zip(rows, results):
+        declared = [item.strip() for item in (row.get('kingdom') or '').split(',') if item.strip()]
+        if evidence is None:
+            by_default += 1
+            status = 'SEM EVIDÊNCIA'
+        elif kingdom in declared:
+            agreed += 1
+            status = 'OK'
+        else:
+            status = 'DIVERGENTE'
+        if args.all or status != 'OK':
+            found = f"{kingdom} ('{evidence['keyword']}' na posição {evidence['start']})" if evidence else '-'
+            print(f"  {status:13} declarado {'/'.join(declared) or '-':16} classificado {found}: {row['nome'][:70]}")
+
+    total = len(rows)
+    print(f"{total} recursos: {agreed} de acordo com o kingdom declarado, "
+          f"{total - agreed - by_default} divergentes, {by_default} sem palavra-chave (kingdom padrão do repositório)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Motor de manutenção da coleção ocorrencias em uma única varredura.
+
+Cada correção pós-ingestão (datas numéricas, coordenadas, país/estado,
+canonicalName...) é um transformador de campos registrado com
+@register_transformer. O motor lê a coleção uma única vez, com a união das
+projeções dos transformadores selecionados, passa cada lote do cursor por
+todos eles e junta os $set de cada documento em uma única operação
+UpdateOne, enviada em lotes com bulk_write não ordenado. Assim, N correções
+custam uma varredura da coleção em vez de N.
+
+Um transformador define:
+- name: nome usado na linha de comando e nos contadores;
+- projection: campos que precisa ler (além de _id);
+- dirty_filter(): filtro dos documentos que ainda precisam da correção
+  (modo incremental), ou None se não souber restringir;
+- new_counters(): contadores próprios, somados entre partições;
+- transform_batch(records, counters): lista alinhada com `records` de
+  dicionários $set (vazios quando o documento não muda);
+- log_summary(counters, logger): resumo dos contadores ao final.
+"""
+
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from maintenance_metrics import RunMetrics
+from pipelined_copy import iter_cursor_batches
+
+logger = logging.getLogger(__name__)
+
+# Transformadores disponíveis, por nome
+TRANSFORMERS = {}
+
+def register_transformer(transformer_class):
+    """Decorador que registra uma classe de transformador pelo seu `name`."""
+    if transformer_class.name in TRANSFORMERS:
+        raise ValueError(f"Transformador '{transformer_class.name}' já registrado")
+    TRANSFORMERS[transformer_class.name] = transformer_class
+    return transformer_class
+
+def build_transformers(names):
+    """Instancia os transformadores registrados, na ordem indicada."""
+    unknown = [name for name in names if name not in TRANSFORMERS]
+    if unknown:
+        raise ValueError(f"Transformadores desconhecidos: {', '.join(unknown)}")
+    return [TRANSFORMERS[name]() for name in names]
+
+class FieldTransformer:
+    """Base dos transformadores de campos do motor de manutenção."""
+
+    name = None
+    projection = ()
+
+    def new_counters(self):
+        return {}
+
+    def dirty_filter(self):
+        return None
+
+    def transform(self, record, counters):
+        """$set de um documento; usado pela implementação padrão de transform_batch."""
+        raise NotImplementedError
+
+    def transform_batch(self, records, counters):
+        return [self.transform(record, counters) for record in records]
+
+    def log_summary(self, counters, logger):
+        pass
+
+def combined_projection(transformers):
+    """União das projeções dos transformadores."""
+    projection = {'_id': 1}
+    for transformer in transformers:
+        projection.update({field: 1 for field in transformer.projection})
+    return projection
+
+def combined_dirty_filter(transformers):
+    """
+    Documentos que precisam de pelo menos uma das correções ($or dos filtros),
+    ou None se algum transformador não souber restringir os seus.
+    """
+    filters = [transformer.dirty_filter() for transformer in transformers]
+    if any(dirty is None for dirty in filters):
+        return None
+    return filters[0] if len(filters) == 1 else {'$or': filters}
+
+def merge_sets(record_id, sets):
+    """
+    Junta os $set dos transformadores para um documento. Dois transformadores
+    gravando valores diferentes no mesmo campo indicam um erro de registro.
+    """
+    merged = {}
+    for transformer, changes in sets:
+        for field, value in changes.items():
+            if field in merged and merged[field] != value:
+                raise ValueError(
+                    f"Transformador '{transformer.name}' altera {field} de _id {record_id} "
+                    "já alterado por outro transformador"
+                )
+            merged[field] = value
+    return merged
+
+def new_counters(transformers):
+    """Contadores de uma execução (ou de uma partição)."""
+    return {
+        'total_processed': 0,
+        'write_totals': {'batches': 0, 'matched': 0, 'modified': 0, 'failed': 0},
+        'transformers': {transformer.name: transformer.new_counters() for transformer in transformers}
+    }
+
+def flush_updates(collection, operations, batch_number, label=''):
+    """
+    Envia um lote de operações UpdateOne com bulk_write não ordenado.
+    Em caso de falha parcial (BulkWriteError), as operações válidas do lote
+    continuam sendo aplicadas pelo servidor; os erros são registrados no log.
+    Retorna uma tupla (matched, modified, failed).
+    """
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        matched, modified, failed = result.matched_count, result.modified_count, 0
+    except BulkWriteError as e:
+        details = e.details
+        matched = details.get('nMatched', 0)
+        modified = details.get('nModified', 0)
+        write_errors = details.get('writeErrors', [])
+        failed = len(write_errors)
+        for error in write_errors[:10]:
+            record_id = error.get('op', {}).get('q', {}).get('_id')
+            logger.error(f"{label}Lote {batch_number}: falha ao atualizar _id {record_id}: {error.get('errmsg')}")
+        if len(write_errors) > 10:
+            logger.error(f"{label}Lote {batch_number}: mais {len(write_errors) - 10} erros omitidos")
+        for error in details.get('writeConcernErrors', []):
+            logger.error(f"{label}Lote {batch_number}: erro de write concern: {error.get('errmsg')}")
+
+    logger.info(
+        f"{label}Lote {batch_number}: {len(operations)} operações, "
+        f"matched={matched}, modified={modified}, falhas={failed}"
+    )
+    return matched, modified, failed
+
+def build_updates(records, transformers, counters):
+    """Operações UpdateOne de um lote, com os $set de todos os transformadores juntos."""
+    results = [
+        (transformer, transformer.transform_batch(records, counters['transformers'][transformer.name]))
+        for transformer in transformers
+    ]
+    operations = []
+    for position, record in enumerate(records):
+        changes = merge_sets(record['_id'], [(transformer, sets[position]) for transformer, sets in results])
+        if changes:
+            operations.append(UpdateOne({'_id': record['_id']}, {'$set': changes}))
+    return operations
+
+def run_single_pass(collection, transformers, query, batch_size, counters, total_records=None, label='', on_commit=None,
+                    metrics=None, find_options=None):
+    """
+    Aplica os transformadores aos documentos de `query` em uma única leitura,
+    acumulando as estatísticas em `counters` e os tempos de fetch, transform
+    e write em `metrics`. Os documentos são lidos em ordem de _id e, após
+    cada lote gravado, on_commit(último _id) registra o checkpoint.
+    `find_options` são repassadas ao find() (mongodb_client.cursor_options).
+    """
+    metrics = metrics or RunMetrics(total_documents=total_records)
+    write_totals = counters['write_totals']
+    pending_operations = []
+    last_id = None
+
+    def flush(operations):
+        write_totals['batches'] += 1
+        with metrics.stage('write'):
+            matched, modified, failed = flush_updates(collection, operations, write_totals['batches'], label)
+        write_totals['matched'] += matched
+        write_totals['modified'] += modified
+        write_totals['failed'] += failed
+
+    cursor = collection.find(query, combined_projection(transformers), **(find_options or {})).sort('_id', 1)
+
+    for records in metrics.timed_batches('fetch', iter_cursor_batches(cursor, batch_size)):
+        # Acumular atualizações no lote de escrita
+        with metrics.stage('transform'):
+            pending_operations.extend(build_updates(records, transformers, counters))
+        counters['total_processed'] += len(records)
+        last_id = records[-1]['_id']
+
+        if len(pending_operations) >= batch_size:
+            flush(pending_operations)
+            pending_operations = []
+            if on_commit:
+                on_commit(last_id)
+
+        # Log de progresso
+        metrics.add_documents(len(records))
+        progress = f"{counters['total_processed']}/{total_records}" if total_records is not None else counters['total_processed']
+        logger.info(f"{label}Processados {progress} registros ({metrics.progress_line()})")
+
+    # Enviar último lote se houver operações pendentes
+    if pending_operations:
+        flush(pending_operations)
+
+    if on_commit:
+        on_commit(last_id, done=True)
+    return counters
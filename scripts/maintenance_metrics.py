@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Instrumentação dos scripts de manutenção do MongoDB.
+
+RunMetrics mede, por estágio (fetch = lote do cursor, transform = conversão
+do lote, write = bulk_write/insert_many), a duração de cada lote em um
+histograma com buckets fixos e uma amostra limitada para percentis; mantém
+a vazão em docs/s em janelas deslizantes e estima o tempo restante (ETA) a
+partir do total de count_documents.
+
+O estado pode ser exportado como textfile do Prometheus (para o textfile
+collector do node_exporter, regravado periodicamente durante a execução) e
+como relatório JSON ao final. Cada processo de partição mede o seu próprio
+RunMetrics; o processo principal junta os snapshots com merge().
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Limites superiores (em segundos) dos buckets dos histogramas
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Janelas (em segundos) da vazão em docs/s
+THROUGHPUT_WINDOWS = (10, 60, 300)
+
+# Espaçamento mínimo (em segundos) entre os pontos guardados para as janelas
+POINT_SPACING = 0.5
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+# Amostras guardadas por estágio para os percentis (reservoir sampling)
+MAX_SAMPLES = 10000
+
+# Intervalo mínimo (em segundos) entre regravações do textfile
+DEFAULT_EXPORT_INTERVAL = 15
+
+METRIC_PREFIX = 'dwc2json_maintenance'
+
+def _percentile(samples, fraction):
+    """Percentil por interpolação linear sobre as amostras ordenadas."""
+    if not samples:
+        return None
+    position = (len(samples) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(samples) - 1)
+    return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+def _write_atomically(path, content):
+    """Grava com nome temporário e renomeia, para que leitores nunca vejam um arquivo parcial."""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as output_file:
+        output_file.write(content)
+    os.replace(temporary_path, path)
+
+def _merge_samples(mine, mine_count, theirs, theirs_count):
+    """
+    Junta duas amostras de reservoir que representam `mine_count` e
+    `theirs_count` observações: cada lado entra com uma parte proporcional à
+    sua contagem, para que a amostra continue uniforme sobre o total.
+    """
+    if len(mine) + len(theirs) <= MAX_SAMPLES:
+        return list(mine) + list(theirs)
+    total = mine_count + theirs_count
+    taken_mine = min(len(mine), round(MAX_SAMPLES * mine_count / total))
+    taken_theirs = min(len(theirs), MAX_SAMPLES - taken_mine)
+    return random.sample(mine, taken_mine) + random.sample(theirs, taken_theirs)
+
+def format_duration(seconds):
+    """Formata segundos como HH:MM:SS."""
+    if seconds is None:
+        return '--:--:--'
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+class StageHistogram:
+    """Histograma de durações de um estágio, com amostra para percentis."""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples = []
+        self.seen = 0
+
+    def observe(self, seconds):
+        for position, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[position] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self._sample(seconds)
+
+    def _sample(self, seconds):
+        self.seen += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.seen)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = seconds
+
+    def snapshot(self):
+        return {
+            'buckets': list(self.buckets),
+            'count': self.count,
+            'sum': self.total,
+            'max': self.maximum,
+            'samples': list(self.samples)
+        }
+
+    def merge(self, snapshot):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, snapshot['buckets'])]
+        self.count += snapshot['count']
+        self.total += snapshot['sum']
+        self.maximum = max(self.maximum, snapshot['max'])
+        self.samples = _merge_samples(self.samples, self.seen, snapshot['samples'], snapshot['count'])
+        self.seen += snapshot['count']
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.total, 6),
+            'mean_seconds': round(self.total / self.count, 6) if self.count else None,
+            'max_seconds': round(self.maximum, 6),
+            'percentiles': {
+                f"p{int(fraction * 100)}": round(_percentile(ordered, fraction), 6) if ordered else None
+                for fraction in PERCENTILES
+            },
+            'buckets': {
+                str(bound): cumulative
+                for bound, cumulative in zip(LATENCY_BUCKETS, self._cumulative())
+            }
+        }
+
+    def _cumulative(self):
+        cumulative, total = [], 0
+        for count in self.buckets:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+class RunMetrics:
+    """Métricas de uma execução (ou de uma partição) de um script de manutenção."""
+
+    def __init__(self, script='', total_documents=None, textfile=None, export_interval=DEFAULT_EXPORT_INTERVAL,
+                 clock=time.monotonic):
+        self.script = script
+        self.total_documents = total_documents
+        self.textfile = textfile
+        self.export_interval = export_interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.start = clock()
+        self.last_export = self.start
+        self.stages = {}
+        self.documents = 0
+        # Documentos já processados em execuções anteriores (retomada)
+        self.resumed_documents = 0
+        self.points = deque([(self.start, 0)])
+
+    def observe(self, stage, seconds):
+        """Registra a duração de um lote no estágio."""
+        with self.lock:
+            self.stages.setdefault(stage, StageHistogram()).observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Mede o bloco como um lote do estágio `name`."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self.clock() - start)
+
+    def timed_batches(self, name, batches):
+        """Repassa os lotes de `batches`, medindo o tempo de obtenção de cada um."""
+        iterator = iter(batches)
+        while True:
+            start = self.clock()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            self.observe(name, self.clock() - start)
+            yield batch
+
+    def add_resumed(self, documents):
+        """Contabiliza documentos concluídos antes da retomada (entram no ETA, não na vazão)."""
+        with self.lock:
+            self.resumed_documents += documents
+
+    def add_documents(self, documents):
+        """Contabiliza documentos processados e regrava o textfile se o intervalo passou."""
+        with self.lock:
+            now = self.clock()
+            self.documents += documents
+            # Pontos próximos são fundidos, limitando a fila a ~max(janela)/POINT_SPACING
+            if len(self.points) >= 2 and now - self.points[-2][0] < POINT_SPACING:
+                self.points[-1] = (now, self.documents)
+            else:
+                self.points.append((now, self.documents))
+            horizon = now - max(THROUGHPUT_WINDOWS)
+            while len(self.points) > 2 and self.points[1][0] <= horizon:
+                self.points.popleft()
+            export = self.textfile and now - self.last_export >= self.export_interval
+            if export:
+                self.last_export = now
+        if export:
+            self.write_textfile(self.textfile)
+
+    def rates(self):
+        """Vazão em docs/s em cada janela (ou desde o início, se a execução for mais curta)."""
+        with self.lock:
+            now = self.clock()
+            rates = {}
+            for window in THROUGHPUT_WINDOWS:
+                since = now - window
+                base_time, base_documents = self.points[0]
+                for point_time, point_documents in self.points:
+                    if point_time > since:
+                        break
+                    base_time, base_documents = point_time, point_documents
+                elapsed = now - base_time
+                rates[f"{window}s"] = (self.documents - base_documents) / elapsed if elapsed > 0 else 0.0
+            elapsed = now - self.start
+            rates['overall'] = self.documents / elapsed if elapsed > 0 else 0.0
+            return rates
+
+    def eta_seconds(self):
+        """Tempo restante estimado pela vazão da janela de 60 s, ou None sem total."""
+        if self.total_documents is None:
+            return None
+        remaining = max(self.total_documents - self.resumed_documents - self.documents, 0)
+        rate = self.rates()['60s']
+        if remaining == 0:
+            return 0.0
+        return remaining / rate if rate > 0 else None
+
+    def progress_line(self):
+        """Trecho de log com a vazão e o ETA."""
+        rates = self.rates()
+        return f"{rates['60s']:.0f} docs/s (60s), ETA {format_duration(self.eta_seconds())}"
+
+    def snapshot(self):
+        """Estado serializável, para juntar as métricas das partições com merge()."""
+        with self.lock:
+            return {
+                'documents': self.documents,
+                'resumed_documents': self.resumed_documents,
+                'stages': {name: histogram.snapshot() for name, histogram in self.stages.items()}
+            }
+
+    def merge(self, snapshot):
+        """Junta os histogramas de uma partição; os documentos entram na vazão agora."""
+        for name, stage_snapshot in snapshot['stages'].items():
+            with self.lock:
+                self.stages.setdefault(name, StageHistogram()).merge(stage_snapshot)
+        self.add_resumed(snapshot['resumed_documents'])
+        self.add_documents(snapshot['documents'])
+
+    def report(self):
+        """Relatório da execução (dicionário serializável em JSON)."""
+        rates = self.rates()
+        with self.lock:
+            stages = {name: histogram.summary() for name, histogram in sorted(self.stages.items())}
+        return {
+            'script': self.script,
+            'started_at': self.started_at,
+            'elapsed_seconds': round(self.clock() - self.start, 3),
+            'documents': self.documents,
+            'resumed_documents': self.resumed_documents,
+            'total_documents': self.total_documents,
+            'docs_per_second': {window: round(rate, 1) for window, rate in rates.items()},
+            'eta_seconds': self.eta_seconds(),
+            'stages': stages
+        }
+
+    def log_summary(self, logger):
+        """Registra no log o tempo total e os percentis de cada estágio."""
+        report = self.report()
+        logger.info(
+            f"Métricas: {report['documents']} documentos em {format_duration(report['elapsed_seconds'])} "
+            f"({report['docs_per_second']['overall']:.0f} docs/s)"
+        )
+        for name, summary in report['stages'].items():
+            percentiles = summary['percentiles']
+            logger.info(
+                f"  {name}: {summary['count']} lotes, {summary['sum_seconds']:.1f} s no total, "
+                f"p50={percentiles['p50']:.4f} s, p99={percentiles['p99']:.4f} s, máx={summary['max_seconds']:.4f} s"
+            )
+
+    def write_json(self, path):
+        """Grava o relatório JSON da execução."""
+        _write_atomically(path, json.dumps(self.report(), indent=2, ensure_ascii=False) + '\n')
+
+    def prometheus_text(self):
+        """Métricas no formato de exposição de texto do Prometheus."""
+        report = self.report()
+        labels = f'script="{self.script}"'
+        lines = [
+            f"# HELP {METRIC_PREFIX}_documents_processed_total Documentos processados nesta execução",
+            f"# TYPE {METRIC_PREFIX}_documents_processed_total counter",
+            f"{METRIC_PREFIX}_documents_processed_total{{{labels}}} {report['documents']}",
+            f"# HELP {METRIC_PREFIX}_documents_per_second Vazão em janelas deslizantes",
+            f"# TYPE {METRIC_PREFIX}_documents_per_second gauge",
+        ]
+        for window, rate in report['docs_per_second'].items():
+            lines.append(f'{METRIC_PREFIX}_documents_per_second{{{labels},window="{window}"}} {rate}')
+        if report['total_documents'] is not None:
+            lines += [
+                f"# HELP {METRIC_PREFIX}_documents_total Documentos a processar (count_documents)",
+                f"# TYPE {METRIC_PREFIX}_documents_total gauge",
+                f"{METRIC_PREFIX}_documents_total{{{labels}}} {report['total_documents']}",
+            ]
+        if report['eta_seconds'] is not None:
+            lines += [
+                f"# HELP {METRIC_PREFIX}_eta_seconds Tempo restante estimado",
+                f"# TYPE {METRIC_PREFIX}_eta_seconds gauge",
+                f"{METRIC_PREFIX}_eta_seconds{{{labels}}} {report['eta_seconds']:.1f}",
+            ]
+        lines += [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Duração de cada lote por estágio",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+        ]
+        for name, summary in report['stages'].items():
+            stage_labels = f'{labels},stage="{name}"'
+            for bound, cumulative in summary['buckets'].items():
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{{stage_labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{{stage_labels},le="+Inf"}} {summary["count"]}')
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_sum{{{stage_labels}}} {summary['sum_seconds']}")
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_count{{{stage_labels}}} {summary['count']}")
+        write = report['stages'].get('write')
+        if write and write['count']:
+            lines += [
+                f"# HELP {METRIC_PREFIX}_write_latency_seconds Percentis da latência das escritas em lote",
+                f"# TYPE {METRIC_PREFIX}_write_latency_seconds summary",
+            ]
+            for name, value in write['percentiles'].items():
+                quantile = int(name[1:]) / 100
+                lines.append(f'{METRIC_PREFIX}_write_latency_seconds{{{labels},quantile="{quantile}"}} {value}')
+            lines.append(f"{METRIC_PREFIX}_write_latency_seconds_sum{{{labels}}} {write['sum_seconds']}")
+            lines.append(f"{METRIC_PREFIX}_write_latency_seconds_count{{{labels}}} {write['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Grava o textfile do Prometheus (renomeado ao final, como pede o textfile collector)."""
+        _write_atomically(path, self.prometheus_text())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Perfil de conexão compartilhado pelos scripts de manutenção do MongoDB.
+
+Os jobs em lote leem a coleção inteira e fazem milhões de escritas; com o
+MongoClient padrão, cada lote trafega sem compressão, o cursor expira depois
+de 10 minutos sem getMore e o pool de conexões não acompanha os modos
+paralelos. O perfil reúne, configuráveis por variável de ambiente ou linha
+de comando:
+
+- string de conexão (MONGO_URI, como os scripts de ingestão; nada de
+  credenciais no código);
+- compressão de rede zstd/snappy/zlib (apenas as disponíveis no ambiente);
+- tamanho dos lotes do cursor (batch_size dos getMore);
+- cursores sem timeout, com a sessão renovada periodicamente
+  (refreshSessions) para não expirar durante varreduras de várias horas;
+- write concern relaxado (w=1, sem journal) para coleções reconstruíveis,
+  como novadata, que pode ser refeita a partir de ocorrencias;
+- tamanho explícito do pool de conexões de cada processo.
+
+O perfil é um dicionário simples, para ser passado às partições que rodam
+em outros processos (cada uma abre o seu próprio cliente com create_client).
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from pymongo.write_concern import WriteConcern
+
+logger = logging.getLogger(__name__)
+
+# Nome da aplicação registrado nas conexões (visível em currentOp e nos logs do mongod)
+APP_NAME = "dwc2json-maintenance"
+
+# Compressores em ordem de preferência e o módulo Python de que cada um depende
+COMPRESSOR_MODULES = {'zstd': 'zstandard', 'snappy': 'snappy', 'zlib': None}
+
+# Documentos por getMore dos cursores de varredura
+DEFAULT_CURSOR_BATCH_SIZE = 5000
+
+# Intervalo (em segundos) entre renovações da sessão dos cursores sem timeout;
+# as sessões expiram no servidor após 30 minutos sem uso
+DEFAULT_SESSION_REFRESH_INTERVAL = 300
+
+# Conexões além das threads de trabalho (monitoramento, checkpoints de sessão)
+POOL_HEADROOM = 2
+
+def available_compressors():
+    """Compressores suportados pelos módulos instalados, em ordem de preferência."""
+    return [
+        name for name, module in COMPRESSOR_MODULES.items()
+        if module is None or importlib.util.find_spec(module) is not None
+    ]
+
+def _env_flag(name):
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def add_connection_arguments(parser, rebuildable_target=False):
+    """
+    Acrescenta ao parser as opções de conexão. Os padrões vêm das variáveis
+    de ambiente MONGO_*; `rebuildable_target` habilita --relaxed-write-concern.
+    """
+    group = parser.add_argument_group("conexão com o MongoDB")
+    group.add_argument(
+        '--mongo-uri',
+        default=os.environ.get('MONGO_URI'),
+        help="String de conexão (padrão: variável de ambiente MONGO_URI)"
+    )
+    group.add_argument(
+        '--compressors',
+        default=os.environ.get('MONGO_COMPRESSORS', ','.join(available_compressors())),
+        help="Compressores de rede em ordem de preferência, separados por vírgula; "
+             "vazio desativa (padrão: MONGO_COMPRESSORS ou os disponíveis entre zstd, snappy e zlib)"
+    )
+    group.add_argument(
+        '--cursor-batch-size',
+        type=int,
+        default=_env_int('MONGO_CURSOR_BATCH_SIZE', DEFAULT_CURSOR_BATCH_SIZE),
+        help=f"Documentos por getMore do cursor (padrão: MONGO_CURSOR_BATCH_SIZE ou {DEFAULT_CURSOR_BATCH_SIZE})"
+    )
+    group.add_argument(
+        '--no-cursor-timeout',
+        action='store_true',
+        default=_env_flag('MONGO_NO_CURSOR_TIMEOUT'),
+        help="Cursor sem timeout, com a sessão renovada periodicamente; "
+             "para varreduras longas (padrão: MONGO_NO_CURSOR_TIMEOUT)"
+    )
+    group.add_argument(
+        '--session-refresh-interval',
+        type=int,
+        default=_env_int('MONGO_SESSION_REFRESH_INTERVAL', DEFAULT_SESSION_REFRESH_INTERVAL),
+        help="Segundos entre renovações da sessão com --no-cursor-timeout "
+             f"(padrão: MONGO_SESSION_REFRESH_INTERVAL ou {DEFAULT_SESSION_REFRESH_INTERVAL})"
+    )
+    group.add_argument(
+        '--max-pool-size',
+        type=int,
+        default=_env_int('MONGO_MAX_POOL_SIZE', None),
+        help="Conexões por processo (padrão: MONGO_MAX_POOL_SIZE ou threads de trabalho + "
+             f"{POOL_HEADROOM})"
+    )
+    if rebuildable_target:
+        group.add_argument(
+            '--relaxed-write-concern',
+            action='store_true',
+            default=_env_flag('MONGO_RELAXED_WRITE_CONCERN'),
+            help="Escritas na coleção de destino com w=1 e sem journal; a coleção pode ser "
+                 "reconstruída se o servidor cair (padrão: MONGO_RELAXED_WRITE_CONCERN)"
+        )
+    return group
+
+def connection_profile(parser, args):
+    """Valida as opções de conexão e monta o perfil (dicionário serializável)."""
+    if not args.mongo_uri:
+        parser.error("defina a variável de ambiente MONGO_URI ou use --mongo-uri")
+    if args.cursor_batch_size < 1:
+        parser.error("--cursor-batch-size deve ser maior que zero")
+    if args.session_refresh_interval < 1:
+        parser.error("--session-refresh-interval deve ser maior que zero")
+    if args.max_pool_size is not None and args.max_pool_size < 1:
+        parser.error("--max-pool-size deve ser maior que zero")
+    compressors = [name.strip() for name in args.compressors.split(',') if name.strip()]
+    unknown = [name for name in compressors if name not in COMPRESSOR_MODULES]
+    if unknown:
+        parser.error(f"compressores desconhecidos: {', '.join(unknown)}")
+    return {
+        'uri': args.mongo_uri,
+        'compressors': compressors,
+        'cursor_batch_size': args.cursor_batch_size,
+        'no_cursor_timeout': args.no_cursor_timeout,
+        'session_refresh_interval': args.session_refresh_interval,
+        'max_pool_size': args.max_pool_size,
+        'relaxed_write_concern': getattr(args, 'relaxed_write_concern', False)
+    }
+
+def create_client(profile, threads=1):
+    """
+    MongoClient do perfil. Sem --max-pool-size, o pool é dimensionado para
+    `threads` threads de trabalho simultâneas.
+    """
+    options = {
+        'appname': APP_NAME,
+        'maxPoolSize': profile['max_pool_size'] or threads + POOL_HEADROOM
+    }
+    if profile['compressors']:
+        options['compressors'] = ','.join(profile['compressors'])
+    return MongoClient(profile['uri'], **options)
+
+def cursor_options(profile, session=None):
+    """Argumentos de find() para as varreduras: batch_size, no_cursor_timeout e sessão."""
+    options = {'batch_size': profile['cursor_batch_size']}
+    if profile['no_cursor_timeout']:
+        options['no_cursor_timeout'] = True
+    if session is not None:
+        options['session'] = session
+    return options
+
+def target_collection(db, name, profile):
+    """Coleção de destino reconstruível, com o write concern relaxado se habilitado."""
+    if profile['relaxed_write_concern']:
+        return db.get_collection(name, write_concern=WriteConcern(w=1, j=False))
+    return db[name]
+
+@contextmanager
+def scan_session(client, profile):
+    """
+    Sessão dos cursores de varredura. Com no_cursor_timeout, o cursor só
+    sobrevive enquanto a sua sessão existir no servidor; uma thread renova a
+    sessão (refreshSessions) até o fim do bloco. Sem a opção, devolve None.
+    """
+    if not profile['no_cursor_timeout']:
+        yield None
+        return
+    session = client.start_session()
+    stop = threading.Event()
+
+    def refresh():
+        while not stop.wait(profile['session_refresh_interval']):
+            try:
+                client.admin.command('refreshSessions', [session.session_id])
+            except PyMongoError as e:
+                logger.warning(f"Falha ao renovar a sessão do cursor: {e}")
+
+    thread = threading.Thread(target=refresh, name='session-refresh', daemon=True)
+    thread.start()
+    try:
+        yield session
+    finally:
+        stop.set()
+        thread.join()
+        session.end_session()
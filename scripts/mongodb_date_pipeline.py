@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Pipelines de agregação para converter year/month/day dentro do próprio mongod.
+
+Reproduz no servidor os padrões comuns de parse_event_date e a conversão de
+strings numéricas, de modo que a maior parte da coleção não precise trafegar
+pela rede. Apenas os documentos que o pipeline não consegue resolver com a
+mesma semântica do parser Python ("restantes") devem ser processados no
+Python, usando leftover_filter().
+
+Requer MongoDB 4.2+ (updates com pipeline, $regexFind e $regexMatch).
+"""
+
+DATE_FIELDS = ['year', 'month', 'day']
+
+# Strings de até 18 dígitos ASCII sempre cabem em um inteiro de 64 bits
+NUMERIC_STRING_REGEX = r'^[0-9]{1,18}$'
+# Strings de dígitos em qualquer alfabeto (str.isdigit no Python)
+UNICODE_DIGITS_REGEX = r'^\p{Nd}+$'
+
+# Formatos resolvidos no servidor: (regex, índice de year, month e day nas capturas).
+# Os separadores são iguais dentro de uma mesma data (backreference \2),
+# como nos padrões de parse_event_date.
+EVENT_DATE_SHAPES = [
+    # YYYY-MM-DD ou YYYY/MM/DD
+    (r'^(\d{4})([-/])(\d{1,2})\2(\d{1,2})$', 0, 2, 3),
+    # DD/MM/YYYY ou DD-MM-YYYY
+    (r'^(\d{1,2})([-/])(\d{1,2})\2(\d{4})$', 3, 2, 0),
+    # YYYY-MM ou YYYY/MM
+    (r'^(\d{4})[-/](\d{1,2})$', 0, 1, None),
+    # YYYY
+    (r'^(\d{4})$', 0, None, None),
+]
+
+def _capture_to_int(index):
+    """Expressão que converte a captura de $regexFind na posição indicada."""
+    if index is None:
+        return None
+    return {'$toInt': {'$arrayElemAt': ['$$match.captures', index]}}
+
+def _shape_expr(regex, year_index, month_index, day_index):
+    """Expressão que retorna {year, month, day} se eventDate casar com o formato, senão null."""
+    return {
+        '$let': {
+            'vars': {'match': {'$regexFind': {'input': '$$eventDate', 'regex': regex}}},
+            'in': {
+                '$cond': [
+                    {'$eq': ['$$match', None]},
+                    None,
+                    {
+                        'year': _capture_to_int(year_index),
+                        'month': _capture_to_int(month_index),
+                        'day': _capture_to_int(day_index),
+                    }
+                ]
+            }
+        }
+    }
+
+def _optional_in_range(value, low, high):
+    return {
+        '$or': [
+            {'$eq': [value, None]},
+            {'$and': [{'$gte': [value, low]}, {'$lte': [value, high]}]}
+        ]
+    }
+
+def event_date_parts_expr():
+    """
+    Expressão de agregação que extrai {year, month, day} de eventDate.
+
+    Retorna null quando eventDate não é string, não casa com nenhum formato
+    ou quando algum valor está fora dos limites (year 1700-2030, month 1-12,
+    day 1-31). Esses casos ficam para o parser Python, que ainda tenta os
+    formatos alternativos (por exemplo %m/%d/%Y). Não usamos $dateFromString
+    porque ele exige datas de calendário válidas, enquanto parse_event_date
+    aceita, por exemplo, dia 31 em qualquer mês.
+    """
+    parts = None
+    for shape in reversed(EVENT_DATE_SHAPES):
+        shape_expr = _shape_expr(*shape)
+        parts = shape_expr if parts is None else {'$ifNull': [shape_expr, parts]}
+
+    return {
+        '$let': {
+            'vars': {
+                'eventDate': {
+                    '$cond': [
+                        {'$eq': [{'$type': '$eventDate'}, 'string']},
+                        {'$trim': {'input': '$eventDate'}},
+                        ''
+                    ]
+                }
+            },
+            'in': {
+                '$let': {
+                    'vars': {'parts': parts},
+                    'in': {
+                        '$cond': [
+                            {
+                                '$and': [
+                                    {'$ne': ['$$parts', None]},
+                                    {'$gte': ['$$parts.year', 1700]},
+                                    {'$lte': ['$$parts.year', 2030]},
+                                    _optional_in_range('$$parts.month', 1, 12),
+                                    _optional_in_range('$$parts.day', 1, 31),
+                                ]
+                            },
+                            '$$parts',
+                            None
+                        ]
+                    }
+                }
+            }
+        }
+    }
+
+def event_date_field_expr(field):
+    """Expressão com o valor de `field` extraído de eventDate (ou null)."""
+    return {'$let': {'vars': {'parts': event_date_parts_expr()}, 'in': f'$$parts.{field}'}}
+
+def numeric_string_expr(field):
+    """Expressão que converte `field` para int (ou long) quando é string numérica ASCII."""
+    return {
+        '$cond': [
+            {
+                '$and': [
+                    {'$eq': [{'$type': f'${field}'}, 'string']},
+                    {'$regexMatch': {'input': f'${field}', 'regex': NUMERIC_STRING_REGEX}}
+                ]
+            },
+            {'$convert': {'input': f'${field}', 'to': 'int', 'onError': {'$toLong': f'${field}'}}},
+            f'${field}'
+        ]
+    }
+
+def leftover_expr():
+    """
+    Expressão verdadeira para documentos que o servidor não resolve com a mesma
+    semântica do Python: strings de dígitos não ASCII (ou longas demais) ou
+    campos ausentes cujo eventDate (string) não foi interpretado no servidor.
+    """
+    unicode_numeric = [
+        {
+            '$and': [
+                {'$eq': [{'$type': f'${field}'}, 'string']},
+                {'$regexMatch': {'input': f'${field}', 'regex': UNICODE_DIGITS_REGEX}},
+                {'$not': [{'$regexMatch': {'input': f'${field}', 'regex': NUMERIC_STRING_REGEX}}]}
+            ]
+        }
+        for field in DATE_FIELDS
+    ]
+    unresolved_event_date = {
+        '$and': [
+            {'$or': [{'$eq': [{'$type': f'${field}'}, 'missing']} for field in DATE_FIELDS]},
+            {'$eq': [{'$type': '$eventDate'}, 'string']},
+            {'$eq': [event_date_parts_expr(), None]}
+        ]
+    }
+    return {'$or': unicode_numeric + [unresolved_event_date]}
+
+def leftover_filter():
+    """Filtro de find() para os documentos que precisam do parser Python."""
+    return {'$expr': leftover_expr()}
+
+def run_server_side_updates(collection, logger):
+    """
+    Executa no servidor, via updateMany com pipeline, a conversão de strings
+    numéricas e a extração de eventDate, campo a campo.
+    Retorna (string_to_numeric_conversions, eventdate_extractions) por campo.
+    """
+    string_to_numeric_conversions = {}
+    eventdate_extractions = {}
+
+    for field in DATE_FIELDS:
+        result = collection.update_many(
+            {field: {'$type': 'string', '$regex': NUMERIC_STRING_REGEX}},
+            [{'$set': {field: numeric_string_expr(field)}}]
+        )
+        string_to_numeric_conversions[field] = result.modified_count
+        logger.info(f"[servidor] {field}: {result.modified_count} strings numéricas convertidas")
+
+    for field in DATE_FIELDS:
+        result = collection.update_many(
+            {
+                field: {'$exists': False},
+                'eventDate': {'$type': 'string'},
+                '$expr': {'$ne': [event_date_field_expr(field), None]}
+            },
+            [{'$set': {field: event_date_field_expr(field)}}]
+        )
+        eventdate_extractions[field] = result.modified_count
+        logger.info(f"[servidor] {field}: {result.modified_count} valores extraídos de eventDate")
+
+    return string_to_numeric_conversions, eventdate_extractions
+
+def copy_pipeline(target_collection):
+    """
+    Pipeline de agregação equivalente a convert_record, gravando em
+    `target_collection` com $out. Os documentos restantes (leftover_expr)
+    são excluídos e devem ser convertidos e inseridos pelo Python.
+    """
+    projection = {'canonicalName': {'$ifNull': ['$canonicalName', None]}}
+    for field in DATE_FIELDS:
+        projection[field] = {
+            '$cond': [
+                {'$eq': [{'$type': f'${field}'}, 'missing']},
+                {'$ifNull': [event_date_field_expr(field), '$$REMOVE']},
+                numeric_string_expr(field)
+            ]
+        }
+
+    return [
+        {'$match': {'$expr': {'$not': [leftover_expr()]}}},
+        {'$project': projection},
+        {'$out': target_collection}
+    ]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Modo incremental dos scripts de conversão de datas.
+
+Depois da primeira execução completa, só continuam "sujos" os documentos
+recém-ingeridos: os que têm year/month/day como string numérica ou que não
+têm esses campos mas têm um eventDate do qual o parser consegue extraí-los.
+dirty_filter() seleciona apenas esses candidatos e os índices parciais
+abaixo tornam esses predicados baratos, de modo que a execução diária custe
+proporcionalmente ao delta.
+
+Documentos que a conversão não tem como corrigir ficam de fora do filtro,
+senão seriam relidos em toda execução: year/month/day não numéricos ("",
+"s/d"), eventDate fora dos formatos reconhecidos e eventDate sem o campo ausente
+(apenas "YYYY" não fornece month nem day; "YYYY-MM" não fornece day).
+
+partialFilterExpression não aceita $regex nem $exists: false. Por isso os
+índices restringem por faixas de string que os filtros também repetem:
+strings que começam com um dígito ASCII ('0' <= valor < ':') e eventDate
+que começa com espaço ou dígito ('\t' <= valor < ':'); os índices de campos
+ausentes indexam o próprio campo (ausente = null). Strings de dígitos não
+ASCII ficam para a execução completa.
+"""
+
+from pymongo import ASCENDING, IndexModel
+
+DATE_FIELDS = ['year', 'month', 'day']
+
+# Campos lidos pela conversão in-place (build_update)
+DATE_PROJECTION = {'_id': 1, 'year': 1, 'month': 1, 'day': 1, 'eventDate': 1}
+
+NUMERIC_STRING_REGEX = r'^[0-9]+$'
+# Strings que começam com um dígito ASCII
+DIGIT_PREFIX_RANGE = {'$gte': '0', '$lt': ':'}
+# Strings que começam com espaço em branco ou dígito ASCII (parse_event_date ignora os espaços nas pontas)
+EVENT_DATE_PREFIX_RANGE = {'$gte': '\t', '$lt': ':'}
+
+# Formatos de parse_event_date que fornecem cada campo (mesmos padrões de EVENT_DATE_REGEX)
+_DAY = r'(?:\d{1,2}| [1-9])'
+_YMD = rf'\d{{4}}([-/])\d{{1,2}}\1{_DAY}'
+_DMY = rf'{_DAY}([-/]){_DAY}\2\d{{4}}'
+_YM = r'\d{4}[-/]\d{1,2}'
+_Y = r'\d{4}'
+EVENT_DATE_FIELD_REGEXES = {
+    'year': rf'^\s*(?:{_YMD}|{_DMY}|{_YM}|{_Y})\s*$',
+    'month': rf'^\s*(?:{_YMD}|{_DMY}|{_YM})\s*$',
+    'day': rf'^\s*(?:{_YMD}|{_DMY})\s*$',
+}
+
+DIRTY_INDEXES = [
+    IndexModel(
+        [(field, ASCENDING)],
+        name=f'dirty_numeric_{field}',
+        partialFilterExpression={field: DIGIT_PREFIX_RANGE}
+    )
+    for field in DATE_FIELDS
+] + [
+    IndexModel(
+        [(field, ASCENDING)],
+        name=f'dirty_eventdate_{field}',
+        partialFilterExpression={'eventDate': EVENT_DATE_PREFIX_RANGE}
+    )
+    for field in DATE_FIELDS
+]
+
+# Índices das versões anteriores, que ainda incluíam os documentos sem correção possível
+LEGACY_DIRTY_INDEX_NAMES = [f'dirty_string_{field}' for field in DATE_FIELDS] + [
+    f'dirty_missing_{field}' for field in DATE_FIELDS
+]
+
+def dirty_filter():
+    """Filtro dos documentos que ainda precisam (e podem receber) conversão."""
+    return {
+        '$or': [
+            {field: dict(DIGIT_PREFIX_RANGE, **{'$regex': NUMERIC_STRING_REGEX})}
+            for field in DATE_FIELDS
+        ] + [
+            {
+                field: {'$exists': False},
+                'eventDate': dict(EVENT_DATE_PREFIX_RANGE, **{'$regex': EVENT_DATE_FIELD_REGEXES[field]})
+            }
+            for field in DATE_FIELDS
+        ]
+    }
+
+def dirty_index_names():
+    return [index.document['name'] for index in DIRTY_INDEXES]
+
+def drop_legacy_dirty_indexes(collection, logger):
+    """Remove os índices parciais das versões anteriores do modo incremental."""
+    existing = set(collection.index_information())
+    dropped = [name for name in LEGACY_DIRTY_INDEX_NAMES if name in existing]
+    for name in dropped:
+        collection.drop_index(name)
+    if dropped:
+        logger.info(f"Índices parciais antigos removidos: {', '.join(dropped)}")
+    return dropped
+
+def ensure_dirty_indexes(collection, logger):
+    """Cria (se ainda não existirem) os índices parciais do modo incremental."""
+    drop_legacy_dirty_indexes(collection, logger)
+    existing = set(collection.index_information())
+    missing = [index for index in DIRTY_INDEXES if index.document['name'] not in existing]
+    if not missing:
+        logger.info("Índices parciais do modo incremental já existem")
+        return []
+    names = collection.create_indexes(missing)
+    logger.info(f"Índices parciais criados: {', '.join(names)}")
+    return names
+
+def drop_dirty_indexes(collection, logger):
+    """Remove os índices parciais do modo incremental que existirem."""
+    existing = set(collection.index_information())
+    dropped = drop_legacy_dirty_indexes(collection, logger)
+    for name in dirty_index_names():
+        if name in existing:
+            collection.drop_index(name)
+            dropped.append(name)
+    logger.info(f"Índices parciais removidos: {', '.join(dropped) if dropped else 'nenhum'}")
+    return dropped
+
+def dirty_index_status(collection):
+    """Retorna {nome do índice: existe?} para os índices do modo incremental."""
+    existing = set(collection.index_information())
+    return {name: name in existing for name in dirty_index_names()}
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Particionamento de coleções por faixas de um campo (por padrão `_id`) para
+execução paralela dos scripts de manutenção.
+
+As faixas são calculadas com $bucketAuto e cada partição vira um filtro de
+find() independente. Cada partição é processada em um processo próprio, que
+deve abrir o seu próprio MongoClient (clientes não podem ser compartilhados
+entre processos).
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Mais partições que processos equilibram faixas com custos diferentes
+PARTITIONS_PER_WORKER = 4
+
+def compute_partitions(collection, partitions, field='_id', query=None):
+    """
+    Divide os documentos de `query` em até `partitions` faixas de `field`.
+
+    Retorna uma lista de filtros disjuntos cuja união cobre todos os
+    documentos de `query`. A primeira partição também inclui documentos sem
+    o campo (ou com valores de outro tipo BSON), já que os operadores de
+    comparação só casam valores do mesmo tipo. Pressupõe que o campo tenha
+    tipo homogêneo, como `_id` (ObjectId) ou `iptId` (string).
+    """
+    query = query or {}
+    if partitions <= 1:
+        return [query]
+
+    pipeline = []
+    if query:
+        pipeline.append({'$match': query})
+    pipeline.append({'$bucketAuto': {'groupBy': f'${field}', 'buckets': partitions}})
+    boundaries = [bucket['_id']['min'] for bucket in collection.aggregate(pipeline, allowDiskUse=True)]
+    boundaries = [boundary for boundary in boundaries[1:] if boundary is not None]
+
+    if not boundaries:
+        return [query]
+
+    ranges = [{'$nor': [{field: {'$gte': boundaries[0]}}]}]
+    for lower, upper in zip(boundaries, boundaries[1:]):
+        ranges.append({field: {'$gte': lower, '$lt': upper}})
+    ranges.append({field: {'$gte': boundaries[-1]}})
+
+    if not query:
+        return ranges
+    return [{'$and': [query, range_filter]} for range_filter in ranges]
+
+def merge_counters(total, partial):
+    """Soma recursivamente os contadores (dicionários de inteiros) de uma partição."""
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            merge_counters(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+def run_partitions(worker, tasks, workers):
+    """
+    Executa `worker(task)` para cada tarefa em um pool de `workers` processos
+    e devolve os resultados à medida que as partições terminam.
+    `worker` precisa ser uma função de nível de módulo (serializável).
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Conversão de datas offline, sobre arquivos exportados em vez da base ao vivo.
+
+Lê um arquivo .bson do mongodump (documentos BSON concatenados, cada um
+prefixado pelo seu tamanho em int32) através de um mmap, decodificando os
+documentos em lotes com bson.decode_all, ou um export JSONL (Extended JSON,
+como o do mongoexport). O resultado é gravado em um novo arquivo .bson,
+pronto para o mongorestore.
+
+Modos:
+- copy: mesma conversão de convert_mongodb_dates.py (documentos de novadata);
+- transform: documentos completos com os $set dos transformadores do motor
+  de manutenção aplicados (por padrão, 'dates'), para restaurar ocorrencias.
+
+Uso:
+    mongodump --db dwc2json --collection ocorrencias --out dump/
+    python offline_conversion.py dump/dwc2json/ocorrencias.bson novadata.bson
+    mongorestore --db dwc2json --collection novadata novadata.bson
+"""
+
+import argparse
+import contextlib
+import logging
+import mmap
+import os
+import shutil
+import struct
+
+import bson
+from bson import json_util
+
+from convert_mongodb_dates import convert_records
+from event_date_parser import parse_cache_stats
+from maintenance_engine import TRANSFORMERS, build_transformers, merge_sets, new_counters
+# Registra o transformador 'dates' no motor de manutenção
+import event_date_transformer  # noqa: F401
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Intervalo (em documentos) entre os logs de progresso
+PROGRESS_INTERVAL = 100000
+
+# Prefixo de tamanho de cada documento BSON (int32 little-endian)
+BSON_LENGTH = struct.Struct('<i')
+MIN_BSON_SIZE = 5
+
+class DumpFormatError(ValueError):
+    """Arquivo de entrada truncado ou que não é BSON/JSONL válido."""
+
+def iter_bson_batches(path, batch_size):
+    """
+    Lê um arquivo .bson do mongodump com mmap e devolve listas de até
+    `batch_size` documentos. Apenas os prefixos de tamanho são lidos no Python;
+    cada lote é decodificado de uma vez com bson.decode_all.
+    """
+    with open(path, 'rb') as dump_file:
+        if os.fstat(dump_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                size = len(data)
+                offset = 0
+                while offset < size:
+                    start = offset
+                    count = 0
+                    while offset < size and count < batch_size:
+                        if offset + BSON_LENGTH.size > size:
+                            raise DumpFormatError(f"{path}: documento truncado no byte {offset}")
+                        length = BSON_LENGTH.unpack_from(data, offset)[0]
+                        if length < MIN_BSON_SIZE or offset + length > size:
+                            raise DumpFormatError(f"{path}: tamanho de documento inválido ({length}) no byte {offset}")
+                        offset += length
+                        count += 1
+                    yield bson.decode_all(view[start:offset])
+            finally:
+                view.release()
+
+def iter_jsonl_batches(path, batch_size):
+    """Lê um export JSONL (um documento Extended JSON por linha) em lotes."""
+    batch = []
+    with open(path, encoding='utf-8') as export_file:
+        for line_number, line in enumerate(export_file, 1):
+            if not line.strip():
+                continue
+            try:
+                batch.append(json_util.loads(line))
+            except ValueError as e:
+                raise DumpFormatError(f"{path}:{line_number}: {e}") from e
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def iter_input_batches(path, batch_size, input_format=None):
+    """Escolhe o leitor pelo formato informado ou pela extensão do arquivo."""
+    input_format = input_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'bson')
+    if input_format == 'jsonl':
+        return iter_jsonl_batches(path, batch_size)
+    return iter_bson_batches(path, batch_size)
+
+def transform_documents(records, transformers, counters):
+    """Aplica aos documentos completos os $set dos transformadores."""
+    results = [
+        (transformer, transformer.transform_batch(records, counters['transformers'][transformer.name]))
+        for transformer in transformers
+    ]
+    for position, record in enumerate(records):
+        record.update(merge_sets(record['_id'], [(transformer, sets[position]) for transformer, sets in results]))
+    return records
+
+def convert_file(input_path, output_path, mode='copy', transformer_names=('dates',), batch_size=DEFAULT_BATCH_SIZE,
+                 input_format=None):
+    """
+    Converte `input_path` e grava os documentos em `output_path` (.bson).
+    O arquivo é escrito com um nome temporário e renomeado ao final, para que
+    uma execução interrompida não deixe um .bson parcial para o mongorestore.
+    Retorna os contadores da execução.
+    """
+    transformers = build_transformers(transformer_names) if mode == 'transform' else []
+    counters = new_counters(transformers)
+    temporary_path = f"{output_path}.tmp"
+
+    counters['parse_cache'] = {'hits': 0, 'misses': 0}
+    cache_before = parse_cache_stats()
+
+    try:
+        with open(temporary_path, 'wb') as output_file:
+            for records in iter_input_batches(input_path, batch_size, input_format):
+                if mode == 'transform':
+                    documents = transform_documents(records, transformers, counters)
+                else:
+                    documents = convert_records(records)
+                output_file.write(b''.join(bson.encode(document) for document in documents))
+
+                previous = counters['total_processed']
+                counters['total_processed'] += len(records)
+                if counters['total_processed'] // PROGRESS_INTERVAL > previous // PROGRESS_INTERVAL:
+                    logger.info(f"Processados {counters['total_processed']} registros")
+    except BaseException:
+        # open() pode ter falhado antes de criar o arquivo: não mascarar o erro original
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporary_path)
+        raise
+
+    os.replace(temporary_path, output_path)
+    cache_after = parse_cache_stats()
+    counters['parse_cache']['hits'] = cache_after['hits'] - cache_before['hits']
+    counters['parse_cache']['misses'] = cache_after['misses'] - cache_before['misses']
+
+    # Índices da coleção original acompanham o modo transform (metadata.json do mongodump)
+    metadata_path = input_path[:-len('.bson')] + '.metadata.json' if input_path.endswith('.bson') else None
+    if mode == 'transform' and metadata_path and os.path.exists(metadata_path) and output_path.endswith('.bson'):
+        shutil.copyfile(metadata_path, output_path[:-len('.bson')] + '.metadata.json')
+
+    return counters
+
+def parse_args(argv=None):
+    """Lê os argumentos de linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Converte year/month/day de um dump (.bson ou JSONL) para um novo .bson, sem acessar o MongoDB"
+    )
+    parser.add_argument('input', help="Arquivo .bson do mongodump ou export JSONL")
+    parser.add_argument('output', help="Arquivo .bson de saída, para o mongorestore")
+    parser.add_argument(
+        '--format',
+        choices=['bson', 'jsonl'],
+        help="Formato da entrada (padrão: pela extensão; .jsonl/.json = JSONL, demais = BSON)"
+    )
+    parser.add_argument(
+        '--mode',
+        choices=['copy', 'transform'],
+        default='copy',
+        help="copy: documentos de novadata (convert_mongodb_dates.py); "
+             "transform: documentos completos com os transformadores aplicados (padrão: copy)"
+    )
+    parser.add_argument(
+        '--transformer',
+        dest='transformers',
+        action='append',
+        choices=sorted(TRANSFORMERS),
+        help="Transformador do modo transform; pode ser repetido (padrão: dates)"
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Documentos decodificados e convertidos por lote (padrão: {DEFAULT_BATCH_SIZE})"
+    )
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size deve ser maior que zero")
+    if os.path.abspath(args.input) == os.path.abspath(args.output):
+        parser.error("o arquivo de saída deve ser diferente do de entrada")
+    if args.transformers and args.mode != 'transform':
+        parser.error("--transformer só se aplica ao modo transform")
+    args.transformers = list(dict.fromkeys(args.transformers or ['dates']))
+    return args
+
+def main(argv=None):
+    """Função principal do script."""
+    args = parse_args(argv)
+    logger.info(f"Convertendo {args.input} -> {args.output} (modo {args.mode})")
+
+    counters = convert_file(args.input, args.output, args.mode, args.transformers, args.batch_size, args.format)
+
+    logger.info(f"Processamento concluído! Total de registros processados: {counters['total_processed']}")
+    if args.mode == 'copy':
+        cache_stats = counters['parse_cache']
+        cache_lookups = cache_stats['hits'] + cache_stats['misses']
+        cache_hit_rate = cache_stats['hits'] / cache_lookups if cache_lookups else 0.0
+        logger.info(
+            f"Cache de eventDate: {cache_stats['hits']} acertos, {cache_stats['misses']} erros "
+            f"(taxa de acerto {cache_hit_rate:.1%})"
+        )
+    for transformer in build_transformers(args.transformers) if args.mode == 'transform' else []:
+        logger.info("")
+        logger.info(f"Transformador {transformer.name}:")
+        transformer.log_summary(counters['transformers'][transformer.name], logger)
+    logger.info(f"Arquivo gerado: {args.output} ({os.path.getsize(args.output)} bytes)")
+
+if __name__ == "__main__":
+    main()
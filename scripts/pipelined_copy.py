@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Pipeline de cópia com leitura, transformação e escrita sobrepostas.
+
+Uma thread leitora consome o cursor e enfileira lotes, uma thread de
+transformação converte cada lote e uma ou mais threads escritoras gravam os
+lotes convertidos (por exemplo, com insert_many não ordenado). As filas são
+limitadas (queue_depth), de modo que um estágio lento bloqueia os anteriores
+(backpressure) em vez de acumular lotes na memória.
+
+Como os escritores podem terminar fora de ordem, on_commit só é chamado para
+o prefixo contíguo de lotes já gravados, na ordem de leitura; isso permite
+gravar checkpoints com o último _id realmente persistido.
+"""
+
+import queue
+import threading
+
+DEFAULT_QUEUE_DEPTH = 4
+DEFAULT_WRITERS = 2
+
+# Marca de fim de fila
+_DONE = object()
+
+def iter_cursor_batches(cursor, batch_size):
+    """
+    Agrupa os documentos do cursor em listas de até batch_size elementos.
+    `batch_size` também pode ser uma função, consultada no início de cada lote
+    (por exemplo, o tamanho atual de um AdaptiveBatchSizer).
+    """
+    current_size = batch_size if callable(batch_size) else lambda: batch_size
+    batch = []
+    limit = current_size()
+    for record in cursor:
+        batch.append(record)
+        if len(batch) >= limit:
+            yield batch
+            batch = []
+            limit = current_size()
+    if batch:
+        yield batch
+
+class _CommitTracker:
+    """Libera os lotes gravados para on_commit na ordem em que foram lidos."""
+
+    def __init__(self, on_commit):
+        self.on_commit = on_commit
+        self.lock = threading.Lock()
+        self.completed = {}
+        self.next_sequence = 0
+
+    def complete(self, sequence, batch):
+        with self.lock:
+            self.completed[sequence] = batch
+            while self.next_sequence in self.completed:
+                ready = self.completed.pop(self.next_sequence)
+                self.next_sequence += 1
+                if self.on_commit:
+                    self.on_commit(ready)
+
+def _put(target_queue, item, stop):
+    """Enfileira respeitando o limite da fila, desistindo se o pipeline parou."""
+    while not stop.is_set():
+        try:
+            target_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(source_queue, stop):
+    """Desenfileira um item, retornando _DONE se o pipeline parou."""
+    while not stop.is_set():
+        try:
+            return source_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def run_pipelined_copy(batches, transform, write, on_commit=None,
+                       queue_depth=DEFAULT_QUEUE_DEPTH, writers=DEFAULT_WRITERS):
+    """
+    Executa o pipeline leitura -> transformação -> escrita.
+
+    - batches: iterável de lotes (consumido na thread leitora, por exemplo
+      iter_cursor_batches(cursor, 1000));
+    - transform(lote) -> documentos a gravar;
+    - write(documentos) grava um lote (chamado em paralelo por `writers` threads);
+    - on_commit(lote original) é chamado em ordem após cada lote gravado.
+
+    Se qualquer estágio falhar, os demais são interrompidos e a exceção é
+    relançada na thread chamadora.
+    """
+    read_queue = queue.Queue(maxsize=queue_depth)
+    write_queue = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+    errors = []
+    tracker = _CommitTracker(on_commit)
+
+    def fail(error):
+        errors.append(error)
+        stop.set()
+
+    def reader():
+        try:
+            for sequence, batch in enumerate(batches):
+                if not _put(read_queue, (sequence, batch), stop):
+                    return
+        except Exception as e:
+            fail(e)
+        finally:
+            _put(read_queue, _DONE, stop)
+
+    def transformer():
+        try:
+            while True:
+                item = _get(read_queue, stop)
+                if item is _DONE:
+                    return
+                sequence, batch = item
+                if not _put(write_queue, (sequence, batch, transform(batch)), stop):
+                    return
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in range(writers):
+                _put(write_queue, _DONE, stop)
+
+    def writer():
+        try:
+            while True:
+                item = _get(write_queue, stop)
+                if item is _DONE:
+                    return
+                sequence, batch, documents = item
+                write(documents)
+                tracker.complete(sequence, batch)
+        except Exception as e:
+            fail(e)
+
+    threads = [
+        threading.Thread(target=reader, name='pipeline-reader', daemon=True),
+        threading.Thread(target=transformer, name='pipeline-transform', daemon=True),
+    ] + [
+        threading.Thread(target=writer, name=f'pipeline-writer-{number}', daemon=True)
+        for number in range(1, writers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Escrita dos relatórios dos IPTs em vários formatos em uma única passada.
+
+Cada linha recebida por ReportWriter.write() vai, na hora, para todos os
+formatos pedidos:
+
+- csv, tsv: csv.DictWriter (vírgula / TAB);
+- jsonl: um objeto JSON por linha;
+- parquet, arrow: colunares, via pyarrow (opcional), em lotes de
+  `batch_size` linhas (Parquet com zstd; Arrow no formato de arquivo IPC,
+  legível por pyarrow.ipc.open_file, DuckDB, Polars...).
+
+Os formatos colunares servem para consultar inventários históricos grandes
+sem reinterpretar arquivos de texto.
+"""
+
+import csv
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+FORMATS = ('csv', 'tsv', 'jsonl', 'parquet', 'arrow')
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+DEFAULT_BATCH_SIZE = 4096
+
+PYARROW_MISSING = "Os formatos parquet e arrow precisam do pyarrow (pip install pyarrow)"
+
+def parse_formats(value, default=('csv', 'tsv')):
+    """Lista de formatos a partir de um texto separado por vírgulas (ex.: variável de ambiente)."""
+    if value is None:
+        return list(default)
+    formats = [item.strip().lower() for item in value.split(',') if item.strip()]
+    unknown = [item for item in formats if item not in FORMATS]
+    if unknown:
+        raise ValueError(f"Formato(s) de relatório desconhecido(s): {', '.join(unknown)} (use {', '.join(FORMATS)})")
+    if pa is None and any(item in COLUMNAR_FORMATS for item in formats):
+        raise ValueError(PYARROW_MISSING)
+    return formats
+
+def columnar_available():
+    return pa is not None
+
+def _arrow_type(kind):
+    return {'float': pa.float64(), 'int': pa.int64(), 'bool': pa.bool_()}.get(kind, pa.string())
+
+class _TextSink:
+    def __init__(self, path, fieldnames, kind):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.kind = kind
+        if kind == 'jsonl':
+            self.writer = None
+        else:
+            self.writer = csv.DictWriter(
+                self.file, fieldnames=fieldnames, delimiter='\t' if kind == 'tsv' else ',', extrasaction='ignore'
+            )
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.writer:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+class _ColumnarSink:
+    def __init__(self, path, schema, kind):
+        self.schema = schema
+        if kind == 'parquet':
+            self.writer = pq.ParquetWriter(path, schema, compression='zstd')
+        else:
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, schema)
+        self.kind = kind
+
+    def write_batch(self, columns):
+        batch = pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        if self.kind == 'parquet':
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write(batch)
+
+    def close(self):
+        self.writer.close()
+        if self.kind == 'arrow':
+            self.sink.close()
+
+class ReportWriter:
+    """
+    Escreve as mesmas linhas (dicionários) em todos os `formats`, em uma
+    passada. Os arquivos são `base_path` + extensão do formato. `types`
+    associa colunas a 'float', 'int' ou 'bool' nos formatos colunares (as
+    demais são texto).
+
+        with ReportWriter('relatorio', ['nome', 'tag'], ['csv', 'parquet']) as report:
+            for row in rows:
+                report.write(row)
+    """
+
+    def __init__(self, base_path, fieldnames, formats=('csv', 'tsv'), types=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.fieldnames = list(fieldnames)
+        self.batch_size = batch_size
+        self.paths = {}
+        self.rows = 0
+        self.text_sinks = []
+        self.columnar_sinks = []
+        self.pending = {name: [] for name in self.fieldnames}
+        self.pending_rows = 0
+
+        if any(kind in COLUMNAR_FORMATS for kind in formats) and pa is None:
+            raise ValueError(PYARROW_MISSING)
+
+        schema = None
+        try:
+            for kind in formats:
+                path = f"{base_path}.{kind}"
+                if kind in COLUMNAR_FORMATS:
+                    if schema is None:
+                        schema = pa.schema([
+                            (name, _arrow_type((types or {}).get(name))) for name in self.fieldnames
+                        ])
+                    self.columnar_sinks.append(_ColumnarSink(path, schema, kind))
+                elif kind in FORMATS:
+                    self.text_sinks.append(_TextSink(path, self.fieldnames, kind))
+                else:
+                    raise ValueError(f"Formato de relatório desconhecido: {kind}")
+                self.paths[kind] = path
+        except Exception:
+            self._close_sinks()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, row):
+        """Escreve `row` em todos os formatos (colunas ausentes ficam vazias)."""
+        row = {name: row.get(name) for name in self.fieldnames}
+        for sink in self.text_sinks:
+            sink.write(row)
+        if self.columnar_sinks:
+            for name in self.fieldnames:
+                self.pending[name].append(row[name])
+            self.pending_rows += 1
+            if self.pending_rows >= self.batch_size:
+                self._flush()
+        self.rows += 1
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+        return self.rows
+
+    def _flush(self):
+        if not self.pending_rows:
+            return
+        for sink in self.columnar_sinks:
+            sink.write_batch(self.pending)
+        self.pending = {name: [] for name in self.fieldnames}
+        self.pending_rows = 0
+
+    def _close_sinks(self):
+        for sink in self.text_sinks + self.columnar_sinks:
+            sink.close()
+        self.text_sinks = []
+        self.columnar_sinks = []
+
+    def close(self):
+        try:
+            if self.columnar_sinks:
+                self._flush()
+        finally:
+            self._close_sinks()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Inventário persistente dos recursos publicados nos IPTs.
+
+check_ipt_resources.py e check_ipt_only.py montavam a lista de recursos em
+memória e a descartavam ao final; qualquer decisão posterior (o que
+reingerir, o que verificar) era refeita do zero. Aqui cada coleta vira um
+snapshot em um arquivo SQLite, com cada recurso identificado por
+(repositorio, tag) e guardado com pub_date, guid e um hash do conteúdo.
+
+diff_snapshots() compara dois snapshots e separa os recursos novos,
+atualizados (hash diferente) e removidos. Um repositório cujo feed falhou
+em uma coleta não entra no snapshot: os seus recursos não aparecem como
+removidos, e na coleta seguinte ele é comparado com a última que funcionou.
+
+Os conteúdos são guardados uma única vez por hash; cada snapshot só guarda
+as chaves, pub_date, guid e o hash de cada recurso.
+
+Configuração por variáveis de ambiente (open_resource_inventory_from_env):
+RESOURCE_INVENTORY_FILE, RESOURCE_INVENTORY_KEEP (snapshots mantidos) e
+RESOURCE_INVENTORY_DISABLED.
+
+Uso (diferenças desde o snapshot anterior, para jobs agendados):
+    python resource_inventory.py [--since SNAPSHOT] [--json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_INVENTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource_inventory.sqlite3')
+DEFAULT_KEEP = 90
+
+# Campos do RSS que entram no hash; os derivados (tag, kingdom) ficam de fora, e
+# description também, porque o parse em streaming a descarta (RSS_SKIPPED_FIELDS)
+HASHED_FIELDS = ('title', 'link', 'guid', 'pub_date')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    taken_at REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshot_repositories (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    repositorio TEXT NOT NULL,
+    resources INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, repositorio)
+);
+CREATE TABLE IF NOT EXISTS snapshot_resources (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    repositorio TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    pub_date TEXT,
+    guid TEXT,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, repositorio, tag)
+);
+CREATE INDEX IF NOT EXISTS snapshot_resources_key ON snapshot_resources (repositorio, tag);
+CREATE TABLE IF NOT EXISTS contents (
+    content_hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+def resource_key(resource):
+    """Chave do recurso dentro do repositório: a tag; sem tag, o guid ou o link."""
+    return resource.get('tag') or resource.get('guid') or resource.get('link') or ''
+
+def content_hash(resource):
+    """Hash SHA-256 dos campos do RSS do recurso (HASHED_FIELDS)."""
+    payload = json.dumps([resource.get(field) or '' for field in HASHED_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResourceInventory:
+    """Snapshots das coletas dos IPTs e as diferenças entre eles."""
+
+    def __init__(self, path=DEFAULT_INVENTORY_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def record_snapshot(self, resources_by_repository, source=None):
+        """
+        Grava um snapshot. `resources_by_repository` associa cada repositório
+        coletado com sucesso à sua lista de recursos (dicionários do RSS).
+        Retorna o id do snapshot.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO snapshots (taken_at, source) VALUES (?, ?)', (time.time(), source)
+            )
+            snapshot_id = cursor.lastrowid
+            for repositorio, resources in resources_by_repository.items():
+                rows = {}
+                contents = []
+                for resource in resources:
+                    digest = content_hash(resource)
+                    # Recursos repetidos no feed: fica o último
+                    rows[resource_key(resource)] = (resource.get('pub_date'), resource.get('guid'), digest)
+                    contents.append((digest, json.dumps(resource, ensure_ascii=False, sort_keys=True)))
+                self.connection.execute(
+                    'INSERT INTO snapshot_repositories (snapshot_id, repositorio, resources) VALUES (?, ?, ?)',
+                    (snapshot_id, repositorio, len(rows))
+                )
+                # O hash cobre só os campos do RSS: os derivados (kingdom, kingdom_evidence) podem
+                # mudar com o classificador ou as palavras-chave, e ficam os da coleta mais recente
+                self.connection.executemany(
+                    'INSERT INTO contents (content_hash, data) VALUES (?, ?) '
+                    'ON CONFLICT (content_hash) DO UPDATE SET data = excluded.data WHERE data != excluded.data',
+                    contents
+                )
+                self.connection.executemany(
+                    'INSERT INTO snapshot_resources (snapshot_id, repositorio, tag, pub_date, guid, content_hash) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    ((snapshot_id, repositorio, tag, *values) for tag, values in rows.items())
+                )
+        return snapshot_id
+
+    def snapshots(self, limit=None):
+        """Snapshots do mais recente ao mais antigo: dicionários com id, taken_at, source e resources."""
+        rows = self.connection.execute(
+            'SELECT s.id, s.taken_at, s.source, COALESCE(SUM(r.resources), 0) FROM snapshots s '
+            'LEFT JOIN snapshot_repositories r ON r.snapshot_id = s.id '
+            'GROUP BY s.id ORDER BY s.id DESC LIMIT ?',
+            (-1 if limit is None else limit,)
+        )
+        return [dict(zip(('id', 'taken_at', 'source', 'resources'), row)) for row in rows]
+
+    def previous_snapshot(self, snapshot_id):
+        """Id do snapshot anterior a `snapshot_id`, ou None."""
+        row = self.connection.execute(
+            'SELECT MAX(id) FROM snapshots WHERE id < ?', (snapshot_id,)
+        ).fetchone()
+        return row[0]
+
+    def resource(self, content_hash):
+        """Recurso (dicionário do RSS) guardado com o hash `content_hash`, ou None."""
+        row = self.connection.execute('SELECT data FROM contents WHERE content_hash = ?', (content_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def diff_snapshots(self, old_id, new_id):
+        """
+        Diferenças de `old_id` (None = nenhum snapshot, tudo é novo) para
+        `new_id`: dicionário com as listas 'new', 'updated' e 'removed'.
+        Cada item tem repositorio, tag, pub_date, guid, content_hash e o
+        recurso completo em 'resource'; os atualizados trazem também
+        previous_pub_date e previous_hash.
+
+        Só os repositórios coletados em `new_id` são comparados, cada um com
+        a sua coleta mais recente até `old_id` (um feed que falhou em `old_id`
+        é comparado com a última coleta em que funcionou).
+        """
+        with self.connection:
+            self.connection.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS baseline (repositorio TEXT PRIMARY KEY, snapshot_id INTEGER)'
+            )
+            self.connection.execute('DELETE FROM baseline')
+            self.connection.execute(
+                'INSERT INTO baseline (repositorio, snapshot_id) '
+                'SELECT repositorio, MAX(snapshot_id) FROM snapshot_repositories '
+                'WHERE snapshot_id <= ? AND repositorio IN '
+                '(SELECT repositorio FROM snapshot_repositories WHERE snapshot_id = ?) '
+                'GROUP BY repositorio',
+                (-1 if old_id is None else old_id, new_id)
+            )
+
+        changes = {'new': [], 'updated': [], 'removed': []}
+        current = self.connection.execute(
+            'SELECT n.repositorio, n.tag, n.pub_date, n.guid, n.content_hash, o.pub_date, o.content_hash '
+            'FROM snapshot_resources n '
+            'LEFT JOIN baseline b ON b.repositorio = n.repositorio '
+            'LEFT JOIN snapshot_resources o '
+            'ON o.snapshot_id = b.snapshot_id AND o.repositorio = n.repositorio AND o.tag = n.tag '
+            'WHERE n.snapshot_id = ? AND (o.content_hash IS NULL OR o.content_hash != n.content_hash) '
+            'ORDER BY n.repositorio, n.tag',
+            (new_id,)
+        ).fetchall()
+        for repositorio, tag, pub_date, guid, digest, previous_pub_date, previous_hash in current:
+            item = {
+                'repositorio': repositorio, 'tag': tag, 'pub_date': pub_date, 'guid': guid,
+                'content_hash': digest, 'resource': self.resource(digest)
+            }
+            if previous_hash is None:
+                changes['new'].append(item)
+            else:
+                item.update(previous_pub_date=previous_pub_date, previous_hash=previous_hash)
+                changes['updated'].append(item)
+
+        removed = self.connection.execute(
+            'SELECT o.repositorio, o.tag, o.pub_date, o.guid, o.content_hash FROM baseline b '
+            'JOIN snapshot_resources o ON o.snapshot_id = b.snapshot_id AND o.repositorio = b.repositorio '
+            'LEFT JOIN snapshot_resources n '
+            'ON n.snapshot_id = ? AND n.repositorio = o.repositorio AND n.tag = o.tag '
+            'WHERE n.tag IS NULL '
+            'ORDER BY o.repositorio, o.tag',
+            (new_id,)
+        ).fetchall()
+        for repositorio, tag, pub_date, guid, digest in removed:
+            changes['removed'].append({
+                'repositorio': repositorio, 'tag': tag, 'pub_date': pub_date, 'guid': guid,
+                'content_hash': digest, 'resource': self.resource(digest)
+            })
+        return changes
+
+    def diff_latest(self):
+        """Diferenças do penúltimo para o último snapshot (None se não houver snapshots)."""
+        latest = self.snapshots(1)
+        if not latest:
+            return None
+        new_id = latest[0]['id']
+        return self.diff_snapshots(self.previous_snapshot(new_id), new_id)
+
+    def prune(self, keep=DEFAULT_KEEP):
+        """
+        Mantém os `keep` snapshots mais recentes, a coleta mais recente de
+        cada repositório (a base de comparação de um feed que vem falhando)
+        e os conteúdos ainda referenciados.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                'DELETE FROM snapshots WHERE id NOT IN (SELECT id FROM snapshots ORDER BY id DESC LIMIT ?) '
+                'AND id NOT IN (SELECT MAX(snapshot_id) FROM snapshot_repositories GROUP BY repositorio)', (keep,)
+            )
+            self.connection.execute(
+                'DELETE FROM contents WHERE content_hash NOT IN (SELECT content_hash FROM snapshot_resources)'
+            )
+        return cursor.rowcount
+
+def summarize_changes(changes):
+    """Linha de resumo de um resultado de diff_snapshots."""
+    return (
+        f"{len(changes['new'])} novos, {len(changes['updated'])} atualizados, "
+        f"{len(changes['removed'])} removidos"
+    )
+
+def _env_flag(name):
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+def open_resource_inventory_from_env():
+    """ResourceInventory configurado pelas variáveis RESOURCE_INVENTORY_*, ou None se desativado."""
+    if _env_flag('RESOURCE_INVENTORY_DISABLED'):
+        return None
+    return ResourceInventory(os.environ.get('RESOURCE_INVENTORY_FILE') or DEFAULT_INVENTORY_FILE)
+
+def record_harvest(inventory, resources_by_repository, source=None):
+    """
+    Grava o snapshot de uma coleta, imprime as diferenças para o anterior
+    e só então remove os snapshots além de RESOURCE_INVENTORY_KEEP.
+    Retorna o resultado de diff_snapshots.
+    """
+    snapshot_id = inventory.record_snapshot(resources_by_repository, source)
+    previous_id = inventory.previous_snapshot(snapshot_id)
+    changes = inventory.diff_snapshots(previous_id, snapshot_id)
+    # Só depois da comparação: com RESOURCE_INVENTORY_KEEP=1 o anterior ainda é necessário
+    keep = os.environ.get('RESOURCE_INVENTORY_KEEP')
+    inventory.prune(int(keep) if keep else DEFAULT_KEEP)
+    if previous_id is None:
+        print(f"Inventário: primeiro snapshot ({snapshot_id}) com {len(changes['new'])} recursos")
+    else:
+        print(f"Inventário: snapshot {snapshot_id} vs {previous_id}: {summarize_changes(changes)}")
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description='Diferenças entre snapshots do inventário de recursos dos IPTs')
+    parser.add_argument('--inventory', default=os.environ.get('RESOURCE_INVENTORY_FILE') or DEFAULT_INVENTORY_FILE,
+                        help='Arquivo SQLite do inventário')
+    parser.add_argument('--since', type=int, help='Snapshot de referência (padrão: o anterior ao mais recente)')
+    parser.add_argument('--snapshot', type=int, help='Snapshot comparado (padrão: o mais recente)')
+    parser.add_argument('--json', action='store_true', help='Uma linha JSON por recurso alterado')
+    parser.add_argument('--list', action='store_true', help='Lista os snapshots gravados')
+    args = parser.parse_args()
+
+    inventory = ResourceInventory(args.inventory)
+    try:
+        if args.list:
+            for snapshot in inventory.snapshots():
+                taken_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot['taken_at']))
+                print(f"{snapshot['id']:5d}  {taken_at}  {snapshot['resources']:6d} recursos  {snapshot['source'] or ''}")
+            return
+
+        latest = inventory.snapshots(1)
+        new_id = args.snapshot or (latest[0]['id'] if latest else None)
+        if new_id is None:
+            print("Nenhum snapshot no inventário", file=sys.stderr)
+            sys.exit(1)
+        old_id = args.since if args.since is not None else inventory.previous_snapshot(new_id)
+        changes = inventory.diff_snapshots(old_id, new_id)
+
+        if args.json:
+            for change, items in changes.items():
+                for item in items:
+                    print(json.dumps({'change': change, **item}, ensure_ascii=False))
+            return
+
+        print(f"Snapshot {new_id} vs {old_id if old_id is not None else '(nenhum)'}: {summarize_changes(changes)}")
+        for change, label in (('new', 'NOVO'), ('updated', 'ATUALIZADO'), ('removed', 'REMOVIDO')):
+            for item in changes[change]:
+                title = (item['resource'] or {}).get('title', '')
+                print(f"  {label:10} [{item['repositorio']}] {item['tag']} ({item['pub_date'] or 'sem data'}) {title[:60]}")
+    finally:
+        inventory.close()
+
+if __name__ == "__main__":
+    main()
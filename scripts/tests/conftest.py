@@ -0,0 +1,15 @@
+"""
+Configuração dos testes dos scripts.
+
+Os scripts importam uns aos outros como módulos de topo (from title_matcher
+import ...), como quando executados de dentro de scripts/; o diretório entra
+no sys.path antes da coleta dos testes.
+
+Uso (da raiz do repositório):
+    python -m pytest scripts/tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
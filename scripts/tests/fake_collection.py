@@ -0,0 +1,143 @@
+"""
+Substituto em memória de pymongo Collection para os testes.
+
+Avalia o subconjunto dos operadores de consulta que os scripts geram
+($and, $or, $nor, $gt, $gte, $lt, $lte, $regex, $exists e igualdade), com
+a semântica do servidor nos pontos que importam aqui: comparações só casam
+valores do mesmo tipo BSON e $regex usa classes ASCII (\\d, \\s), como o
+PCRE do MongoDB sem a opção UCP.
+"""
+
+import re
+from numbers import Number
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+_COMPARISONS = {
+    '$gt': lambda value, bound: value > bound,
+    '$gte': lambda value, bound: value >= bound,
+    '$lt': lambda value, bound: value < bound,
+    '$lte': lambda value, bound: value <= bound,
+}
+
+_MISSING = object()
+
+def _same_type(value, bound):
+    for kind in (str, ObjectId):
+        if isinstance(value, kind) and isinstance(bound, kind):
+            return True
+    return (
+        isinstance(value, Number) and isinstance(bound, Number)
+        and not isinstance(value, bool) and not isinstance(bound, bool)
+    )
+
+def _matches_condition(value, condition):
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return value is not _MISSING and value == condition
+    for operator, argument in condition.items():
+        if operator == '$exists':
+            if (value is not _MISSING) != bool(argument):
+                return False
+        elif operator == '$regex':
+            if not isinstance(value, str) or not re.search(argument, value, re.ASCII):
+                return False
+        elif operator in _COMPARISONS:
+            if value is _MISSING or not _same_type(value, argument) or not _COMPARISONS[operator](value, argument):
+                return False
+        else:
+            raise NotImplementedError(f"Operador não suportado pelo substituto: {operator}")
+    return True
+
+def matches(document, query):
+    """Indica se `document` satisfaz o filtro `query`."""
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(document, part) for part in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(document, part) for part in condition):
+                return False
+        elif not _matches_condition(document.get(key, _MISSING), condition):
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction=1):
+        self.documents = sorted(self.documents, key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+class FakeCollection:
+    """
+    Coleção em memória com find, bulk_write ($set), aggregate ($match e
+    $bucketAuto) e count_documents. `fail_on_write` é o número (a partir de
+    1) da chamada de bulk_write que perde a conexão (AutoReconnect) antes de
+    aplicar qualquer operação, simulando uma execução interrompida.
+    """
+
+    def __init__(self, documents=(), fail_on_write=None):
+        self.documents = {document['_id']: dict(document) for document in documents}
+        self.fail_on_write = fail_on_write
+        self.writes = []
+        self.find_queries = []
+
+    def find(self, query=None, projection=None, **options):
+        self.find_queries.append(query)
+        selected = [dict(document) for document in self.documents.values() if matches(document, query)]
+        if projection:
+            fields = {name for name, included in projection.items() if included}
+            selected = [{key: value for key, value in document.items() if key in fields} for document in selected]
+        return FakeCursor(selected)
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail_on_write is not None and len(self.writes) + 1 == self.fail_on_write:
+            self.fail_on_write = None
+            raise AutoReconnect('conexão perdida (simulada)')
+        self.writes.append(list(operations))
+        matched = modified = 0
+        for operation in operations:
+            document = self.documents.get(operation._filter['_id'])
+            if document is None:
+                continue
+            matched += 1
+            changes = operation._doc['$set']
+            if any(document.get(key, _MISSING) != value for key, value in changes.items()):
+                document.update(changes)
+                modified += 1
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    def count_documents(self, query):
+        return sum(1 for document in self.documents.values() if matches(document, query))
+
+    def aggregate(self, pipeline, **options):
+        documents = list(self.documents.values())
+        for stage in pipeline:
+            if '$match' in stage:
+                documents = [document for document in documents if matches(document, stage['$match'])]
+            elif '$bucketAuto' in stage:
+                documents = _bucket_auto(documents, stage['$bucketAuto'])
+            else:
+                raise NotImplementedError(f"Estágio não suportado pelo substituto: {stage}")
+        return iter(documents)
+
+def _bucket_auto(documents, spec):
+    field = spec['groupBy'].lstrip('$')
+    values = sorted(document[field] for document in documents if field in document)
+    if not values:
+        return []
+    size = -(-len(values) // spec['buckets'])
+    chunks = [values[start:start + size] for start in range(0, len(values), size)]
+    return [
+        {'_id': {'min': chunk[0], 'max': following[0] if following else chunk[-1]}, 'count': len(chunk)}
+        for chunk, following in zip(chunks, chunks[1:] + [None])
+    ]
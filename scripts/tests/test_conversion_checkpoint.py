@@ -0,0 +1,78 @@
+"""CheckpointStore, resume_filter e a retomada de uma conversão interrompida."""
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from conversion_checkpoint import CheckpointStore, resume_filter
+from convert_mongodb_dates_final import convert_checkpointed
+from fake_collection import FakeCollection
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+    yield store
+    store.close()
+
+def test_resume_filter():
+    last_id = ObjectId()
+    assert resume_filter({'a': 1}, None) == {'a': 1}
+    assert resume_filter({}, last_id) == {'_id': {'$gt': last_id}}
+    assert resume_filter(None, last_id) == {'_id': {'$gt': last_id}}
+    assert resume_filter({'a': 1}, last_id) == {'$and': [{'a': 1}, {'_id': {'$gt': last_id}}]}
+
+def test_run_round_trip_preserves_bson_types(store):
+    run_id = store.create_run('script', {'batch_size': 10})
+    query = {'_id': {'$gte': ObjectId('0' * 24)}, 'year': {'$type': 'string'}}
+    store.save_run(run_id, query=query, partitions=[query], counters={'total_processed': 3})
+
+    run = store.find_run('script')
+    assert run['run_id'] == run_id
+    assert run['status'] == 'running'
+    assert run['options'] == {'batch_size': 10}
+    assert run['query'] == query
+    assert isinstance(run['query']['_id']['$gte'], ObjectId)
+    assert run['partitions'] == [query]
+    assert store.find_run('outro script') is None
+
+    store.finish_run(run_id)
+    assert store.find_run('script') is None
+    assert store.find_run('script', run_id)['status'] == 'completed'
+
+def test_partition_checkpoint_is_upserted(store):
+    run_id = store.create_run('script', {})
+    assert store.load_partition(run_id, 0) == (None, None, False)
+    first, second = ObjectId(), ObjectId()
+    store.save_partition(run_id, 0, first, {'total_processed': 1})
+    store.save_partition(run_id, 0, second, {'total_processed': 2}, done=True)
+    assert store.load_partition(run_id, 0) == (second, {'total_processed': 2}, True)
+    assert store.load_partition(run_id, 1) == (None, None, False)
+
+def documents(count):
+    return [{'_id': number, 'year': str(2000 + number % 20), 'eventDate': f'{2000 + number % 20}-01-15'}
+            for number in range(count)]
+
+def test_interrupted_run_resumes_after_last_committed_batch(store):
+    collection = FakeCollection(documents(25), fail_on_write=3)
+    run_id = store.create_run('script', {})
+
+    with pytest.raises(AutoReconnect):
+        convert_checkpointed(collection, store, run_id, 0, {}, 5, ['dates'])
+    last_id, counters, done = store.load_partition(run_id, 0)
+    # Dois lotes gravados antes da falha: o checkpoint aponta para o último _id do segundo
+    assert (last_id, counters['total_processed'], done) == (9, 10, False)
+
+    counters = convert_checkpointed(collection, store, run_id, 0, {}, 5, ['dates'])
+    assert collection.find_queries[-1] == {'_id': {'$gt': 9}}
+    assert counters['total_processed'] == 25
+    assert counters['transformers']['dates']['string_to_numeric_conversions']['year'] == 25
+    assert all(isinstance(document['year'], int) for document in collection.documents.values())
+    assert all(document['month'] == 1 and document['day'] == 15 for document in collection.documents.values())
+    # Nenhum documento foi reescrito depois da retomada
+    written = [operation._filter['_id'] for batch in collection.writes for operation in batch]
+    assert sorted(written) == list(range(25))
+
+    assert store.load_partition(run_id, 0)[2] is True
+    before = len(collection.find_queries)
+    assert convert_checkpointed(collection, store, run_id, 0, {}, 5, ['dates'])['total_processed'] == 25
+    assert len(collection.find_queries) == before
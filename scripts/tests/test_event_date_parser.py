@@ -0,0 +1,96 @@
+"""parse_event_date contra a implementação original (re.match + strptime)."""
+
+import re
+from datetime import datetime
+
+import pytest
+
+from benchmark_date_conversion import generate_event_dates
+from event_date_parser import clear_parse_cache, parse_event_date, parse_event_dates_batch
+
+def legacy_parse_event_date(event_date):
+    """Versão original de convert_mongodb_dates_final.py (commit baseline)."""
+    if not event_date or not isinstance(event_date, str):
+        return None, None, None
+
+    patterns = [
+        r'^(\d{4})-(\d{1,2})-(\d{1,2})$',
+        r'^(\d{4})/(\d{1,2})/(\d{1,2})$',
+        r'^(\d{1,2})/(\d{1,2})/(\d{4})$',
+        r'^(\d{1,2})-(\d{1,2})-(\d{4})$',
+        r'^(\d{4})-(\d{1,2})$',
+        r'^(\d{4})/(\d{1,2})$',
+        r'^(\d{4})$'
+    ]
+
+    for i, pattern in enumerate(patterns):
+        match = re.match(pattern, event_date.strip())
+        if match:
+            groups = match.groups()
+
+            if i in [0, 1]:
+                year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
+            elif i in [2, 3]:
+                day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
+            elif i in [4, 5]:
+                year, month, day = int(groups[0]), int(groups[1]), None
+            elif i == 6:
+                year, month, day = int(groups[0]), None, None
+
+            if year and (year < 1700 or year > 2030):
+                continue
+            if month and (month < 1 or month > 12):
+                continue
+            if day and (day < 1 or day > 31):
+                continue
+
+            return year, month, day
+
+    for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%Y-%m', '%Y']:
+        try:
+            dt = datetime.strptime(event_date.strip(), fmt)
+            year = dt.year
+            month = dt.month if fmt not in ['%Y'] else None
+            day = dt.day if fmt not in ['%Y', '%Y-%m'] else None
+            return year, month, day
+        except ValueError:
+            continue
+
+    return None, None, None
+
+EDGE_CASES = [
+    None, '', '   ', 0, 2020, ['2020'], 's/d', '2020-01-15', ' 2020-01-15 ', '2020/1/5', '2020-1-5',
+    '15/01/2020', '15-01-2020', '01/15/2020', '13/13/2020', '31/02/2020', '29/02/2020', '29/02/2019',
+    '2020-02-30', '2020-00-10', '2020-13-01', '2020-01-00', '2020-1-32', '2020-01', '2020/01', '2020-13',
+    '2020/13', '2020-0', '2020', '1699', '1699-01-01', '2031-12-31', '0000', '0001-01-01', '9999-12-31',
+    '05/ 7/2020', ' 5/07/2020', '5/7/2020', '05-07-1600', '12/25/1650', '25/12/1650', '1/1/2031',
+    '2020-01-15T10:00:00', '2020-01-15/2020-01-20', '20200115', '2020.01.15', '15.01.2020',
+    '２０２０', '٢٠٢٠-٠١-٠١', '2020-٠١-01', '1500-01-01', '1500-02-30', '1500/01/01', '1500-06',
+    '1500/06', '2020-1', '2020-01-1 ', '\t2020-01-01\n', '2020-02-29', '2019-02-29', '1900-02-29',
+]
+
+def assert_equivalent(values):
+    clear_parse_cache()
+    for value in values:
+        assert parse_event_date(value) == legacy_parse_event_date(value), repr(value)
+
+def test_edge_cases_match_legacy_parser():
+    assert_equivalent(EDGE_CASES)
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_synthetic_corpus_matches_legacy_parser(seed):
+    event_dates, _ = generate_event_dates(20000, 1.0, seed)
+    assert_equivalent(event_dates)
+
+def test_cached_results_match_uncached():
+    # A segunda passada vem inteira do cache
+    event_dates, _ = generate_event_dates(5000, 0.05, 3)
+    clear_parse_cache()
+    first = [parse_event_date(value) for value in event_dates]
+    assert [parse_event_date(value) for value in event_dates] == first
+
+def test_batch_matches_scalar():
+    event_dates = EDGE_CASES + generate_event_dates(2000, 0.5, 4)[0]
+    years, months, days = parse_event_dates_batch(value for value in event_dates)
+    assert list(zip(years, months, days)) == [parse_event_date(value) for value in event_dates]
+    assert parse_event_dates_batch([]) == ([], [], [])
@@ -0,0 +1,102 @@
+"""Transições do circuito por host e as novas tentativas de HostHealth.call."""
+
+import json
+
+import pytest
+import requests
+
+import host_health
+from host_health import CLOSED, OPEN, HostHealth, HostUnavailable
+
+HOST = 'ipt.example.org'
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(host_health.time, 'time', clock)
+    return clock
+
+@pytest.fixture
+def health(tmp_path, clock, monkeypatch):
+    health = HostHealth(str(tmp_path / 'health.json'), retries=0, failure_threshold=3, cool_down=100)
+    monkeypatch.setattr(health, '_sleep_before_retry', lambda attempt: None)
+    return health
+
+def fail(health, times=1):
+    for _ in range(times):
+        assert health.allow(HOST)
+        health.record_failure(HOST, requests.exceptions.ConnectTimeout('timeout'))
+
+def test_circuit_opens_after_threshold(health):
+    fail(health, 2)
+    assert not health.is_open(HOST)
+    fail(health)
+    assert health.is_open(HOST)
+    assert not health.allow(HOST)
+    assert health.hosts[HOST]['retry_after'] == 1100.0
+
+def test_success_resets_consecutive_failures(health):
+    fail(health, 2)
+    health.record_success(HOST)
+    fail(health, 2)
+    assert not health.is_open(HOST)
+    assert health.hosts[HOST]['failures'] == 2
+
+def test_single_probe_after_cool_down(health, clock):
+    fail(health, 3)
+    clock.now += 100
+    assert health.allow(HOST)
+    # Só uma requisição de teste por vez
+    assert not health.allow(HOST)
+    health.record_success(HOST)
+    assert health.hosts[HOST]['state'] == CLOSED
+    assert health.stats['recovered'] == 1
+
+def test_failed_probe_reopens_with_doubled_cool_down(health, clock):
+    fail(health, 3)
+    clock.now += 100
+    fail(health)
+    state = health.hosts[HOST]
+    assert (state['state'], state['opened'], state['retry_after']) == (OPEN, 2, clock.now + 200)
+
+def test_call_retries_then_raises(health):
+    health.retries = 2
+    calls = []
+
+    def request(timeout):
+        calls.append(timeout)
+        raise requests.exceptions.ConnectionError('recusada')
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        health.call(HOST, request)
+    assert len(calls) == 3
+    assert health.is_open(HOST)
+    with pytest.raises(HostUnavailable):
+        health.call(HOST, request)
+    assert len(calls) == 3
+
+def test_http_404_counts_as_host_up(health):
+    fail(health, 2)
+    response = requests.Response()
+    response.status_code = 404
+
+    def request(timeout):
+        raise requests.exceptions.HTTPError(response=response)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        health.call(HOST, request)
+    assert health.hosts[HOST]['failures'] == 0
+
+def test_state_is_shared_through_the_file(health, tmp_path):
+    fail(health, 3)
+    health.save()
+    contents = json.loads((tmp_path / 'health.json').read_text())
+    assert contents['hosts'][HOST]['state'] == OPEN
+    assert HostHealth(str(tmp_path / 'health.json')).is_open(HOST)
@@ -0,0 +1,81 @@
+"""HttpCache: download, revalidação condicional (304), respostas frescas e modo offline."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from http_cache import CacheMiss, HttpCache
+
+BODY = '<rss><title>Coleção</title></rss>'.encode('utf-8')
+ETAG = '"v1"'
+
+class Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        conditional = self.headers.get('If-None-Match')
+        self.requests_seen.append(conditional)
+        if conditional == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def url():
+    Handler.requests_seen = []
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/rss.do'
+    server.shutdown()
+    server.server_close()
+
+def test_get_revalidates_with_etag(tmp_path, url):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), fresh_seconds=0)
+    assert cache.get(url) == BODY.decode('utf-8')
+    assert cache.get(url) == BODY.decode('utf-8')
+    assert Handler.requests_seen == [None, ETAG]
+    assert cache.stats['downloaded'] == 1 and cache.stats['not_modified'] == 1
+    cache.close()
+
+def test_fresh_entry_skips_the_network(tmp_path, url):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), fresh_seconds=3600)
+    cache.get(url)
+    cache.get(url)
+    assert Handler.requests_seen == [None]
+    assert cache.stats['fresh'] == 1
+    cache.close()
+
+def test_open_stream_stores_and_revalidates(tmp_path, url):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), fresh_seconds=0)
+    for _ in range(2):
+        with cache.open_stream(url) as source:
+            assert source.read() == BODY
+    assert Handler.requests_seen == [None, ETAG]
+    assert cache.stats['downloaded'] == 1 and cache.stats['not_modified'] == 1
+    cache.close()
+
+def test_offline_mode_uses_only_the_cache(tmp_path, url):
+    path = str(tmp_path / 'cache.sqlite3')
+    online = HttpCache(path)
+    with online.open_stream(url) as source:
+        source.read()
+    online.close()
+
+    offline = HttpCache(path, offline=True)
+    with offline.open_stream(url) as source:
+        assert source.read() == BODY
+    assert offline.get(url) == BODY.decode('utf-8')
+    with pytest.raises(CacheMiss):
+        offline.get(url + '?r=outro')
+    assert Handler.requests_seen == [None]
+    offline.close()
@@ -0,0 +1,92 @@
+"""Motor de manutenção: lotes de escrita, on_commit e junção dos transformadores."""
+
+import pytest
+
+# Registra o transformador 'dates'
+import event_date_transformer  # noqa: F401
+from fake_collection import FakeCollection
+from maintenance_engine import (
+    FieldTransformer, build_transformers, combined_dirty_filter, combined_projection, merge_sets, new_counters,
+    run_single_pass
+)
+
+class Upper(FieldTransformer):
+    name = 'upper'
+    projection = ['name']
+
+    def new_counters(self):
+        return {'changed': 0}
+
+    def dirty_filter(self):
+        return {'name': {'$regex': '[a-z]'}}
+
+    def transform(self, record, counters):
+        name = record.get('name')
+        if not name or name == name.upper():
+            return {}
+        counters['changed'] += 1
+        return {'name': name.upper()}
+
+class Length(FieldTransformer):
+    name = 'length'
+    projection = ['name']
+
+    def transform(self, record, counters):
+        return {'length': len(record.get('name') or '')}
+
+def test_single_pass_batches_writes_and_commits_in_order():
+    collection = FakeCollection(
+        [{'_id': number, 'name': 'abc' if number % 2 else 'ABC', 'other': 1} for number in range(10)]
+    )
+    transformers = [Upper()]
+    counters = new_counters(transformers)
+    commits = []
+
+    run_single_pass(collection, transformers, {}, 3, counters,
+                    on_commit=lambda last_id, done=False: commits.append((last_id, done)))
+
+    # Só os ímpares mudam: 5 operações, gravadas quando o lote de escrita chega a 3
+    assert [len(batch) for batch in collection.writes] == [3, 2]
+    assert commits == [(5, False), (9, True)]
+    assert counters['total_processed'] == 10
+    assert counters['write_totals'] == {'batches': 2, 'matched': 5, 'modified': 5, 'failed': 0}
+    assert counters['transformers']['upper'] == {'changed': 5}
+    assert all(document['name'] == 'ABC' for document in collection.documents.values())
+    assert collection.find_queries == [{}]
+
+def test_single_pass_merges_transformers_into_one_update():
+    collection = FakeCollection([{'_id': 1, 'name': 'abc'}, {'_id': 2, 'name': 'ABCD'}])
+    transformers = [Upper(), Length()]
+    run_single_pass(collection, transformers, {}, 10, new_counters(transformers))
+
+    assert len(collection.writes) == 1
+    assert [operation._doc for operation in collection.writes[0]] == [
+        {'$set': {'name': 'ABC', 'length': 3}},
+        {'$set': {'length': 4}},
+    ]
+
+def test_single_pass_without_changes_still_reports_done():
+    collection = FakeCollection([{'_id': 1, 'name': 'ABC'}])
+    commits = []
+    run_single_pass(collection, [Upper()], {}, 10, new_counters([Upper()]),
+                    on_commit=lambda last_id, done=False: commits.append((last_id, done)))
+    assert collection.writes == []
+    assert commits == [(1, True)]
+
+def test_merge_sets_rejects_conflicting_values():
+    upper, length = Upper(), Length()
+    assert merge_sets(1, [(upper, {'a': 1}), (length, {'a': 1, 'b': 2})]) == {'a': 1, 'b': 2}
+    with pytest.raises(ValueError):
+        merge_sets(1, [(upper, {'a': 1}), (length, {'a': 2})])
+
+def test_combined_projection_and_dirty_filter():
+    assert combined_projection([Upper(), Length()]) == {'_id': 1, 'name': 1}
+    assert combined_dirty_filter([Upper()]) == {'name': {'$regex': '[a-z]'}}
+    assert combined_dirty_filter([Upper(), Upper()]) == {'$or': [Upper().dirty_filter()] * 2}
+    # Um transformador sem filtro obriga a varredura completa
+    assert combined_dirty_filter([Upper(), Length()]) is None
+
+def test_build_transformers_rejects_unknown_names():
+    assert [transformer.name for transformer in build_transformers(['dates'])] == ['dates']
+    with pytest.raises(ValueError):
+        build_transformers(['dates', 'inexistente'])
@@ -0,0 +1,54 @@
+"""Histogramas por estágio e a junção das métricas das partições."""
+
+import random
+
+import maintenance_metrics
+from maintenance_metrics import LATENCY_BUCKETS, MAX_SAMPLES, RunMetrics, StageHistogram
+
+def test_observe_fills_buckets_and_percentiles():
+    histogram = StageHistogram()
+    for seconds in (0.002, 0.002, 0.02, 2.0):
+        histogram.observe(seconds)
+    summary = histogram.summary()
+    assert summary['count'] == 4
+    assert summary['max_seconds'] == 2.0
+    assert summary['buckets'][str(LATENCY_BUCKETS[1])] == 2
+    assert summary['buckets'][str(LATENCY_BUCKETS[-1])] == 4
+    assert summary['percentiles']['p50'] == 0.011
+
+def test_merge_weights_samples_by_observation_count(monkeypatch):
+    monkeypatch.setattr(maintenance_metrics, 'random', random.Random(1))
+    busy, quiet = StageHistogram(), StageHistogram()
+    for _ in range(20 * MAX_SAMPLES):
+        busy.observe(1.0)
+    for _ in range(MAX_SAMPLES // 10):
+        quiet.observe(2.0)
+
+    # Como no processo principal: as partições são juntadas em um histograma vazio
+    total = StageHistogram()
+    total.merge(busy.snapshot())
+    total.merge(quiet.snapshot())
+    assert total.count == total.seen == 20 * MAX_SAMPLES + MAX_SAMPLES // 10
+    assert len(total.samples) == MAX_SAMPLES
+    # O lado com 1/201 das observações fica com ~1/201 da amostra, não com 1/11
+    share = total.samples.count(2.0) / len(total.samples)
+    assert abs(share - 1 / 201) < 0.002
+
+def test_merge_of_small_histograms_keeps_every_sample():
+    first, second = StageHistogram(), StageHistogram()
+    first.observe(0.1)
+    second.observe(0.3)
+    second.observe(0.5)
+    first.merge(second.snapshot())
+    assert sorted(first.samples) == [0.1, 0.3, 0.5]
+    assert first.summary()['percentiles']['p50'] == 0.3
+
+def test_run_metrics_merge_partitions():
+    total = RunMetrics('script')
+    for _ in range(3):
+        partition = RunMetrics('script')
+        partition.observe('write', 0.01)
+        partition.add_documents(100)
+        total.merge(partition.snapshot())
+    assert total.documents == 300
+    assert total.stages['write'].count == 3
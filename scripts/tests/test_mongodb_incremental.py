@@ -0,0 +1,65 @@
+"""dirty_filter() e os índices parciais contra o que a conversão de fato corrige."""
+
+import random
+
+import pytest
+
+from benchmark_date_conversion import generate_event_dates
+from event_date_transformer import build_update
+from fake_collection import matches
+from mongodb_incremental import DATE_FIELDS, DIRTY_INDEXES, dirty_filter
+from test_event_date_parser import EDGE_CASES
+
+# Strings de dígitos não ASCII ficam de fora do modo incremental (ver mongodb_incremental.py)
+FIELD_VALUES = [None, 7, 2020, 7.0, '', 's/d', '7', '07', '2020', ' 7', '7 ', '-7', '7a', '1e3']
+EVENT_DATES = [value for value in EDGE_CASES if isinstance(value, str) and value.isascii()]
+
+def fixable(document):
+    counters = {field: 0 for field in DATE_FIELDS}
+    return bool(build_update(document, dict(counters), dict(counters)))
+
+def random_documents(seed, count):
+    rng = random.Random(seed)
+    corpus, _ = generate_event_dates(2000, 0.5, seed)
+    event_dates = EVENT_DATES + [value for value in corpus if value.isascii()]
+    documents = []
+    for number in range(count):
+        document = {'_id': number}
+        for field in DATE_FIELDS:
+            value = rng.choice(FIELD_VALUES)
+            if value is not None:
+                document[field] = value
+        if rng.random() < 0.8:
+            document['eventDate'] = rng.choice(event_dates)
+        documents.append(document)
+    return documents
+
+@pytest.mark.parametrize('seed', range(3))
+def test_filter_selects_every_fixable_document(seed):
+    query = dirty_filter()
+    for document in random_documents(seed, 5000):
+        if fixable(document):
+            assert matches(document, query), document
+
+@pytest.mark.parametrize('document', [
+    {'year': 's/d', 'month': '', 'day': 7, 'eventDate': '2020-01-01'},
+    {'eventDate': 's/d'},
+    {'eventDate': '2020.01.15'},
+    {'year': 2020, 'eventDate': '2020'},
+    {'year': 2020, 'month': 1, 'eventDate': '2020-01'},
+    {'year': 2020, 'month': 1, 'day': 15, 'eventDate': '2020-01-15'},
+    {'year': 2020, 'month': 1, 'day': 15},
+])
+def test_filter_skips_documents_without_possible_fix(document):
+    assert not fixable(document)
+    assert not matches(document, dirty_filter())
+
+def test_each_branch_is_covered_by_its_partial_index():
+    # Cada ramo do $or só pode usar o índice parcial se o ramo implicar o partialFilterExpression
+    branches = dirty_filter()['$or']
+    assert len(branches) == len(DIRTY_INDEXES)
+    for document in random_documents(3, 5000):
+        for branch, index in zip(branches, DIRTY_INDEXES):
+            if matches(document, branch):
+                assert matches(document, index.document['partialFilterExpression']), (document, index.document)
+                assert index.document['key'].keys() <= branch.keys()
@@ -0,0 +1,43 @@
+"""compute_partitions e merge_counters."""
+
+import pytest
+from bson import ObjectId
+
+from fake_collection import FakeCollection, matches
+from mongodb_partitions import compute_partitions, merge_counters
+
+def assert_disjoint_cover(collection, partitions, query=None):
+    for document in collection.documents.values():
+        selected = [number for number, partition in enumerate(partitions) if matches(document, partition)]
+        assert len(selected) == (1 if matches(document, query) else 0), document
+
+@pytest.mark.parametrize('count,partitions', [(100, 4), (7, 4), (1, 3), (50, 50)])
+def test_partitions_cover_every_document_once(count, partitions):
+    collection = FakeCollection([{'_id': ObjectId(), 'n': number} for number in range(count)])
+    ranges = compute_partitions(collection, partitions)
+    assert 1 <= len(ranges) <= partitions
+    assert_disjoint_cover(collection, ranges)
+
+def test_first_partition_keeps_documents_without_the_field():
+    collection = FakeCollection(
+        [{'_id': number, 'tag': f'tag{number:03d}'} for number in range(30)] + [{'_id': 'sem tag'}]
+    )
+    ranges = compute_partitions(collection, 3, field='tag')
+    assert_disjoint_cover(collection, ranges)
+    assert matches({'_id': 'sem tag'}, ranges[0])
+
+def test_partitions_restricted_to_query():
+    collection = FakeCollection([{'_id': number, 'even': number % 2 == 0} for number in range(40)])
+    query = {'even': True}
+    ranges = compute_partitions(collection, 4, query=query)
+    assert all('$and' in partition for partition in ranges)
+    assert_disjoint_cover(collection, ranges, query)
+
+def test_single_partition_is_the_query():
+    assert compute_partitions(FakeCollection(), 1, query={'a': 1}) == [{'a': 1}]
+    assert compute_partitions(FakeCollection(), 4) == [{}]
+
+def test_merge_counters_sums_nested_dictionaries():
+    total = {'total_processed': 5, 'transformers': {'dates': {'year': 1}}}
+    merge_counters(total, {'total_processed': 3, 'transformers': {'dates': {'year': 2, 'month': 4}}, 'new': 1})
+    assert total == {'total_processed': 8, 'transformers': {'dates': {'year': 3, 'month': 4}}, 'new': 1}
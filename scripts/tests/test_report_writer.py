@@ -0,0 +1,58 @@
+"""ReportWriter: as mesmas linhas em todos os formatos pedidos."""
+
+import csv
+import json
+
+import pytest
+
+from report_writer import ReportWriter, columnar_available, parse_formats
+
+FIELDS = ['nome', 'score', 'found']
+ROWS = [
+    {'nome': 'Herbário, "RB"', 'score': 0.95, 'found': True, 'extra': 'ignorado'},
+    {'nome': 'Coleção\tde peixes', 'score': None},
+]
+
+def test_parse_formats():
+    assert parse_formats(None) == ['csv', 'tsv']
+    assert parse_formats(None, default=()) == []
+    assert parse_formats(' CSV, jsonl ,') == ['csv', 'jsonl']
+    with pytest.raises(ValueError):
+        parse_formats('csv,xlsx')
+
+def test_text_formats_in_one_pass(tmp_path):
+    base = str(tmp_path / 'relatorio')
+    with ReportWriter(base, FIELDS, ['csv', 'tsv', 'jsonl']) as report:
+        assert report.write_all(ROWS) == 2
+    assert report.paths == {kind: f'{base}.{kind}' for kind in ('csv', 'tsv', 'jsonl')}
+
+    for kind, delimiter in (('csv', ','), ('tsv', '\t')):
+        with open(report.paths[kind], newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f, delimiter=delimiter))
+        assert [row['nome'] for row in rows] == [ROWS[0]['nome'], ROWS[1]['nome']]
+        assert rows[1] == {'nome': ROWS[1]['nome'], 'score': '', 'found': ''}
+
+    with open(report.paths['jsonl'], encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [
+            {'nome': ROWS[0]['nome'], 'score': 0.95, 'found': True},
+            {'nome': ROWS[1]['nome'], 'score': None, 'found': None},
+        ]
+
+def test_unknown_format_closes_opened_files(tmp_path):
+    with pytest.raises(ValueError):
+        ReportWriter(str(tmp_path / 'relatorio'), FIELDS, ['csv', 'xlsx'])
+
+@pytest.mark.skipif(not columnar_available(), reason='pyarrow não instalado')
+def test_columnar_formats_match_rows(tmp_path):
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    base = str(tmp_path / 'relatorio')
+    with ReportWriter(base, FIELDS, ['parquet', 'arrow'], types={'score': 'float', 'found': 'bool'},
+                      batch_size=1) as report:
+        report.write_all(ROWS)
+
+    expected = {'nome': [ROWS[0]['nome'], ROWS[1]['nome']], 'score': [0.95, None], 'found': [True, None]}
+    assert pyarrow.parquet.read_table(report.paths['parquet']).to_pydict() == expected
+    with pyarrow.ipc.open_file(report.paths['arrow']) as reader:
+        assert reader.read_all().to_pydict() == expected
@@ -0,0 +1,73 @@
+"""Snapshots do inventário de recursos e as diferenças entre eles."""
+
+import pytest
+
+from resource_inventory import ResourceInventory, record_harvest
+
+def resource(tag, title=None, **extra):
+    return dict({'tag': tag, 'title': title or tag.upper(), 'link': f'http://ipt/resource?r={tag}'}, **extra)
+
+def summary(changes):
+    return {kind: sorted((item['repositorio'], item['tag']) for item in items) for kind, items in changes.items()}
+
+@pytest.fixture
+def inventory(tmp_path):
+    inventory = ResourceInventory(str(tmp_path / 'inventory.sqlite3'))
+    yield inventory
+    inventory.close()
+
+def test_diff_new_updated_removed(inventory):
+    first = inventory.record_snapshot({'a': [resource('x'), resource('y')], 'b': [resource('z')]})
+    second = inventory.record_snapshot({'a': [resource('x', 'novo título'), resource('w')], 'b': [resource('z')]})
+
+    assert summary(inventory.diff_snapshots(None, first))['new'] == [('a', 'x'), ('a', 'y'), ('b', 'z')]
+    changes = inventory.diff_snapshots(first, second)
+    assert summary(changes) == {'new': [('a', 'w')], 'updated': [('a', 'x')], 'removed': [('a', 'y')]}
+    updated = changes['updated'][0]
+    assert updated['resource']['title'] == 'novo título'
+    assert updated['previous_hash'] != updated['content_hash']
+    assert inventory.diff_latest() == changes
+
+def test_failed_repository_is_compared_with_last_successful_harvest(inventory):
+    first = inventory.record_snapshot({'a': [resource('x')], 'b': [resource('y')]})
+    # 'b' falhou na segunda coleta: não entra no snapshot e nada é removido
+    second = inventory.record_snapshot({'a': [resource('x')]})
+    third = inventory.record_snapshot({'a': [resource('x')], 'b': [resource('y'), resource('v')]})
+
+    assert summary(inventory.diff_snapshots(first, second)) == {'new': [], 'updated': [], 'removed': []}
+    assert summary(inventory.diff_snapshots(second, third)) == {'new': [('b', 'v')], 'updated': [], 'removed': []}
+
+def test_empty_feed_removes_its_resources(inventory):
+    first = inventory.record_snapshot({'a': [resource('x')]})
+    second = inventory.record_snapshot({'a': []})
+    assert summary(inventory.diff_snapshots(first, second))['removed'] == [('a', 'x')]
+
+def test_harvest_with_keep_one_diffs_before_pruning(inventory, monkeypatch):
+    monkeypatch.setenv('RESOURCE_INVENTORY_KEEP', '1')
+    assert summary(record_harvest(inventory, {'a': [resource('x')]}))['new'] == [('a', 'x')]
+    # Coletas em que o feed falhou não apagam a última coleta boa do repositório
+    record_harvest(inventory, {})
+    record_harvest(inventory, {})
+    assert summary(record_harvest(inventory, {'a': [resource('x')]})) == {'new': [], 'updated': [], 'removed': []}
+    assert summary(record_harvest(inventory, {'a': [resource('x', 'outro')]}))['updated'] == [('a', 'x')]
+    assert len(inventory.snapshots()) == 1
+
+def test_derived_fields_follow_latest_harvest(inventory):
+    first = inventory.record_snapshot({'a': [resource('x', kingdom='Plantae')]})
+    second = inventory.record_snapshot({'a': [resource('x', kingdom='Fungi')]})
+    # Só o kingdom mudou: o recurso não é "atualizado", mas o conteúdo guardado acompanha a nova classificação
+    assert summary(inventory.diff_snapshots(first, second))['updated'] == []
+    assert inventory.diff_snapshots(None, second)['new'][0]['resource']['kingdom'] == 'Fungi'
+
+def test_description_is_not_hashed(inventory):
+    first = inventory.record_snapshot({'a': [resource('x', description='')]})
+    second = inventory.record_snapshot({'a': [resource('x', description='descrição')]})
+    assert summary(inventory.diff_snapshots(first, second))['updated'] == []
+
+def test_prune_keeps_referenced_contents(inventory):
+    for title in ('um', 'dois', 'três'):
+        inventory.record_snapshot({'a': [resource('x', title)]})
+    assert inventory.prune(1) == 2
+    assert [snapshot['resources'] for snapshot in inventory.snapshots()] == [1]
+    (count,) = inventory.connection.execute('SELECT COUNT(*) FROM contents').fetchone()
+    assert count == 1
@@ -0,0 +1,43 @@
+"""TitleIndex contra a comparação exaustiva com SequenceMatcher."""
+
+import random
+
+import pytest
+
+from title_matcher import TitleIndex, similarity_key, similarity_ratio
+
+def random_titles(seed, count):
+    """Títulos curtos com poucas letras, para que muitos pares fiquem exatamente no limiar."""
+    rng = random.Random(seed)
+    titles = [''.join(rng.choice('sao ') for _ in range(rng.randint(1, 12))) for _ in range(count)]
+    return [title for title in titles if similarity_key(title)]
+
+def brute_force_score(keys, title, threshold):
+    best = max((similarity_ratio(similarity_key(title), key) for key in keys), default=0.0)
+    return best if best >= threshold else None
+
+@pytest.mark.parametrize('threshold', [0.6, 0.75, 0.8, 0.85, 0.9])
+@pytest.mark.parametrize('seed', range(3))
+def test_best_match_equals_brute_force(threshold, seed):
+    titles = random_titles(seed, 120)
+    indexed, queries = titles[:60], titles[60:]
+    index = TitleIndex(threshold)
+    for title in indexed:
+        index.add(title, title)
+
+    for query in queries:
+        match = index.best_match(query)
+        assert (match[1] if match else None) == brute_force_score(index.keys, query, threshold), query
+
+def test_candidate_exactly_at_threshold_is_kept():
+    # ratio('sa', 'sao') = 2 * 2 / 5 = 0.8: no limite de tamanho, 2 * 1.2 / 0.8 dá 2.999...
+    index = TitleIndex(0.8)
+    index.add('sa', 'registro')
+    assert index.best_match('sao') == ('registro', 0.8, 'sa')
+
+def test_best_match_prefers_highest_ratio():
+    index = TitleIndex(0.8)
+    index.add('Coleção de Aves do Museu', 'parecido')
+    index.add('Coleção de Aves do Museu Nacional', 'igual')
+    value, score, _ = index.best_match('Colecao de Aves do Museu Nacional - Version 1.2')
+    assert (value, score) == ('igual', 1.0)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Comparação aproximada de títulos (recursos dos IPTs x nomes do Grist).
+
+Comparar cada título do RSS com todos os nomes do Grist usando
+SequenceMatcher custa O(N x M) razões exatas. TitleIndex normaliza cada
+título uma única vez e indexa os trigramas de caracteres; para um título
+consultado, apenas os candidatos que passam por dois filtros sem perdas
+chegam a SequenceMatcher.ratio():
+
+- limite de tamanho: ratio = 2M / (la + lb) <= 2 min(la, lb) / (la + lb);
+- trigramas em comum: os blocos de SequenceMatcher são substrings comuns
+  separadas por pelo menos um caractere não casado, então, com ratio >= t,
+  os dois títulos compartilham pelo menos (la + lb)(5t - 4)/2 - 2
+  trigramas (contados com multiplicidade).
+
+Para limiares abaixo de 0.8 o segundo filtro não restringe nada e todos os
+títulos dentro do limite de tamanho são comparados. Antes de ratio(), cada
+candidato passa ainda por quick_ratio() (caracteres em comum), outro limite
+superior. A consulta devolve o melhor candidato e a sua razão, não o
+primeiro acima do limiar.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+DEFAULT_THRESHOLD = 0.90
+
+# Folga dos limites calculados em ponto flutuante: um candidato exatamente no
+# limiar (por exemplo 'sa' x 'sao' com 0.8, onde 2 * 1.2 / 0.8 dá 2.999...)
+# não pode ser descartado por arredondamento
+BOUND_EPSILON = 1e-9
+
+# Padrões de versão no final do título: "- Version 1.0", "Version 2", "v1.0", "v.2"...
+VERSION_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
+        r'\s+-\s+Version\s+\d+(\.\d+)*\s*$',  # " - Version 1.0", " - Version 2", etc.
+        r'\s+Version\s+\d+(\.\d+)*\s*$',      # " Version 1.0", " Version 2", etc.
+        r'\s+Version\s+\d+(\.\d+)*\s+.*$',    # " Version 1.0 something"
+        r'\s+v\d+(\.\d+)*\s*$',               # " v1.0", " v2", etc.
+        r'\s+v\.\d+(\.\d+)*\s*$',             # " v.1.0", " v.2", etc.
+    ]
+]
+WHITESPACE = re.compile(r'\s+')
+PUNCTUATION = re.compile(r'[.,;:!?()[\]{}"\'-]')
+
+def normalize_text_for_comparison(text):
+    """Normaliza texto para comparação, removendo acentos, espaços extras e convertendo para minúsculas"""
+    if not text:
+        return ''
+
+    # Remover acentos e caracteres especiais
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+
+    # Converter para minúsculas e remover espaços extras
+    text = WHITESPACE.sub(' ', text.lower().strip())
+
+    # Remover pontuação comum
+    text = PUNCTUATION.sub('', text)
+
+    return text
+
+def remove_version_from_title(title):
+    """Remove a parte 'Version' do título para os arquivos de saída"""
+    if not title:
+        return ''
+
+    # Preserva o texto antes da versão
+    cleaned_title = title
+    for pattern in VERSION_PATTERNS:
+        cleaned_title = pattern.sub('', cleaned_title)
+
+    return cleaned_title.strip()
+
+def similarity_key(title):
+    """Forma do título usada na comparação aproximada (sem versão, normalizado)"""
+    return normalize_text_for_comparison(remove_version_from_title(title))
+
+def similarity_ratio(text1, text2):
+    """Razão de SequenceMatcher entre dois textos"""
+    return SequenceMatcher(None, text1, text2).ratio()
+
+def trigrams(text):
+    """Trigramas de caracteres do texto, com multiplicidade"""
+    return Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+class TitleIndex:
+    """
+    Índice de títulos para a busca do mais parecido acima de `threshold`.
+    Cada título é adicionado com um valor associado (por exemplo, o registro
+    do Grist), devolvido pela consulta.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        # Coeficiente do mínimo de trigramas em comum; <= 0 desativa o filtro
+        self.shared_factor = (5 * threshold - 4) / 2
+        self.keys = []
+        self.values = []
+        self.postings = defaultdict(list)
+        self.by_length = defaultdict(list)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, title, value=None):
+        """Indexa `title` (normalizado aqui, uma única vez)"""
+        key = similarity_key(title)
+        if not key:
+            return
+        position = len(self.keys)
+        self.keys.append(key)
+        self.values.append(value)
+        self.by_length[len(key)].append(position)
+        for trigram, count in trigrams(key).items():
+            self.postings[trigram].append((position, count))
+
+    def _length_bounds(self, length):
+        threshold = self.threshold
+        if threshold <= 0:
+            return 0, math.inf
+        return (
+            math.ceil(length * threshold / (2 - threshold) - BOUND_EPSILON),
+            math.floor(length * (2 - threshold) / threshold + BOUND_EPSILON)
+        )
+
+    def _min_shared(self, length, other_length):
+        return self.shared_factor * (length + other_length) - 2 - BOUND_EPSILON
+
+    def candidates(self, key):
+        """Posições dos títulos que ainda podem ter razão >= threshold com `key`"""
+        length = len(key)
+        low, high = self._length_bounds(length)
+        if self.shared_factor <= 0:
+            return [
+                position for other_length, positions in self.by_length.items()
+                if low <= other_length <= high for position in positions
+            ]
+
+        shared = defaultdict(int)
+        for trigram, count in trigrams(key).items():
+            for position, other_count in self.postings.get(trigram, ()):
+                shared[position] += min(count, other_count)
+        selected = {
+            position for position, common in shared.items()
+            if low <= len(self.keys[position]) <= high
+            and common >= self._min_shared(length, len(self.keys[position]))
+        }
+        # Títulos curtos demais para que o filtro de trigramas exija algo
+        for other_length in range(low, min(high, math.floor(2 / self.shared_factor - length + BOUND_EPSILON)) + 1):
+            selected.update(self.by_length.get(other_length, ()))
+        return sorted(selected)
+
+    def best_match(self, title):
+        """
+        Título indexado mais parecido com `title`, como (valor, razão, título
+        normalizado), ou None se nenhum atingir o limiar. Empates ficam com o
+        título adicionado primeiro.
+        """
+        key = similarity_key(title)
+        if not key:
+            return None
+        best_position, best_score = None, self.threshold
+        for position in self.candidates(key):
+            other = self.keys[position]
+            if other == key:
+                score = 1.0
+            else:
+                # quick_ratio() é um limite superior barato de ratio()
+                matcher = SequenceMatcher(None, key, other)
+                if matcher.quick_ratio() < best_score:
+                    continue
+                score = matcher.ratio()
+            if score > best_score or (best_position is None and score >= best_score):
+                best_position, best_score = position, score
+                if score == 1.0:
+                    break
+        if best_position is None:
+            return None
+        return self.values[best_position], best_score, self.keys[best_position]